@@ -20,6 +20,15 @@ from app.payments.dao import PaymentTransactionDAO
 from app.payments.models import PaymentTransaction, TxTypeEnum, TxStatusEnum
 from sqlalchemy import select
 from app.admin.stats_dao import StatsDAO
+from app.game.api.centrifugo import centrifugo
+from app.game.api.lobby import lobby
+from app.game.api.outbox import outbox
+from app.game.api.presence_stats import presence_stats
+from app.game.api.spectators import spectators
+from app.game.api.projections import projections
+from app.game.api.room_locks import room_locks
+from app.game.redis_dao.instrumentation import redis_metrics
+from app.game.redis_dao.manager import cache, get_redis
 
 router = APIRouter(prefix="/admin", tags=["Admin"])
 
@@ -322,3 +331,59 @@ async def get_platform_statistics(
     stats = await StatsDAO.get_platform_statistics(session)
     return PlatformStatistics(**stats)
 
+
+
+@router.get("/cache", status_code=200)
+async def get_cache_metrics(
+    admin: User = Depends(get_current_admin_user_by_tg_id),
+    redis=Depends(get_redis),
+):
+    """
+    Метрики декоратора cached: попадания L1/L2, промахи, время загрузок.
+    near_cache — ближний кэш комнат (None, если выключен).
+    projections — кэш представлений комнат для зрителей.
+    room_locks — блокировки комнат процесса и совместные чтения комнат.
+    """
+    near = redis.near_cache.snapshot() if redis.near_cache is not None else None
+    return {
+        **cache.metrics.snapshot(),
+        "l1_size": len(cache.local),
+        "near_cache": near,
+        "projections": projections.snapshot(),
+        "room_locks": room_locks.snapshot(),
+    }
+
+
+@router.get("/redis", status_code=200)
+async def get_redis_metrics(
+    admin: User = Depends(get_current_admin_user_by_tg_id),
+    reset: bool = Query(False, description="Обнулить метрики после выдачи"),
+):
+    """
+    Команды Redis по эндпоинтам: вызовы, время и его гистограмма, байты запросов и ответов.
+    Учёт включается REDIS_METRICS.
+    """
+    snapshot = redis_metrics.snapshot()
+    if reset:
+        redis_metrics.reset()
+    return snapshot
+
+
+@router.get("/centrifugo", status_code=200)
+async def get_centrifugo_metrics(
+    admin: User = Depends(get_current_admin_user_by_tg_id),
+):
+    """
+    Клиент API Centrifugo: запросы, ошибки, таймауты, время ответа и соединения пула.
+    outbox — очередь публикаций: длина, отправлено, отброшено, повторы, задержка доставки.
+    lobby — агрегатор канала rooms: принято изменений, схлопнуто, сообщений, байт.
+    presence — опрос присутствия: последний снимок онлайна, обновления и ошибки.
+    spectators — каналы зрителей: в очереди, опубликовано, пакетов.
+    """
+    return {
+        **centrifugo.snapshot(),
+        "outbox": await outbox.snapshot(),
+        "lobby": lobby.snapshot(),
+        "presence": presence_stats.snapshot(),
+        "spectators": spectators.snapshot(),
+    }
@@ -1,6 +1,6 @@
 from pydantic import BaseModel, ConfigDict
 from datetime import datetime
-from typing import Optional
+from typing import Dict, Optional
 from decimal import Decimal
 
 
@@ -98,6 +98,10 @@ class PlatformStatistics(BaseModel):
     """Схема общей статистики платформы"""
     total_users: int
     online_users: int
+    # присутствие в Centrifugo (None — опрос ещё не прошёл)
+    online_in_lobby: Optional[int] = None
+    online_in_game: Optional[int] = None
+    online_by_stake: Dict[str, int] = {}
     total_balance: float
     total_deposits: float
     deposits_count: int
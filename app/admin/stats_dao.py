@@ -4,7 +4,9 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.users.models import User
 from app.payments.models import PaymentTransaction, TxTypeEnum, TxStatusEnum
+from app.game.api.presence_stats import presence_stats
 from app.game.redis_dao.manager import get_redis
+from app.game.redis_dao.presence import OnlineDAO
 
 
 class StatsDAO:
@@ -20,8 +22,9 @@ class StatsDAO:
         result = await session.execute(total_users_query)
         total_users = result.scalar() or 0
 
-        # 2. Подсчет онлайн игроков в комнатах Redis
+        # 2. Подсчет онлайн игроков в комнатах Redis и присутствие в Centrifugo (снимок в памяти)
         online_count = await StatsDAO._count_online_players(redis)
+        presence = presence_stats.stats()
 
         # 3. Общий баланс всех пользователей
         total_balance_query = select(func.sum(User.balance))
@@ -39,6 +42,9 @@ class StatsDAO:
         return {
             "total_users": total_users,
             "online_users": online_count,
+            "online_in_lobby": presence["lobby_users"],
+            "online_in_game": presence["in_game"],
+            "online_by_stake": presence["by_stake"],
             "total_balance": total_balance,
             "total_deposits": deposit_stats["amount"],
             "deposits_count": deposit_stats["count"],
@@ -51,27 +57,8 @@ class StatsDAO:
     async def _count_online_players(redis) -> int:
         """Подсчитать количество игроков онлайн в комнатах Redis"""
         try:
-            # Получаем все ключи комнат (формат: "10_a535d472")
-            all_keys = await redis.keys("*")
-            if not all_keys:
-                return 0
-
-            online_players = set()
-            values = await redis.mget(all_keys)
-
-            for key, value in zip(all_keys, values):
-                if value:
-                    try:
-                        import json
-                        room_data = json.loads(value)
-                        # Проверяем поле players
-                        if "players" in room_data:
-                            for player_id in room_data["players"].keys():
-                                online_players.add(player_id)
-                    except (json.JSONDecodeError, Exception):
-                        continue
-
-            return len(online_players)
+            # Счётчик idx:online ведётся при сохранении/удалении комнат — O(1) от числа комнат
+            return await OnlineDAO.count(redis)
         except Exception as e:
             print(f"Error counting online players: {e}")
             return 0
@@ -35,8 +35,52 @@ class Settings(BaseSettings):
 
     CENTRIFUGO_API_KEY: str
     CENTRIFUGO_URL: str
+    # Клиент API Centrifugo: таймаут запроса, с; размер пула keep-alive соединений;
+    # HTTP/2 (нужен пакет h2, без него — HTTP/1.1)
+    CENTRIFUGO_TIMEOUT: float = 3
+    CENTRIFUGO_MAX_CONNECTIONS: int = 50
+    CENTRIFUGO_HTTP2: bool = False
+    # Очередь публикаций (outbox): обработчики не ждут Centrifugo, фоновый публикатор
+    # шлёт пачками по OUTBOX_BATCH_SIZE; предел очереди и максимальная пауза повтора, с
+    CENTRIFUGO_OUTBOX: bool = True
+    OUTBOX_MAX_SIZE: int = 100000
+    OUTBOX_BATCH_SIZE: int = 100
+    OUTBOX_MAX_BACKOFF: float = 30
+    # Лобби: new_room / close_room копятся и уходят в канал rooms одним событием lobby
+    # раз в LOBBY_TICK секунд (0 — публиковать сразу); предел размера сообщения, байт
+    LOBBY_TICK: float = 1
+    LOBBY_MAX_MESSAGE_BYTES: int = 16384
+    # Онлайн из присутствия Centrifugo (лобби, комнаты, ставки): период опроса, с (0 — не опрашивать)
+    PRESENCE_STATS_INTERVAL: float = 10
+    # Каналы зрителей spectate#{room_id}: задержка трансляции состояния комнаты, с
+    SPECTATE_DELAY: float = 3
     SOCKET_URL: str
     REDIS_SSL: bool
+    # REDIS_HOST:REDIS_PORT — узел Redis Cluster (ключи комнаты собраны в один слот hash tag'ом)
+    REDIS_CLUSTER: bool = False
+    # Ближний кэш комнат в памяти процесса (CLIENT TRACKING): число ключей, 0 — выключен
+    REDIS_NEAR_CACHE_SIZE: int = 0
+    # Учёт команд Redis по эндпоинтам (GET /admin/redis) и порог лога медленных запросов, мс (0 — выкл.)
+    REDIS_METRICS: bool = False
+    REDIS_SLOW_REQUEST_MS: float = 0
+    # Формат хранения комнат в Redis: json | msgpack | packed
+    # (бинарные форматы требуют клиента без decode_responses)
+    ROOM_SERIALIZER: str = "json"
+    # Списки комнат по ставке: размер страницы (ZSCAN + MGET) и предел ответа
+    ROOMS_PAGE_SIZE: int = 200
+    ROOMS_LIST_MAX: int = 1000
+    # Сборщик истёкших комнат: сколько комната живёт после истечения теневого ключа
+    # и что делать со ставками в идущей партии: refund (игра отменяется) | settle
+    # (побеждает игрок с наименьшим штрафом)
+    ROOM_EXPIRY_GRACE: int = 300
+    ROOM_EXPIRY_SETTLEMENT: str = "refund"
+    # Журнал событий комнаты (Redis Stream): сколько последних событий хранить
+    ROOM_EVENTS_MAXLEN: int = 500
+    # Декоратор cached: размер и TTL локального кэша (L1) перед Redis (L2)
+    CACHE_L1_MAXSIZE: int = 1024
+    CACHE_L1_TTL: int = 30
+    # Сколько секунд процесс доверяет своей копии поколений тегов кэша
+    CACHE_TAG_GEN_TTL: float = 1
 
     PLAT_SECRET_KEY: str
     PLAT_SHOP_ID: str
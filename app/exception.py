@@ -42,3 +42,6 @@ class NoTokenException(BookingException):
     detail = "Нет токена"
 
 
+class RoomIsFullException(BookingException):
+    status_code = status.HTTP_400_BAD_REQUEST
+    detail = "Комната уже заполнена"
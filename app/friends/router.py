@@ -6,9 +6,9 @@ from app.users.dao import UserDAO
 from app.bot.create_bot import bot
 from app.game.redis_dao.manager import get_redis
 from app.game.redis_dao.custom_redis import CustomRedis
+from app.game.redis_dao.redis_room_dao import RoomRedisDAO
 from app.config import settings
 from loguru import logger
-import json
 
 router = APIRouter(prefix="/friends", tags=["Friends"])
 
@@ -96,17 +96,15 @@ async def invite_friend_to_room(
         )
     
     # ========== ШАГ 2: Проверка существования комнаты ==========
-    raw = await redis.get(room_id)
+    room = await RoomRedisDAO.get(redis, room_id)
     
-    if not raw:
+    if not room:
         logger.warning(f"[INVITE] Room not found: {room_id}")
         raise HTTPException(
             status_code=404, 
             detail="Комната не найдена. Возможно, игра уже началась или завершилась."
         )
     
-    room = json.loads(raw)
-    
     # ========== ШАГ 3: Проверка что приглашающий в комнате ==========
     players = room.get("players", {})
     
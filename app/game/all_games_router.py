@@ -1,14 +1,26 @@
 from fastapi import APIRouter, Depends, HTTPException, Body, Query
 from loguru import logger
-from sqlalchemy import text
+from sqlalchemy import select, text
 
 from app.database import SessionDep, Base
 from app.game.dao import GameTypeDAO
 from app.game.game_schemas import GameTypeOut, CurrentGameOut
+from app.game.redis_dao.manager import cached, invalidate_on_commit, user_tag, GAME_TYPES_TAG
+from app.users.models import User
 
 router = APIRouter(prefix="/games", tags=["GAMES"])
 
 
+@cached("game_types:active", ttl=600, tags=(GAME_TYPES_TAG,))
+async def load_active_games(session):
+    """
+    Справочник активных игр; кэш сбрасывается тегом game_types при записи через GameTypeDAO.
+    Правки в обход приложения (миграции, SQL) видны не позже чем через ttl.
+    """
+    games = await GameTypeDAO.find_all(session, is_active=True)
+    return [GameTypeOut.model_validate(game).model_dump(mode="json") for game in games]
+
+
 @router.get("/", response_model=list[GameTypeOut])
 async def get_active_games(
         session: SessionDep
@@ -16,7 +28,7 @@ async def get_active_games(
     """
     Получить список всех активных игр
     """
-    active_games = await GameTypeDAO.find_all(session, is_active=True)
+    active_games = await load_active_games(session=session)
 
     if not active_games:
         raise HTTPException(
@@ -24,7 +36,7 @@ async def get_active_games(
             detail="No active games found"
         )
 
-    return [GameTypeOut.model_validate(game) for game in active_games]
+    return active_games
 
 
 @router.get("/{game_id}", response_model=CurrentGameOut)
@@ -84,6 +96,10 @@ async def clear_db(session: SessionDep):
 
         logger.warning(f"[CLEAR_DB] Очистка таблиц: {target_tables}")
 
+        # кэш профилей и статистики удаляемых пользователей сбрасывается после commit
+        tg_ids = (await session.execute(select(User.tg_id).where(User.tg_id.is_not(None)))).scalars().all()
+        invalidate_on_commit(session, *(user_tag(tg_id) for tg_id in tg_ids))
+
         # Делаем truncate с cascade
         for table in target_tables:
             await session.execute(text(f'TRUNCATE TABLE "{table}" RESTART IDENTITY CASCADE;'))
@@ -0,0 +1,256 @@
+"""
+Долгоживущий клиент HTTP API Centrifugo.
+
+Раньше каждая публикация открывала новый httpx.AsyncClient: на каждое событие
+игры уходили TCP- (и TLS-) рукопожатие и закрытие соединения. Клиент держит пул
+keep-alive соединений на всё время жизни приложения (закрывается в lifespan),
+ограничивает запрос коротким таймаутом CENTRIFUGO_TIMEOUT вместо 30 с и считает
+метрики: запросы, ошибки, таймауты, время ответа, открытые соединения.
+
+Публикации одного запроса можно собрать в PublishBatch и отправить одним
+вызовом batch: подряд идущие одинаковые сообщения в разные каналы сливаются
+в broadcast.
+
+История. Каналы комнат room#{room_id}, игроков user#{tg_id} и зрителей spectate#{room_id}
+публикуются в историю Centrifugo (history_size / history_ttl и force_recovery в config.json): клиент,
+переподключившись, получает пропущенные сообщения от Centrifugo по offset/epoch
+без запросов к API. Остальные каналы (лобби rooms) публикуются с skip_history.
+
+HTTP/2 (CENTRIFUGO_HTTP2) требует пакет h2; без него клиент работает по HTTP/1.1.
+Метрики отдаёт GET /admin/centrifugo.
+"""
+import time
+from typing import Any, Dict, List
+
+import httpx
+from loguru import logger
+
+from app.config import settings
+
+
+# время на установку соединения и ожидание свободного соединения из пула
+CONNECT_TIMEOUT = 2
+# сколько неиспользуемое соединение живёт в пуле
+KEEPALIVE_EXPIRY = 30
+# каналы с историей и восстановлением после переподключения
+HISTORY_CHANNEL_PREFIXES = ("room#", "user#", "spectate#")
+
+
+def keeps_history(channel: str) -> bool:
+    return channel.startswith(HISTORY_CHANNEL_PREFIXES)
+
+
+def publish_params(channel: str, data: Dict[str, Any]) -> Dict[str, Any]:
+    """Параметры publish: каналы без восстановления не занимают историю"""
+    params = {"channel": channel, "data": data}
+    if not keeps_history(channel):
+        params["skip_history"] = True
+    return params
+
+
+def _h2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+class PublishBatch:
+    """Накопитель публикаций: порядок сообщений в каждом канале сохраняется"""
+
+    def __init__(self):
+        # [каналы, данные]: несколько каналов — broadcast
+        self._groups: List[List] = []
+        self.messages = 0
+
+    def add(self, channel: str, data: Dict[str, Any]):
+        self.messages += 1
+        last = self._groups[-1] if self._groups else None
+        # broadcast — одни параметры истории для всех каналов
+        if (
+            last is not None
+            and last[1] == data
+            and channel not in last[0]
+            and keeps_history(channel) == keeps_history(last[0][0])
+        ):
+            last[0].append(channel)
+        else:
+            self._groups.append([[channel], data])
+
+    def __len__(self) -> int:
+        return len(self._groups)
+
+    def items(self) -> List[tuple]:
+        """Сообщения (канал, данные) в порядке добавления"""
+        return [(channel, data) for channels, data in self._groups for channel in channels]
+
+    def commands(self) -> List[Dict[str, Any]]:
+        """Команды API: {"publish": {...}} или {"broadcast": {...}}"""
+        commands = []
+        for channels, data in self._groups:
+            params = publish_params(channels[0], data)
+            if len(channels) == 1:
+                commands.append({"publish": params})
+            else:
+                del params["channel"]
+                commands.append({"broadcast": {"channels": channels, **params}})
+        return commands
+
+
+class CentrifugoClient:
+    """HTTP API Centrifugo поверх одного пула соединений"""
+
+    def __init__(
+        self,
+        url: str,
+        api_key: str,
+        timeout: float = 3,
+        max_connections: int = 50,
+        http2: bool = False,
+        transport: httpx.AsyncBaseTransport | None = None,
+    ):
+        self.url = url
+        self.api_key = api_key
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self.http2 = http2
+        self._transport = transport
+        self._client: httpx.AsyncClient | None = None
+        self.requests = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.in_flight = 0
+        self.connections_opened = 0
+        self.time_total = 0.0
+        self.time_max = 0.0
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """httpx-клиент создаётся при первой публикации, внутри event loop"""
+        if self._client is None or self._client.is_closed:
+            http2 = self.http2
+            if http2 and not _h2_available():
+                logger.warning("[Centrifugo] CENTRIFUGO_HTTP2 включён, но пакет h2 не установлен — HTTP/1.1")
+                http2 = False
+            self._client = httpx.AsyncClient(
+                headers={"X-API-Key": self.api_key},
+                timeout=httpx.Timeout(self.timeout, connect=min(CONNECT_TIMEOUT, self.timeout)),
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                    keepalive_expiry=KEEPALIVE_EXPIRY,
+                ),
+                http2=http2,
+                transport=self._transport,
+            )
+        return self._client
+
+    async def call(self, method: str, params: Dict[str, Any]) -> httpx.Response | None:
+        """Вызов метода API; None — запрос не дошёл (таймаут, сеть)"""
+        self.requests += 1
+        self.in_flight += 1
+        started = time.perf_counter()
+        try:
+            response = await self.client.post(
+                self.url, json={"method": method, "params": params}, extensions={"trace": self._trace}
+            )
+            if response.status_code != 200:
+                self.errors += 1
+                logger.error(f"[Centrifugo] Ошибка {method}: {response.status_code} {response.text}")
+            return response
+        except httpx.TimeoutException as e:
+            self.errors += 1
+            self.timeouts += 1
+            logger.error(f"[Centrifugo] Таймаут {method} ({self.timeout} с): {e!r}")
+            return None
+        except Exception as e:
+            self.errors += 1
+            logger.error(f"[Centrifugo] Ошибка отправки {method}: {e!r}")
+            return None
+        finally:
+            elapsed = time.perf_counter() - started
+            self.in_flight -= 1
+            self.time_total += elapsed
+            self.time_max = max(self.time_max, elapsed)
+
+    async def publish(self, channel: str, data: Dict[str, Any]) -> bool:
+        response = await self.call("publish", publish_params(channel, data))
+        return response is not None and response.status_code == 200
+
+    async def send(self, batch: PublishBatch) -> bool | None:
+        """
+        Публикует накопленное одним HTTP-запросом.
+        False — Centrifugo отверг запрос или хотя бы одну команду (повтор не поможет);
+        None — запрос не дошёл или сервер временно недоступен (таймаут, 5xx, 429).
+        """
+        commands = batch.commands()
+        if not commands:
+            return True
+        if len(commands) == 1:
+            [(method, params)] = commands[0].items()
+            response = await self.call(method, params)
+        else:
+            response = await self.call("batch", {"commands": commands})
+        if response is None or response.status_code >= 500 or response.status_code == 429:
+            return None
+        if response.status_code != 200:
+            return False
+
+        try:
+            body = response.json()
+        except ValueError:
+            body = None
+        if not isinstance(body, dict):
+            return True
+        failed = [reply["error"] for reply in body.get("replies") or () if reply.get("error")]
+        if body.get("error"):
+            failed.append(body["error"])
+        if failed:
+            self.errors += 1
+            logger.error(f"[Centrifugo] Ошибки в пакете из {len(commands)} команд: {failed}")
+            return False
+        return True
+
+    async def _trace(self, event_name: str, info: Dict[str, Any]):
+        if event_name == "connection.connect_tcp.complete":
+            self.connections_opened += 1
+
+    def pool_connections(self) -> Dict[str, int]:
+        """Открытые соединения пула (httpcore), если транспорт их показывает"""
+        pool = getattr(getattr(self._client, "_transport", None), "_pool", None)
+        connections = list(getattr(pool, "connections", ()))
+        return {
+            "open": len(connections),
+            "idle": sum(1 for c in connections if c.is_idle()),
+        }
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "url": self.url,
+            "http2": bool(self._client is not None and self.http2 and _h2_available()),
+            "timeout_s": self.timeout,
+            "max_connections": self.max_connections,
+            "requests": self.requests,
+            "errors": self.errors,
+            "timeouts": self.timeouts,
+            "in_flight": self.in_flight,
+            "avg_ms": round(self.time_total * 1000 / self.requests, 3) if self.requests else 0.0,
+            "max_ms": round(self.time_max * 1000, 3),
+            "connections_opened": self.connections_opened,
+            "connections": self.pool_connections(),
+        }
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+centrifugo = CentrifugoClient(
+    settings.CENTRIFUGO_URL,
+    settings.CENTRIFUGO_API_KEY,
+    timeout=settings.CENTRIFUGO_TIMEOUT,
+    max_connections=settings.CENTRIFUGO_MAX_CONNECTIONS,
+    http2=settings.CENTRIFUGO_HTTP2,
+)
@@ -0,0 +1,149 @@
+"""
+Агрегатор обновлений лобби (канал rooms).
+
+На канал rooms подписан каждый клиент в лобби, а new_room / close_room
+публиковались на каждое создание комнаты, вход, выход и конец игры. Пока
+агрегатор запущен, send_msg не публикует эти события, а передаёт их сюда:
+изменения копятся по room_id (последнее побеждает, открытие и закрытие за один
+тик схлопываются в закрытие) и раз в LOBBY_TICK секунд уходят одним событием
+
+    {"event": "lobby", "payload": {"rooms": [<комната>], "removed": [<room_id>]}}
+
+rooms — появившиеся или изменившиеся комнаты (краткая карточка, см. LobbyAggregator.card),
+removed — комнаты, которые нужно убрать из списка. Сообщение ограничено
+LOBBY_MAX_MESSAGE_BYTES: то, что не поместилось, уходит в следующем тике.
+
+Агрегатор работает в каждом процессе приложения и публикует изменения своих
+запросов. Пока он не запущен (LOBBY_TICK=0, тесты, скрипты), new_room и
+close_room публикуются как раньше. Метрики — в GET /admin/centrifugo.
+"""
+import asyncio
+import json
+from contextlib import suppress
+from typing import Any, Awaitable, Callable, Dict
+
+from loguru import logger
+
+from app.config import settings
+
+
+# события канала rooms, которые собирает агрегатор
+LOBBY_EVENTS = ("new_room", "close_room")
+# поля комнаты в карточке лобби
+CARD_FIELDS = ("room_id", "stake", "status", "capacity", "created_at", "speed", "redeal", "dark", "reliable_only")
+
+
+class LobbyAggregator:
+    """Буфер изменений лобби и их публикация раз в тик"""
+
+    def __init__(self, tick: float = 1, max_bytes: int = 16384):
+        self.tick = tick
+        self.max_bytes = max_bytes
+        self.running = False
+        # room_id -> карточка комнаты или None (убрать из лобби); порядок — порядок изменений
+        self._pending: Dict[str, Dict[str, Any] | None] = {}
+        self.received = 0
+        self.coalesced = 0
+        self.messages = 0
+        self.bytes = 0
+        self.deferred = 0
+
+    @staticmethod
+    def card(room: Dict[str, Any]) -> Dict[str, Any]:
+        """Краткая карточка комнаты для лобби: поля CARD_FIELDS и ники игроков"""
+        card = {k: room[k] for k in CARD_FIELDS if k in room}
+        card["players"] = {pid: p.get("nickname") for pid, p in (room.get("players") or {}).items()}
+        return card
+
+    def record(self, event: str, payload: Dict[str, Any]):
+        """Принимает new_room / close_room вместо публикации"""
+        if event == "new_room":
+            room = payload["room"]
+            room_id, card = room["room_id"], self.card(room)
+        else:
+            room_id, card = payload["room_id"], None
+
+        self.received += 1
+        if room_id in self._pending:
+            self.coalesced += 1
+            del self._pending[room_id]
+        self._pending[room_id] = card
+
+    def take(self) -> Dict[str, Any] | None:
+        """
+        Забирает из буфера изменения, которые помещаются в max_bytes
+        (хотя бы одно, иначе буфер не разберётся). None — изменений нет.
+        """
+        if not self._pending:
+            return None
+        payload = {"rooms": [], "removed": []}
+        size = len(json.dumps({"event": "lobby", "payload": payload}))
+        taken = []
+        for room_id, card in self._pending.items():
+            item = card if card is not None else room_id
+            # +2 — разделитель ", " между элементами списка
+            item_size = len(json.dumps(item, ensure_ascii=False).encode()) + 2
+            if taken and size + item_size > self.max_bytes:
+                break
+            size += item_size
+            taken.append(room_id)
+            if card is not None:
+                payload["rooms"].append(card)
+            else:
+                payload["removed"].append(room_id)
+
+        for room_id in taken:
+            del self._pending[room_id]
+        if self._pending:
+            self.deferred += len(self._pending)
+        self.bytes += size
+        return payload
+
+    async def flush(self, publish: Callable[..., Awaitable[Any]]) -> int:
+        """Публикует накопленное одним событием lobby; возвращает число изменений"""
+        payload = self.take()
+        if payload is None:
+            return 0
+        await publish("lobby", payload, channel_name="rooms")
+        self.messages += 1
+        return len(payload["rooms"]) + len(payload["removed"])
+
+    async def run(self, publish: Callable[..., Awaitable[Any]]):
+        """Фоновая задача lifespan: flush раз в tick"""
+        self.running = True
+        logger.info(f"[LOBBY] Агрегатор лобби запущен, тик {self.tick} с")
+        try:
+            while True:
+                await asyncio.sleep(self.tick)
+                try:
+                    await self.flush(publish)
+                except Exception as e:
+                    logger.error(f"[LOBBY] Ошибка публикации обновлений лобби: {e}")
+        finally:
+            self.running = False
+            # остаток буфера — последним сообщением при остановке
+            with suppress(Exception):
+                while await self.flush(publish):
+                    pass
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "running": self.running,
+            "tick": self.tick,
+            "max_bytes": self.max_bytes,
+            "pending": len(self._pending),
+            "received": self.received,
+            "coalesced": self.coalesced,
+            "messages": self.messages,
+            "bytes": self.bytes,
+            "deferred": self.deferred,
+        }
+
+
+lobby = LobbyAggregator(tick=settings.LOBBY_TICK, max_bytes=settings.LOBBY_MAX_MESSAGE_BYTES)
+
+
+async def run_lobby_aggregator():
+    # utils импортирует этот модуль: send_msg берём при запуске
+    from app.game.api.utils import send_msg
+    await lobby.run(send_msg)
@@ -0,0 +1,281 @@
+"""
+Очередь публикаций в Centrifugo (outbox).
+
+Обработчики не ждут Centrifugo: send_msg и @batched_publish кладут сообщения
+в Redis-список outbox:{centrifugo} одним RPUSH и отвечают клиенту. Фоновый
+публикатор забирает их пачками по OUTBOX_BATCH_SIZE и отправляет одним
+вызовом batch.
+
+Порядок. Публикует один процесс — держатель блокировки outbox:{centrifugo}:lock,
+список читается с головы, поэтому сообщения каждого канала уходят в порядке
+постановки, с каких бы экземпляров приложения они ни пришли.
+
+Надёжность. Пачка переносится LMOVE в outbox:{centrifugo}:processing и
+удаляется оттуда только после ответа Centrifugo. Если Centrifugo недоступен,
+пачка повторяется с растущей паузой (до OUTBOX_MAX_BACKOFF), и во время паузы
+блокировка продлевается, чтобы пачку не подхватил другой процесс; если процесс упал,
+следующий держатель блокировки начнёт с неё (доставка «хотя бы один раз»,
+события комнаты клиент узнаёт по id). Команды, отвергнутые Centrifugo, не повторяются.
+
+Размер. Очередь ограничена OUTBOX_MAX_SIZE: при переполнении отбрасываются
+самые старые сообщения; пропущенные события комнаты клиент догонит по журналу.
+Если Redis недоступен при постановке, сообщения ждут в памяти процесса
+(не более OUTBOX_MAX_SIZE) и публикуются им напрямую.
+
+Пока публикатор не запущен (тесты, скрипты), send_msg публикует сразу.
+Метрики — в GET /admin/centrifugo.
+"""
+import asyncio
+import json
+import time
+import uuid
+from collections import deque
+from contextlib import suppress
+from typing import Any, Dict, Iterable, List, Tuple
+
+from loguru import logger
+
+from app.config import settings
+from app.game.api.centrifugo import PublishBatch, centrifugo
+from app.game.redis_dao.keys import OUTBOX, OUTBOX_LOCK, OUTBOX_PROCESSING
+
+
+# сколько живёт блокировка публикатора без продления, с
+LOCK_TTL = 10
+# сколько BLMOVE ждёт новое сообщение; заодно период продления блокировки, с
+POLL_TIMEOUT = 1
+# первая пауза перед повтором недоставленной пачки, с
+BASE_BACKOFF = 0.1
+
+# продление и снятие блокировки, только если её держит этот процесс (сравнение и действие атомарны)
+RENEW_LOCK = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('PEXPIRE', KEYS[1], ARGV[2])
+end
+return 0
+"""
+RELEASE_LOCK = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+class Outbox:
+    """Очередь публикаций: постановка из обработчиков и фоновый публикатор"""
+
+    def __init__(self, max_size: int = 100000, batch_size: int = 100, max_backoff: float = 30, client=None):
+        self.max_size = max_size
+        self.batch_size = batch_size
+        self.max_backoff = max_backoff
+        self.client = client or centrifugo
+        self.running = False
+        self.leader = False
+        self._redis = None
+        self._token = uuid.uuid4().hex
+        self._lock_renewed = 0.0
+        self._fallback: deque = deque(maxlen=max_size)
+        self._wakeup = asyncio.Event()
+        self.enqueued = 0
+        self.published = 0
+        self.rejected = 0
+        self.dropped = 0
+        self.retries = 0
+        self.batches = 0
+        self.spilled = 0
+        self.lag_total = 0.0
+        self.lag_max = 0.0
+
+    async def enqueue(self, messages: Iterable[Tuple[str, Dict[str, Any]]]):
+        """Ставит сообщения (канал, данные) в очередь одним RPUSH"""
+        now = time.time()
+        items = [json.dumps({"channel": c, "data": d, "ts": now}, ensure_ascii=False) for c, d in messages]
+        if not items:
+            return
+        self.enqueued += len(items)
+        self._wakeup.set()
+        try:
+            length = await self._redis.rpush(OUTBOX, *items)
+            if length > self.max_size:
+                await self._redis.ltrim(OUTBOX, -self.max_size, -1)
+                self.dropped += length - self.max_size
+                logger.warning(f"[OUTBOX] Очередь переполнена, отброшено {length - self.max_size} старых сообщений")
+        except Exception as e:
+            logger.error(f"[OUTBOX] Redis недоступен, {len(items)} сообщений ждут в памяти: {e}")
+            overflow = max(0, len(self._fallback) + len(items) - self.max_size)
+            self.dropped += overflow
+            self.spilled += len(items)
+            self._fallback.extend(items)
+
+    async def run(self, redis):
+        """Фоновый публикатор (задача lifespan)"""
+        self._redis = redis
+        self.running = True
+        backoff = 0.0
+        logger.info("[OUTBOX] Публикатор запущен")
+        try:
+            while True:
+                try:
+                    sent = await self._drain_memory()
+                    if sent is not None:
+                        if await self._hold_lock():
+                            sent = await self.drain_once()
+                        else:
+                            await asyncio.sleep(POLL_TIMEOUT)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logger.error(f"[OUTBOX] Ошибка публикатора: {e}")
+                    sent = None
+
+                if sent is None:
+                    self.retries += 1
+                    backoff = min(max(backoff * 2, BASE_BACKOFF), self.max_backoff)
+                    await self._back_off(backoff)
+                else:
+                    backoff = 0.0
+        finally:
+            self.running = False
+            await self._release_lock()
+
+    async def _back_off(self, delay: float):
+        """
+        Пауза перед повтором. Пауза бывает длиннее LOCK_TTL: публикатор продлевает
+        блокировку шагами по LOCK_TTL / 3, иначе пачку из processing подхватит
+        другой процесс и сообщения уйдут дважды.
+        """
+        deadline = time.monotonic() + delay
+        while (remaining := deadline - time.monotonic()) > 0:
+            await asyncio.sleep(min(remaining, LOCK_TTL / 3))
+            if not self.leader:
+                continue
+            try:
+                if not await self._hold_lock():
+                    return
+            except Exception as e:
+                logger.warning(f"[OUTBOX] Не удалось продлить блокировку: {e}")
+
+    async def drain_once(self) -> int | None:
+        """
+        Одна пачка из Redis: число обработанных сообщений (0 — очередь пуста),
+        None — Centrifugo недоступен, пачка осталась в processing.
+        """
+        items = await self._redis.lrange(OUTBOX_PROCESSING, 0, -1)
+        if not items:
+            self._wakeup.clear()
+            started = time.monotonic()
+            first = await self._redis.blmove(OUTBOX, OUTBOX_PROCESSING, POLL_TIMEOUT, "LEFT", "RIGHT")
+            if first is None:
+                # прокси или сервер без блокирующих команд вернул ответ сразу:
+                # ждём остаток интервала или постановку в этом процессе
+                remaining = POLL_TIMEOUT - (time.monotonic() - started)
+                if remaining > 0:
+                    with suppress(asyncio.TimeoutError):
+                        await asyncio.wait_for(self._wakeup.wait(), remaining)
+                return 0
+            items = [first]
+            if self.batch_size > 1:
+                pipe = self._redis.pipeline(transaction=False)
+                for _ in range(self.batch_size - 1):
+                    pipe.lmove(OUTBOX, OUTBOX_PROCESSING, "LEFT", "RIGHT")
+                items += [item for item in await pipe.execute() if item is not None]
+
+        if await self._publish(items) is None:
+            return None
+        await self._redis.delete(OUTBOX_PROCESSING)
+        return len(items)
+
+    async def _drain_memory(self) -> int | None:
+        """Сообщения, не попавшие в Redis, публикуются этим процессом напрямую"""
+        if not self._fallback:
+            return 0
+        items = [self._fallback[i] for i in range(min(self.batch_size, len(self._fallback)))]
+        if await self._publish(items) is None:
+            return None
+        for _ in items:
+            self._fallback.popleft()
+        return len(items)
+
+    async def _publish(self, items: List) -> bool | None:
+        batch = PublishBatch()
+        stamps = []
+        for item in items:
+            message = json.loads(item)
+            batch.add(message["channel"], message["data"])
+            stamps.append(message["ts"])
+
+        result = await self.client.send(batch)
+        if result is None:
+            logger.warning(f"[OUTBOX] Centrifugo недоступен, пачка из {len(items)} сообщений будет повторена")
+            return None
+
+        now = time.time()
+        self.batches += 1
+        self.published += len(items)
+        if result is False:
+            self.rejected += len(items)
+        for ts in stamps:
+            self.lag_total += now - ts
+            self.lag_max = max(self.lag_max, now - ts)
+        return result
+
+    async def _hold_lock(self) -> bool:
+        """Берёт или продлевает блокировку публикатора"""
+        now = time.monotonic()
+        if self.leader and now - self._lock_renewed < LOCK_TTL / 3:
+            return True
+        if await self._redis.eval(RENEW_LOCK, 1, OUTBOX_LOCK, self._token, int(LOCK_TTL * 1000)):
+            self.leader = True
+        else:
+            self.leader = bool(await self._redis.set(OUTBOX_LOCK, self._token, nx=True, ex=LOCK_TTL))
+            if self.leader:
+                logger.info("[OUTBOX] Процесс стал публикатором очереди")
+        self._lock_renewed = now
+        return self.leader
+
+    async def _release_lock(self):
+        if not self.leader:
+            return
+        self.leader = False
+        try:
+            await self._redis.eval(RELEASE_LOCK, 1, OUTBOX_LOCK, self._token)
+        except Exception as e:
+            logger.warning(f"[OUTBOX] Не удалось снять блокировку: {e}")
+
+    async def snapshot(self) -> Dict[str, Any]:
+        queued = processing = None
+        if self._redis is not None:
+            try:
+                queued = await self._redis.llen(OUTBOX)
+                processing = await self._redis.llen(OUTBOX_PROCESSING)
+            except Exception as e:
+                logger.warning(f"[OUTBOX] Не удалось прочитать длину очереди: {e}")
+        return {
+            "running": self.running,
+            "leader": self.leader,
+            "queued": queued,
+            "processing": processing,
+            "in_memory": len(self._fallback),
+            "spilled": self.spilled,
+            "max_size": self.max_size,
+            "enqueued": self.enqueued,
+            "published": self.published,
+            "rejected": self.rejected,
+            "dropped": self.dropped,
+            "retries": self.retries,
+            "batches": self.batches,
+            "avg_lag_ms": round(self.lag_total * 1000 / self.published, 3) if self.published else 0.0,
+            "max_lag_ms": round(self.lag_max * 1000, 3),
+        }
+
+
+outbox = Outbox(
+    max_size=settings.OUTBOX_MAX_SIZE,
+    batch_size=settings.OUTBOX_BATCH_SIZE,
+    max_backoff=settings.OUTBOX_MAX_BACKOFF,
+)
+
+
+async def run_outbox_publisher(redis):
+    await outbox.run(redis)
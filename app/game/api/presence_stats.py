@@ -0,0 +1,153 @@
+"""
+Онлайн по присутствию в Centrifugo.
+
+Счётчик idx:online знает только игроков, сидящих в комнатах, и держит их до
+истечения комнаты. Клиенты Centrifugo видны напрямую: раз в
+PRESENCE_STATS_INTERVAL секунд фоновая задача одним вызовом batch спрашивает
+
+    presence_stats канала лобби rooms  — сколько пользователей в лобби;
+    channels по шаблону room#*         — клиенты в каждом канале комнаты;
+    channels по шаблону spectate#*     — зрители каждой комнаты,
+
+и кладёт итог в память процесса. Эндпоинты (GET /burkozel/online, /burkozel/lobby,
+/admin/statistics) читают готовый снимок и Centrifugo не трогают.
+
+Ставка комнаты берётся из room_id ({stake}_{hex}). Для presence_stats в
+config.json включено присутствие каналов.
+"""
+import asyncio
+import time
+from typing import Any, Dict
+
+from loguru import logger
+
+from app.config import settings
+from app.game.api.centrifugo import centrifugo
+from app.game.redis_dao.events import ROOM_CHANNEL_PREFIX
+
+
+LOBBY_CHANNEL = "rooms"
+# каналы зрителей (spectators.py импортирует этот модуль)
+SPECTATE_CHANNEL_PREFIX = "spectate#"
+
+
+def _reply_result(reply: Dict[str, Any], method: str) -> Dict[str, Any] | None:
+    """Результат команды из ответа batch (поле по имени метода или result)"""
+    if reply.get("error"):
+        return None
+    result = reply.get(method, reply.get("result"))
+    return result if isinstance(result, dict) else None
+
+
+class PresenceStats:
+    """Кэш онлайна из Centrifugo: лобби, комнаты, ставки, зрители"""
+
+    def __init__(self, interval: float = 10, client=None):
+        self.interval = interval
+        self.client = client or centrifugo
+        self.running = False
+        self._stats: Dict[str, Any] = {
+            "lobby_users": None,
+            "lobby_clients": None,
+            "in_game": None,
+            "rooms": None,
+            "by_stake": {},
+            "spectators": None,
+            "updated_at": None,
+        }
+        # room_id -> зрители; отдельно от снимка, чтобы не раздувать ответы эндпоинтов
+        self._spectators: Dict[str, int] = {}
+        self.refreshes = 0
+        self.failures = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Последний снимок; updated_at=None — данных из Centrifugo ещё нет"""
+        return self._stats
+
+    def spectators(self, room_id: str) -> int:
+        """Зрители комнаты по последнему опросу"""
+        return self._spectators.get(room_id, 0)
+
+    async def refresh(self) -> bool:
+        """Один опрос Centrifugo; при ошибке остаётся прежний снимок"""
+        response = await self.client.call("batch", {"commands": [
+            {"presence_stats": {"channel": LOBBY_CHANNEL}},
+            {"channels": {"pattern": f"{ROOM_CHANNEL_PREFIX}*"}},
+            {"channels": {"pattern": f"{SPECTATE_CHANNEL_PREFIX}*"}},
+        ]})
+        try:
+            if response is None or response.status_code != 200:
+                raise ValueError(f"ответ {response.status_code if response is not None else 'не получен'}")
+            replies = response.json().get("replies") or []
+            if len(replies) != 3:
+                raise ValueError(f"ожидалось 3 ответа в batch, получено {len(replies)}")
+            lobby = _reply_result(replies[0], "presence_stats")
+            channels = _reply_result(replies[1], "channels")
+            watched = _reply_result(replies[2], "channels")
+            if lobby is None or channels is None or watched is None:
+                raise ValueError(f"ошибка команды: {replies}")
+        except ValueError as e:
+            self.failures += 1
+            logger.warning(f"[PRESENCE] Не удалось обновить онлайн: {e}")
+            return False
+
+        by_stake: Dict[str, int] = {}
+        in_game = rooms = 0
+        for channel, info in (channels.get("channels") or {}).items():
+            clients = info.get("num_clients", 0)
+            if not clients:
+                continue
+            rooms += 1
+            in_game += clients
+            stake = channel[len(ROOM_CHANNEL_PREFIX):].split("_", 1)[0]
+            by_stake[stake] = by_stake.get(stake, 0) + clients
+
+        spectators = {
+            channel[len(SPECTATE_CHANNEL_PREFIX):]: info.get("num_clients", 0)
+            for channel, info in (watched.get("channels") or {}).items()
+            if info.get("num_clients")
+        }
+
+        self._spectators = spectators
+        self._stats = {
+            "lobby_users": lobby.get("num_users", 0),
+            "lobby_clients": lobby.get("num_clients", 0),
+            "in_game": in_game,
+            "rooms": rooms,
+            "by_stake": dict(sorted(by_stake.items(), key=lambda item: int(item[0]) if item[0].isdigit() else 0)),
+            "spectators": sum(spectators.values()),
+            "updated_at": time.time(),
+        }
+        self.refreshes += 1
+        return True
+
+    async def run(self):
+        """Фоновая задача lifespan: refresh раз в interval"""
+        self.running = True
+        logger.info(f"[PRESENCE] Опрос онлайна в Centrifugo раз в {self.interval} с")
+        try:
+            while True:
+                try:
+                    await self.refresh()
+                except Exception as e:
+                    self.failures += 1
+                    logger.error(f"[PRESENCE] Ошибка опроса онлайна: {e}")
+                await asyncio.sleep(self.interval)
+        finally:
+            self.running = False
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "running": self.running,
+            "interval": self.interval,
+            "refreshes": self.refreshes,
+            "failures": self.failures,
+            **self._stats,
+        }
+
+
+presence_stats = PresenceStats(interval=settings.PRESENCE_STATS_INTERVAL)
+
+
+async def run_presence_stats():
+    await presence_stats.run()
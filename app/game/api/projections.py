@@ -0,0 +1,144 @@
+"""
+Представления комнаты для зрителей.
+
+Комната в Redis хранит всё: колоду, руки и токены игроков. Наружу она уходит
+только через представления:
+    public  — без колоды и рук: deck_count и hand_count вместо карт, без токенов;
+    private — public плюс собственные рука и токен игрока.
+
+Представления строятся один раз на содержимое комнаты — для всех мест сразу —
+и хранятся в LRU процесса, поэтому публикация и GET /burkozel/room/{room_id}?tg_id=
+не собирают их заново. Ключ — хэш комнаты в JSON, а не room["rev"]: два процесса,
+сохранившие комнату с одной версии, получают одинаковый rev при разном
+содержимом, а изменённая, но ещё не сохранённая комната — прежний rev.
+Возвращаемые словари общие для всех запросов: менять их нельзя.
+
+Для GET /burkozel/room/{room_id} представление кодируется в JSON тоже один раз
+(RoomViews.encoded), а вместе с ним запоминается значение комнаты из Redis:
+пока оно не изменилось, комната не декодируется вовсе (views_for_raw).
+Карточка лобби (RoomViews.encoded_card) строится из публичного представления.
+"""
+import hashlib
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Tuple
+
+import orjson
+
+from app.game.api.lobby import LobbyAggregator
+
+# поля игрока, которые видит только он сам
+PRIVATE_PLAYER_FIELDS = ("hand", "token")
+
+
+class RoomViews:
+    """Публичное и личные представления одной версии комнаты"""
+
+    __slots__ = ("public", "private", "_encoded", "_card")
+
+    def __init__(self, room: Dict[str, Any]):
+        players = room.get("players") or {}
+        public_players = {}
+        for pid, pdata in players.items():
+            public_player = {k: v for k, v in pdata.items() if k not in PRIVATE_PLAYER_FIELDS}
+            public_player["hand_count"] = len(pdata.get("hand") or [])
+            public_players[pid] = public_player
+
+        self.public = {k: v for k, v in room.items() if k not in ("deck", "players")}
+        self.public["deck_count"] = len(room.get("deck") or [])
+        self.public["players"] = public_players
+
+        self.private = {}
+        for pid, pdata in players.items():
+            own = dict(public_players[pid])
+            own.update({k: pdata[k] for k in PRIVATE_PLAYER_FIELDS if k in pdata})
+            self.private[pid] = {**self.public, "players": {**public_players, pid: own}}
+        self._encoded: Dict[str | None, bytes] = {}
+        self._card: bytes | None = None
+
+    def for_viewer(self, tg_id=None) -> Dict[str, Any]:
+        """Личное представление игрока комнаты, иначе публичное"""
+        if tg_id is None:
+            return self.public
+        return self.private.get(str(tg_id), self.public)
+
+    def encoded(self, tg_id=None) -> bytes:
+        """for_viewer в JSON; кодируется один раз на зрителя"""
+        key = str(tg_id) if tg_id is not None and str(tg_id) in self.private else None
+        body = self._encoded.get(key)
+        if body is None:
+            body = orjson.dumps(self.for_viewer(key), option=orjson.OPT_NON_STR_KEYS)
+            self._encoded[key] = body
+        return body
+
+    def encoded_card(self) -> bytes:
+        """Карточка лобби в JSON — та же, что в событии lobby (LobbyAggregator.card)"""
+        if self._card is None:
+            self._card = orjson.dumps(LobbyAggregator.card(self.public), option=orjson.OPT_NON_STR_KEYS)
+        return self._card
+
+
+def content_hash(room: Dict[str, Any]) -> bytes:
+    """Ключ кэша представлений: хэш комнаты в JSON"""
+    return hashlib.blake2b(orjson.dumps(room, option=orjson.OPT_NON_STR_KEYS), digest_size=16).digest()
+
+
+class ProjectionCache:
+    """LRU представлений: room_id -> (хэш содержимого, RoomViews, значение из Redis или None)"""
+
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self._views: "OrderedDict[str, Tuple[Any, RoomViews, Any]]" = OrderedDict()
+        self.hits = 0
+        self.raw_hits = 0
+        self.builds = 0
+
+    def views(self, room: Dict[str, Any]) -> RoomViews:
+        room_id = room.get("room_id")
+        version = content_hash(room)
+        cached = self._views.get(room_id)
+        if cached is not None and cached[0] == version:
+            self._views.move_to_end(room_id)
+            self.hits += 1
+            return cached[1]
+
+        self.builds += 1
+        views = RoomViews(room)
+        self._views[room_id] = (version, views, None)
+        self._views.move_to_end(room_id)
+        while len(self._views) > self.maxsize:
+            self._views.popitem(last=False)
+        return views
+
+    def views_for_raw(self, room_id: str, raw, loads: Callable[[Any], Dict[str, Any]]) -> RoomViews:
+        """
+        Представления по значению комнаты из Redis: то же значение, что в прошлый
+        раз, — без декодирования, иначе loads(raw) и обычный поиск по версии.
+        Бросает ValueError, если значение не декодируется.
+        """
+        cached = self._views.get(room_id)
+        if cached is not None and cached[2] is not None and cached[2] == raw:
+            self._views.move_to_end(room_id)
+            self.hits += 1
+            self.raw_hits += 1
+            return cached[1]
+
+        room = loads(raw)
+        views = self.views(room)
+        version, cached_views, _ = self._views[room.get("room_id")]
+        if cached_views is views:
+            self._views[room.get("room_id")] = (version, views, raw)
+        return views
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {"size": len(self._views), "hits": self.hits, "raw_hits": self.raw_hits, "builds": self.builds}
+
+
+projections = ProjectionCache()
+
+
+def public_view(room: Dict[str, Any]) -> Dict[str, Any]:
+    return projections.views(room).public
+
+
+def viewer_view(room: Dict[str, Any], tg_id) -> Dict[str, Any]:
+    return projections.views(room).for_viewer(tg_id)
@@ -0,0 +1,194 @@
+"""
+Сборщик истёкших комнат.
+
+Срок жизни комнаты отсчитывает теневой ключ room:{id}:expiry, а сама комната
+room:{id} живёт ещё ROOM_EXPIRY_GRACE секунд. Когда теневой ключ истекает,
+Redis присылает событие expired, и сборщик закрывает комнату как положено:
+расчёт ставок идущей партии, событие close_room в лобби, room_expired в канал
+комнаты, удаление комнаты из реестра и счётчика онлайна.
+
+События истечения требуют notify-keyspace-events Ex. Сборщик пытается
+включить их сам (CONFIG SET); на управляемых Redis, где CONFIG запрещён,
+параметр нужно задать в настройках сервера.
+
+В Redis Cluster события keyspace публикуются только на узле, где лежит ключ,
+поэтому сборщик подписывается на каждый мастер-узел отдельно (listeners).
+"""
+import asyncio
+from typing import Any, Dict, Iterable
+
+from loguru import logger
+from redis.exceptions import ResponseError
+
+from app.config import settings
+from app.database import async_session_maker
+from app.game.api.room_locks import room_locks
+from app.game.api.utils import batched_publish, send_msg
+from app.game.redis_dao.keys import (
+    REGISTRY,
+    room_key,
+    room_expiry_key,
+    room_reaping_key,
+    parse_room_expiry_key,
+    decode_key,
+)
+from app.game.redis_dao.redis_room_dao import RoomRedisDAO
+from app.payments.dao import TransactionDAO
+
+
+EXPIRED_EVENTS = "__keyevent@*__:expired"
+REAPING_LOCK_TTL = 60
+RECONNECT_DELAY = 5
+
+
+async def enable_expiry_events(redis) -> bool:
+    """Включает уведомления об истечении ключей (флаги E и x), не сбрасывая уже заданные"""
+    try:
+        current = await redis.config_get("notify-keyspace-events")
+        flags = decode_key(current.get("notify-keyspace-events", ""))
+        if "E" in flags and ("x" in flags or "A" in flags):
+            return True
+        await redis.config_set("notify-keyspace-events", "".join(sorted(set(flags + "Ex"))))
+        return True
+    except ResponseError as e:
+        logger.warning(
+            f"[REAPER] Не удалось включить notify-keyspace-events: {e}. "
+            f"Задайте 'notify-keyspace-events Ex' в настройках Redis"
+        )
+        return False
+
+
+async def settle_expired_room(room: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Расчёт ставок партии, прерванной истечением комнаты.
+    refund — партия отменяется; ставки не замораживаются при входе,
+    поэтому возвращать нечего и балансы не меняются.
+    settle — побеждает игрок с наименьшим штрафом, остальные проигрывают ставку.
+    """
+    policy = settings.ROOM_EXPIRY_SETTLEMENT
+    players = room.get("players", {})
+    if policy != "settle" or len(players) < 2:
+        return {"policy": "refund", "winner": None, "losers": [], "balances": None}
+
+    ranking = sorted(
+        players,
+        key=lambda pid: (players[pid].get("penalty", 0), -players[pid].get("round_score", 0)),
+    )
+    winner, losers = ranking[0], ranking[1:]
+
+    async with async_session_maker() as session:
+        dao = TransactionDAO(session)
+        if len(losers) == 1:
+            balances = await dao.apply_game_result(
+                winner_id=int(winner), loser_id=int(losers[0]), stake=room["stake"]
+            )
+        else:
+            balances = await dao.apply_game_result_multiplayer(
+                winner_id=int(winner), loser_ids=[int(lid) for lid in losers], stake=room["stake"]
+            )
+        await session.commit()
+
+    return {"policy": "settle", "winner": winner, "losers": losers, "balances": balances}
+
+
+@room_locks.serialized(lambda a: a["room_id"])
+@batched_publish
+async def reap_room(redis, room_id: str) -> bool:
+    """Закрывает истёкшую комнату. Возвращает False, если её закрыл кто-то другой."""
+    # событие получают все экземпляры приложения — комнату закрывает один
+    if not await redis.set(room_reaping_key(room_id), 1, nx=True, ex=REAPING_LOCK_TTL):
+        return False
+    # комнату успели сохранить заново после истечения — она жива
+    if await redis.exists(room_expiry_key(room_id)):
+        await redis.delete(room_reaping_key(room_id))
+        return False
+
+    room = await room_locks.load(redis, room_id)
+    logger.info(f"[REAPER] Комната {room_id} истекла (status={room.get('status') if room else None})")
+
+    if room and room.get("status") == "playing":
+        try:
+            result = await settle_expired_room(room)
+        except Exception as e:
+            logger.error(f"[REAPER] Ошибка расчёта ставок комнаты {room_id}: {e}")
+            result = {"policy": "refund", "winner": None, "losers": [], "balances": None}
+        await send_msg(
+            "game_over",
+            {"room_id": room_id, "reason": "expired", "stake": room["stake"], **result},
+            channel_name=f"room#{room_id}",
+        )
+
+    # до удаления: запись в журнале комнаты удалится вместе с ним, а не создаст его заново
+    await send_msg("room_expired", {"room_id": room_id}, channel_name=f"room#{room_id}")
+    await RoomRedisDAO.delete(redis, room_id, room)
+
+    await send_msg("close_room", {"room_id": room_id}, channel_name="rooms")
+    return True
+
+
+async def sweep_expired_rooms(redis, batch_size: int = 500) -> int:
+    """
+    Закрывает комнаты, чьё событие истечения пропущено (например, приложение
+    было остановлено): теневого ключа уже нет, а комната доживает grace-период.
+    """
+    grace_ms = settings.ROOM_EXPIRY_GRACE * 1000
+    reaped = 0
+    room_ids = []
+
+    async def check(batch):
+        pipe = redis.pipeline(transaction=False)
+        for room_id in batch:
+            pipe.exists(room_expiry_key(room_id))
+            pipe.pttl(room_key(room_id))
+        replies = await pipe.execute()
+        done = 0
+        for room_id, has_shadow, pttl in zip(batch, replies[::2], replies[1::2]):
+            if not has_shadow and 0 < pttl <= grace_ms:
+                done += await reap_room(redis, room_id)
+        return done
+
+    async for member, _ in redis.zscan_iter(REGISTRY, count=batch_size):
+        room_ids.append(decode_key(member))
+        if len(room_ids) >= batch_size:
+            reaped += await check(room_ids)
+            room_ids = []
+    if room_ids:
+        reaped += await check(room_ids)
+    return reaped
+
+
+async def run_room_reaper(redis, listeners: Iterable | None = None):
+    """
+    Фоновая задача для lifespan: слушает события истечения, переподключается при ошибках
+    (в том числе если Redis недоступен при старте).
+    listeners — клиенты узлов, на которых слушать события (по умолчанию сам redis);
+    комнаты закрываются через redis.
+    """
+    listeners = list(listeners) if listeners is not None else [redis]
+    await asyncio.gather(*(_listen_expired(redis, listener) for listener in listeners))
+
+
+async def _listen_expired(redis, listener):
+    while True:
+        pubsub = listener.pubsub(ignore_subscribe_messages=True)
+        try:
+            # при каждом подключении: Redis мог быть недоступен при старте или перезапуститься
+            await enable_expiry_events(listener)
+            await pubsub.psubscribe(EXPIRED_EVENTS)
+            # пока подписки не было, события могли потеряться
+            await sweep_expired_rooms(redis)
+            async for message in pubsub.listen():
+                room_id = parse_room_expiry_key(decode_key(message["data"]))
+                if not room_id:
+                    continue
+                try:
+                    await reap_room(redis, room_id)
+                except Exception as e:
+                    logger.error(f"[REAPER] Не удалось закрыть комнату {room_id}: {e}")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"[REAPER] Подписка на события истечения прервана: {e}")
+            await asyncio.sleep(RECONNECT_DELAY)
+        finally:
+            await pubsub.aclose()
@@ -0,0 +1,25 @@
+"""
+Ответы API в JSON без лишних преобразований.
+
+Класс ответа по умолчанию — ORJSONResponse (main.py): тело кодирует orjson.
+Эндпоинты чтения, у которых тело уже готово, отдают его как есть (RawJSONResponse):
+    GET /burkozel/room/{room_id} — представление, закодированное один раз на версию
+                                   комнаты и зрителя (projections.py);
+    GET /burkozel/lobby          — карточки комнат, закодированные один раз на версию
+                                   комнаты из публичного представления.
+Значения room:{id} из Redis наружу не отдаются: в них колода, руки и токены игроков.
+"""
+from typing import Any
+
+import orjson
+from fastapi.responses import Response
+
+
+class RawJSONResponse(Response):
+    """Ответ с готовым JSON (bytes)"""
+
+    media_type = "application/json"
+
+
+def dumps(obj: Any) -> bytes:
+    return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
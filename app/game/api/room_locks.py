@@ -0,0 +1,141 @@
+"""
+Порядок запросов к одной комнате внутри процесса.
+
+Двойное нажатие, повтор запроса, ready наперегонки с leave — параллельные
+запросы к одной комнате раньше читали её каждый сам и записывали вперемешку:
+последняя запись затирала предыдущую. Теперь обработчики, которые меняют
+комнату (ready, move, leave, join_room, clear_room, сборщик истёкших комнат),
+выполняются под asyncio.Lock комнаты: второй запрос ждёт, пока первый сохранит
+комнату и опубликует события, и читает уже новую версию. find_player занимает
+место в найденной ожидающей комнате тоже под её блокировкой, перечитав комнату.
+
+Блокировки хранятся по слабым ссылкам: блокировка живёт, пока её держит или
+ждёт хотя бы один запрос, и реестр не растёт с числом комнат. Повторный вход
+в ту же комнату из обработчика под блокировкой не ждёт сам себя.
+
+Загрузка комнаты (load) совместная: параллельные чтения одной комнаты ждут
+один GET и одно декодирование. Результат общий — менять его нельзя, поэтому
+обработчик под блокировкой комнаты получает свою копию: представления
+(projections.py) и очередь зрителей держат ссылки на вложенные словари комнаты.
+Загрузка, начатая до записи, после записи новым читателям не достаётся.
+load_raw — то же для значения комнаты без декодирования (отдача без разбора).
+
+Между процессами порядок по-прежнему решает Redis: блокировка — только в процессе.
+"""
+import asyncio
+import contextlib
+import functools
+import inspect
+import weakref
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Dict, FrozenSet, Tuple
+
+from app.game.redis_dao.redis_room_dao import RoomRedisDAO
+
+
+# комнаты, блокировки которых держит текущий запрос
+_held: ContextVar[FrozenSet[str]] = ContextVar("room_locks_held", default=frozenset())
+
+
+class RoomLocks:
+    """Реестр блокировок комнат и совместная загрузка комнаты"""
+
+    def __init__(self):
+        self._locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
+        # (вид, room_id) -> задача загрузки, которую ждут все читатели
+        self._flights: Dict[Tuple[str, str], asyncio.Future] = {}
+        self.acquired = 0
+        self.contended = 0
+        self.loads = 0
+        self.shared = 0
+
+    def lock(self, room_id: str) -> asyncio.Lock:
+        lock = self._locks.get(room_id)
+        if lock is None:
+            lock = asyncio.Lock()
+            self._locks[room_id] = lock
+        return lock
+
+    @contextlib.asynccontextmanager
+    async def hold(self, room_id: str):
+        """Выполняет блок под блокировкой комнаты"""
+        held = _held.get()
+        if room_id in held:
+            yield
+            return
+
+        lock = self.lock(room_id)
+        if lock.locked():
+            self.contended += 1
+        async with lock:
+            self.acquired += 1
+            token = _held.set(held | {room_id})
+            try:
+                yield
+            finally:
+                _held.reset(token)
+                # комната могла измениться: следующие читатели загрузят её заново
+                self._flights.pop(("room", room_id), None)
+                self._flights.pop(("raw", room_id), None)
+
+    def serialized(self, room_id_of: Callable[[Dict[str, Any]], str]):
+        """
+        Декоратор обработчика: весь вызов — под блокировкой комнаты.
+        room_id_of получает аргументы вызова по именам и возвращает room_id.
+        Ставится над @batched_publish, чтобы события уходили до следующего запроса.
+        """
+        def decorator(func):
+            signature = inspect.signature(func)
+
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                room_id = room_id_of(signature.bind_partial(*args, **kwargs).arguments)
+                async with self.hold(room_id):
+                    return await func(*args, **kwargs)
+
+            return wrapper
+
+        return decorator
+
+    async def load(self, redis, room_id: str) -> Dict[str, Any] | None:
+        """Комната или None; под блокировкой комнаты — своя копия для изменения"""
+        if room_id in _held.get():
+            self.loads += 1
+            return await RoomRedisDAO.get(redis, room_id)
+        return await self._shared(("room", room_id), lambda: RoomRedisDAO.get(redis, room_id))
+
+    async def load_raw(self, redis, room_id: str) -> bytes | str | None:
+        """Значение комнаты из Redis без декодирования или None"""
+        return await self._shared(("raw", room_id), lambda: RoomRedisDAO.get_raw(redis, room_id))
+
+    async def _shared(self, key: Tuple[str, str], fetch: Callable[[], Awaitable[Any]]):
+        flight = self._flights.get(key)
+        if flight is None:
+            self.loads += 1
+            flight = asyncio.ensure_future(fetch())
+            self._flights[key] = flight
+            flight.add_done_callback(functools.partial(self._landed, key))
+        else:
+            self.shared += 1
+        # отмена одного читателя не отменяет загрузку для остальных
+        return await asyncio.shield(flight)
+
+    def _landed(self, key: Tuple[str, str], flight: asyncio.Future):
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+        if not flight.cancelled():
+            # ошибку получат ожидающие; без них asyncio не должен ругаться на неё
+            flight.exception()
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "locks": len(self._locks),
+            "loading": len(self._flights),
+            "acquired": self.acquired,
+            "contended": self.contended,
+            "loads": self.loads,
+            "shared": self.shared,
+        }
+
+
+room_locks = RoomLocks()
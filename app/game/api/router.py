@@ -1,5 +1,4 @@
 # import json
-import json
 import uuid
 from datetime import datetime
 import random
@@ -9,19 +8,49 @@ from fastapi import APIRouter, Depends, HTTPException, Body, Query
 from loguru import logger
 
 from app.database import SessionDep
+from app.exception import RoomIsFullException
+from app.game.api.presence_stats import presence_stats
+from app.game.api.projections import projections, public_view, viewer_view
+from app.game.api.responses import RawJSONResponse, dumps
+from app.game.api.room_locks import room_locks
 from app.game.api.schemas import FindPartnerResponse, FindPartnerRequest, ReadyResponse, ReadyRequest, MoveRequest
-from app.game.api.utils import send_msg, get_all_rooms, _is_waiting, card_points, can_beat, can_defend_all
+from app.game.api.spectators import spectators
+from app.game.api.utils import send_msg, batched_publish, next_seq, move_delta, get_all_rooms, _is_waiting, card_points, can_beat, can_defend_all
 from app.game.core.burkozel import Burkozel
 from app.game.core.constants import CARDS_IN_HAND_MAX, DECK, NAME_TO_VALUE
 # from app.game.core.burkozel import Durak
 from app.game.redis_dao.custom_redis import CustomRedis
+from app.game.redis_dao.events import RoomEventsDAO
+from app.game.redis_dao.keys import NAMESPACES, ROOM_STATUSES
 from app.game.redis_dao.manager import get_redis
+from app.game.redis_dao.redis_room_dao import RoomRedisDAO
 from app.payments.dao import TransactionDAO
 from app.users.dao import UserDAO
 
 router = APIRouter(prefix="/burkozel", tags=["Burkozel"])
 
 
+def _public_rooms(rooms) -> List[Dict[str, Any]]:
+    """Комнаты без колоды, рук и токенов; id из get_rooms_by_bet сохраняется (в копии — представления общие)"""
+    return [{**public_view(r), "id": r["id"]} if "id" in r else public_view(r) for r in rooms]
+
+
+def _already_seated(room: dict) -> HTTPException:
+    return HTTPException(status_code=400, detail=f"Игрок уже в комнате {room['room_id']}")
+
+
+def _matches(room: dict, req: FindPartnerRequest) -> bool:
+    """Ожидающая комната с теми же режимами и вместимостью, что в запросе"""
+    return (
+        room.get("status") == "waiting"
+        and room.get("capacity", 2) == max(2, min(3, req.capacity))
+        and room.get("speed", "normal") == req.speed
+        and bool(room.get("redeal", False)) == bool(req.redeal)
+        and bool(room.get("dark", False)) == bool(req.dark)
+        and bool(room.get("reliable_only", False)) == bool(req.reliable_only)
+    )
+
+
 @router.post("/find_player", response_model=FindPartnerResponse)
 async def find_players(
     req: FindPartnerRequest,
@@ -45,41 +74,19 @@ async def find_players(
     if user.balance < req.stake:
         raise HTTPException(status_code=400, detail="Недостаточно средств для игры")
 
-    keys = await redis.keys(f"{req.stake}_*")
-    room = None
-
-    if keys:
-        for key in keys:
-            raw = await redis.get(key)
-            if raw:
-                room_data = json.loads(raw)
-                # Матчим только ожидающие комнаты с совпадающими режимами и вместимостью
-                if room_data.get("status") == "waiting":
-                    if room_data.get("capacity", 2) != max(2, min(3, req.capacity)):
-                        continue
-                    if room_data.get("speed", "normal") != req.speed:
-                        continue
-                    if bool(room_data.get("redeal", False)) != bool(req.redeal):
-                        continue
-                    if bool(room_data.get("dark", False)) != bool(req.dark):
-                        continue
-                    if bool(room_data.get("reliable_only", False)) != bool(req.reliable_only):
-                        continue
-                    room = room_data
-                    break
-
-    if room:  # нашли подходящую комнату
-        room_id = room["room_id"]
+    # Срез реестра отдаёт только ожидающие комнаты этой ставки, от старых к новым.
+    # Кандидат из среза мог уже заполниться: место занимаем под блокировкой комнаты,
+    # перечитав её, а если мест нет — пробуем следующую или создаём новую.
+    for candidate in await RoomRedisDAO.get_by_stake(redis, req.stake, status="waiting"):
+        if not _matches(candidate, req):
+            continue
+        room_id = candidate["room_id"]
         # проверка на повторное подключение
-        if str(req.tg_id) in room.get("players", {}):
+        if str(req.tg_id) in candidate.get("players", {}):
             raise HTTPException(status_code=400, detail="Игрок уже в комнате")
 
-        # проверка лимита вместимости
-        if len(room.get("players", {})) >= room.get("capacity", 2):
-            raise HTTPException(status_code=400, detail="Комната уже заполнена")
-        
         # проверка надежности для reliable_only комнат
-        if room.get("reliable_only", False):
+        if candidate.get("reliable_only", False):
             from app.game.api.reliability import check_player_reliability
             is_reliable = await check_player_reliability(session, req.tg_id)
             if not is_reliable:
@@ -88,18 +95,34 @@ async def find_players(
                     detail="Эта комната только для надежных игроков. У вас более 2 ливов за последние 10 игр"
                 )
 
-        room["players"][str(req.tg_id)] = {
-            "nickname": req.nickname,
-            "is_ready": False,
-        }
-        room["status"] = "matched" if len(room["players"]) >= room.get("capacity", 2) else "waiting"
-        await redis.setex(room_id, 3600, json.dumps(room))
+        async with room_locks.hold(room_id):
+            room = await room_locks.load(redis, room_id)
+            if not room or not _matches(room, req):
+                continue
+            if str(req.tg_id) in room.get("players", {}):
+                raise HTTPException(status_code=400, detail="Игрок уже в комнате")
+            # проверка лимита вместимости
+            if len(room.get("players", {})) >= room.get("capacity", 2):
+                continue
+
+            room["players"][str(req.tg_id)] = {
+                "nickname": req.nickname,
+                "is_ready": False,
+            }
+            room["status"] = "matched" if len(room["players"]) >= room.get("capacity", 2) else "waiting"
+            try:
+                seated = await RoomRedisDAO.seat_player(redis, req.tg_id, room_id, room)
+            except RoomIsFullException:
+                # комнату заполнили из другого процесса — ищем дальше
+                continue
+            if seated:
+                raise _already_seated(seated)
 
-        await send_msg(
-            event="close_room",
-            payload={"room_id": room_id},
-            channel_name="rooms"
-        )
+            await send_msg(
+                event="close_room",
+                payload={"room_id": room_id},
+                channel_name="rooms"
+            )
 
         opponent = next(
             p["nickname"] for uid, p in room["players"].items() if int(uid) != req.tg_id
@@ -148,14 +171,16 @@ async def find_players(
             }
         },
     }
-    await redis.setex(room_id, 3600, json.dumps(room_data))
+    seated = await RoomRedisDAO.seat_player(redis, req.tg_id, room_id, room_data)
+    if seated:
+        raise _already_seated(seated)
     logger.info(f"Создана новая комната {room_id} пользователем {req.tg_id}")
 
     # после создания новой комнаты
     await send_msg(
         "new_room",
         {
-            "room": room_data
+            "room": public_view(room_data)
         },
         channel_name="rooms",  # общий канал для всех игроков
     )
@@ -174,13 +199,14 @@ async def find_players(
 
 
 @router.post("/ready")
+@room_locks.serialized(lambda a: a["req"].room_id)
+@batched_publish
 async def ready(req: ReadyRequest, redis=Depends(get_redis)):
     logger.info(f"[READY] tg_id={req.tg_id}, room_id={req.room_id}")
 
-    raw = await redis.get(req.room_id)
-    if not raw:
+    room = await room_locks.load(redis, req.room_id)
+    if not room:
         raise HTTPException(status_code=404, detail="Комната не найдена")
-    room = json.loads(raw)
 
     players = room.get("players", {})
     player = players.get(str(req.tg_id))
@@ -189,7 +215,7 @@ async def ready(req: ReadyRequest, redis=Depends(get_redis)):
 
     player["is_ready"] = True
     room["players"] = players
-    await redis.setex(req.room_id, 3600, json.dumps(room))
+    await RoomRedisDAO.save(redis, req.room_id, room)
 
     # если все готовы → старт
     if all(p["is_ready"] for p in players.values()) and "deck" not in room:
@@ -265,7 +291,8 @@ async def ready(req: ReadyRequest, redis=Depends(get_redis)):
             "current_turn_idx": 0,  # индекс текущего хода
             "status": "playing"
         })
-        await redis.setex(req.room_id, 3600, json.dumps(room))
+        next_seq(room)
+        await RoomRedisDAO.save(redis, req.room_id, room)
 
         for tg_id, pdata in players.items():
             await send_msg(
@@ -283,6 +310,7 @@ async def ready(req: ReadyRequest, redis=Depends(get_redis)):
             "game_start",
             {
                 "room_id": req.room_id,
+                "seq": room["seq"],
                 "trump": trump,
                 "deck_count": len(deck),
                 "attacker": room["attacker"],
@@ -290,12 +318,15 @@ async def ready(req: ReadyRequest, redis=Depends(get_redis)):
             },
             channel_name=f"room#{req.room_id}",
         )
+        await spectators.push(room, "game_start")
 
     return {"ok": True}
 
 
 
 @router.post("/move")
+@room_locks.serialized(lambda a: a["req"].room_id)
+@batched_publish
 async def move(
     session: SessionDep,
     req: MoveRequest,
@@ -314,10 +345,9 @@ async def move(
     """
     logger.info(f"[MOVE] room_id={req.room_id}, tg_id={req.tg_id}, cards={req.cards}")
 
-    raw = await redis.get(req.room_id)
-    if not raw:
+    room = await room_locks.load(redis, req.room_id)
+    if not room:
         raise HTTPException(status_code=404, detail="Комната не найдена")
-    room = json.loads(raw)
 
     players = room["players"]
     field = room["field"]
@@ -386,6 +416,9 @@ async def move(
     
     room["turns"] = turns
     room["current_turn_idx"] = current_turn_idx + 1
+    # изменения хода для события move
+    trick = None
+    drawn = {}
     
     logger.info(f"[MOVE] Игрок {req.tg_id} выложил {cards}. Всего ходов: {len(turns)}")
     
@@ -445,6 +478,7 @@ async def move(
         room["turns"] = []
         room["current_turn_idx"] = 0
         winner = winner_id
+        trick = {"winner": winner_id, "points": points, "turns": turns}
         
         # Обновляем players в room перед проверкой завершения игры
         room["players"] = players
@@ -568,8 +602,9 @@ async def move(
                         },
                         channel_name=f"room#{req.room_id}",
                     )
+                    await spectators.push(room, "game_over", winner=game_winner, losers=losers, results=game_results)
 
-                    await redis.unlink(req.room_id)
+                    await RoomRedisDAO.delete(redis, req.room_id, room)
 
                     await send_msg(
                         event="close_room",
@@ -595,6 +630,7 @@ async def move(
                         event="players_out",
                         payload={
                             "room_id": req.room_id,
+                            "seq": next_seq(room),
                             "losers": losers,
                             "remaining": list(remaining_players.keys()),
                             "last_turn": room["last_turn"],
@@ -640,14 +676,28 @@ async def move(
                         "current_turn_idx": 0,
                         "status": "playing"
                     })
-
-                    await redis.setex(req.room_id, 3600, json.dumps(room))
+                    next_seq(room)
+
+                    await RoomRedisDAO.save(redis, req.room_id, room)
+                    # новые руки — только владельцам, в reshuffle — публичное представление
+                    for pid in active_players:
+                        await send_msg(
+                            "hand",
+                            {
+                                "hand": players[pid]["hand"],
+                                "trump": trump,
+                                "deck_count": len(deck),
+                                "attacker": room["attacker"],
+                            },
+                            channel_name=f"user#{pid}",
+                        )
                     await send_msg(
                         "reshuffle",
-                        {"room": room, "trump": trump, "deck_count": len(deck), "last_turn": room["last_turn"]},
+                        {"room": public_view(room), "seq": room["seq"], "trump": trump, "deck_count": len(deck), "last_turn": room["last_turn"]},
                         channel_name=f"room#{req.room_id}",
                     )
-                    return {"ok": True, "message": "Колода пересдана, новая партия", "room": room}
+                    await spectators.push(room, "reshuffle")
+                    return {"ok": True, "message": "Колода пересдана, новая партия", "room": viewer_view(room, req.tg_id)}
             
             # Пересдаём партию если не было проигравших (игра продолжается)
             else:
@@ -705,8 +755,9 @@ async def move(
                         },
                         channel_name=f"room#{req.room_id}",
                     )
+                    await spectators.push(room, "game_over", winner=game_winner, losers=[])
 
-                    await redis.unlink(req.room_id)
+                    await RoomRedisDAO.delete(redis, req.room_id, room)
 
                     await send_msg(
                         event="close_room",
@@ -761,14 +812,28 @@ async def move(
                     "current_turn_idx": 0,
                     "status": "playing"
                 })
+                next_seq(room)
 
-                await redis.setex(req.room_id, 3600, json.dumps(room))
+                await RoomRedisDAO.save(redis, req.room_id, room)
+                # новые руки — только владельцам, в reshuffle — публичное представление
+                for pid in active_players:
+                    await send_msg(
+                        "hand",
+                        {
+                            "hand": players[pid]["hand"],
+                            "trump": trump,
+                            "deck_count": len(deck),
+                            "attacker": room["attacker"],
+                        },
+                        channel_name=f"user#{pid}",
+                    )
                 await send_msg(
                     "reshuffle",
-                    {"room": room, "trump": trump, "deck_count": len(deck), "last_turn": room["last_turn"]},
+                    {"room": public_view(room), "seq": room["seq"], "trump": trump, "deck_count": len(deck), "last_turn": room["last_turn"]},
                     channel_name=f"room#{req.room_id}",
                 )
-                return {"ok": True, "message": "Колода пересдана, новая партия", "room": room}
+                await spectators.push(room, "reshuffle")
+                return {"ok": True, "message": "Колода пересдана, новая партия", "room": viewer_view(room, req.tg_id)}
 
         # ========================
         # если колода ещё есть → добор карт
@@ -801,6 +866,8 @@ async def move(
 
             # print(new_cards_by_player)
 
+            drawn = {pid: len(new_cards) for pid, new_cards in new_cards_by_player.items() if new_cards}
+
             # теперь отправляем уведомления только один раз для каждого игрока
             for pid, new_cards in new_cards_by_player.items():
                 if new_cards:  # если реально были выданы карты
@@ -824,17 +891,23 @@ async def move(
     players[str(req.tg_id)]["hand"] = hand
     room["players"] = players
     room["deck"] = deck
-    await redis.setex(req.room_id, 3600, json.dumps(room))
+    next_seq(room)
+    await RoomRedisDAO.save(redis, req.room_id, room)
 
-    await send_msg(event="move", payload={"room": room,
-                                          "last_turn": room["last_turn"],
-                                          }, channel_name=f"room#{req.room_id}")
+    await send_msg(
+        event="move",
+        payload=move_delta(room, str(req.tg_id), [list(c) for c in cards], trick, drawn),
+        channel_name=f"room#{req.room_id}",
+    )
+    await spectators.push(room, "move")
 
-    return {"ok": True, "room": room}
+    return {"ok": True, "room": viewer_view(room, req.tg_id)}
 
 
 
 @router.post("/leave")
+@room_locks.serialized(lambda a: a["req"].room_id)
+@batched_publish
 async def leave(
     req: ReadyRequest,
     session: SessionDep,
@@ -848,10 +921,9 @@ async def leave(
     """
     logger.info(f"[LEAVE] room_id={req.room_id}, tg_id={req.tg_id}")
 
-    raw = await redis.get(req.room_id)
-    if not raw:
+    room = await room_locks.load(redis, req.room_id)
+    if not room:
         raise HTTPException(status_code=404, detail="Комната не найдена")
-    room = json.loads(raw)
 
     players = room.get("players", {})
     player = players.get(str(req.tg_id))
@@ -867,11 +939,11 @@ async def leave(
         if players:
             room["players"] = players
             room["status"] = "waiting"
-            await redis.setex(req.room_id, 3600, json.dumps(room))
+            await RoomRedisDAO.save(redis, req.room_id, room, left=[req.tg_id])
 
             await send_msg(
                 "new_room",
-                {"room": room},
+                {"room": public_view(room)},
                 channel_name="rooms",
             )
         else:
@@ -884,7 +956,7 @@ async def leave(
                 "status": "waiting",
                 "players": players
             })
-            await redis.setex(req.room_id, 3600, json.dumps(room))
+            await RoomRedisDAO.save(redis, req.room_id, room, left=[req.tg_id])
             await send_msg(
                 "close_room",
                 {"room_id": req.room_id},
@@ -960,8 +1032,9 @@ async def leave(
                 },
                 channel_name=f"room#{req.room_id}",
             )
+            await spectators.push(room, "game_over", winner=winner_id, losers=all_leavers)
             
-            await redis.unlink(req.room_id)
+            await RoomRedisDAO.delete(redis, req.room_id, room, left=[req.tg_id])
             await send_msg(
                 "close_room",
                 {"room_id": req.room_id},
@@ -1016,8 +1089,9 @@ async def leave(
                 "current_turn_idx": 0,
                 "status": "playing"
             })
+            next_seq(room)
             
-            await redis.setex(req.room_id, 3600, json.dumps(room))
+            await RoomRedisDAO.save(redis, req.room_id, room, left=[req.tg_id])
             
             # Уведомляем оставшихся игроков о новой партии
             for pid, pdata in remaining_players.items():
@@ -1047,6 +1121,7 @@ async def leave(
                 "game_start",
                 {
                     "room_id": req.room_id,
+                    "seq": room["seq"],
                     "trump": trump,
                     "deck_count": len(deck),
                     "attacker": room["attacker"],
@@ -1054,6 +1129,7 @@ async def leave(
                 },
                 channel_name=f"room#{req.room_id}",
             )
+            await spectators.push(room, "game_start")
             
             return {
                 "ok": True,
@@ -1065,27 +1141,79 @@ async def leave(
 @router.get("/rooms")
 async def list_rooms(
     redis: "CustomRedis" = Depends(get_redis),
-    bet: Optional[int] = Query(None, description="Фильтр по ставке: ключи вида '<bet>_<id>'"),
+    bet: Optional[int] = Query(None, description="Фильтр по ставке"),
 ):
     """
     Возвращает только комнаты, которые ожидают подключения.
-    Если передан bet — ищем комнаты по ключам, начинающимся с '{bet}_'.
-    Если bet не передан — используем общий сборщик get_all_rooms(redis).
+    Если передан bet — читаем срез реестра idx:registry:stake:{bet}:status:waiting
+    постранично (не больше ROOMS_LIST_MAX комнат), иначе — idx:registry:status:waiting.
     """
     try:
-        if bet is not None:
-            rooms = await redis.get_rooms_by_bet(bet)
-        else:
-            rooms = await get_all_rooms(redis)
+        rooms = (
+            await redis.get_rooms_by_bet(bet, status="waiting")
+            if bet is not None
+            else await RoomRedisDAO.get_all(redis, status="waiting")
+        )
 
-        waiting = [r for r in rooms if _is_waiting(r)]
+        waiting = _public_rooms(r for r in rooms if _is_waiting(r))
         return {"count": len(waiting), "rooms": waiting}
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to list rooms: {e}")
 
 
+@router.get("/lobby")
+async def lobby(
+    redis: CustomRedis = Depends(get_redis),
+    status: Optional[str] = Query(None, description="Фильтр по статусу: waiting / matched / playing"),
+    stake: Optional[int] = Query(None, description="Фильтр по ставке"),
+    limit: int = Query(20, ge=1, le=100, description="Размер страницы"),
+    cursor: Optional[str] = Query(None, description="next_cursor из предыдущей страницы"),
+):
+    """
+    Постраничный список комнат из реестра, от новых к старым.
+    Стоимость запроса зависит от limit, а не от общего числа комнат.
+    Комнаты — карточки лобби (как в событии lobby) из публичного представления:
+    без колоды, рук и токенов; закодированная карточка переиспользуется, пока комната не менялась.
+    online — снимок присутствия из Centrifugo (см. /burkozel/online).
+    """
+    if status is not None and status not in ROOM_STATUSES:
+        raise HTTPException(status_code=400, detail=f"Неизвестный статус: {status}")
+
+    try:
+        page, next_cursor = await RoomRedisDAO.list_page(
+            redis, stake=stake, status=status, limit=limit, cursor=cursor, raw=True
+        )
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Некорректный курсор")
+
+    rooms = []
+    for room_id, raw in page:
+        try:
+            rooms.append(projections.views_for_raw(room_id, raw, RoomRedisDAO.loads).encoded_card())
+        except ValueError as e:
+            logger.error(f"Не удалось декодировать комнату {room_id}: {e}")
+    online = presence_stats.stats()
+    online = {"lobby": online["lobby_users"], "in_game": online["in_game"], "by_stake": online["by_stake"]}
+    return RawJSONResponse(
+        b'{"count":%d,"rooms":[%b],"next_cursor":%b,"online":%b}'
+        % (len(rooms), b",".join(rooms), dumps(next_cursor), dumps(online))
+    )
+
+
+@router.get("/online")
+async def online():
+    """
+    Онлайн из присутствия Centrifugo: пользователи в лобби, клиенты в комнатах
+    и по ставкам. Отдаётся снимок, который фоновая задача обновляет раз
+    в PRESENCE_STATS_INTERVAL секунд; updated_at=None — опроса ещё не было.
+    """
+    return presence_stats.stats()
+
+
 @router.post("/join_room")
+@room_locks.serialized(lambda a: a["room_id"])
+@batched_publish
 async def join_room(
     session: SessionDep,
     room_id: str = Body(...),
@@ -1098,10 +1226,9 @@ async def join_room(
     """
     logger.info(f"[JOIN_ROOM] room_id={room_id}, tg_id={tg_id}, nickname={nickname}")
 
-    raw = await redis.get(room_id)
-    if not raw:
+    room = await room_locks.load(redis, room_id)
+    if not room:
         raise HTTPException(status_code=404, detail="Комната не найдена")
-    room = json.loads(raw)
 
     players = room.get("players", {})
 
@@ -1142,7 +1269,9 @@ async def join_room(
     if len(players) >= capacity:
         room["status"] = "matched"
 
-    await redis.setex(room_id, 3600, json.dumps(room))
+    seated = await RoomRedisDAO.seat_player(redis, tg_id, room_id, room)
+    if seated:
+        raise _already_seated(seated)
 
     await send_msg(
         event="close_room",
@@ -1159,26 +1288,28 @@ async def join_room(
                 "tg_id": tg_id,
                 "nickname": nickname,
             },
-            "players": list(players.keys()),
+            "players": list(room["players"].keys()),
             "status": room["status"],
         },
         channel_name=f"room#{room_id}",
     )
 
-    return {"ok": True, "room": room}
+    return {"ok": True, "room": viewer_view(room, tg_id)}
 
 
 @router.get("/all_rooms")
 async def list_rooms(redis: CustomRedis = Depends(get_redis)):
-    """Получить список всех комнат."""
-    rooms = await get_all_rooms(redis)
+    """Получить список всех комнат (по реестру idx:registry), в публичном представлении."""
+    rooms = _public_rooms(await get_all_rooms(redis))
     return {"count": len(rooms), "rooms": rooms}
 
 
 @router.post("/clear_room/{room_id}")
+@room_locks.serialized(lambda a: a["room_id"])
 async def clear_room(room_id: str, redis_client: CustomRedis = Depends(get_redis)):
-    # Асинхронно удаляем ключ, связанный с room_id
-    await redis_client.unlink(room_id)
+    # Асинхронно удаляем ключ, связанный с room_id (комнату читаем, чтобы снять её игроков из онлайна)
+    room = await room_locks.load(redis_client, room_id)
+    await RoomRedisDAO.delete(redis_client, room_id, room)
 
     await send_msg(
         event="close_room",
@@ -1221,7 +1352,7 @@ async def create_test_room(redis: CustomRedis = Depends(get_redis)):
         "attacker": "7022782558"
     }
 
-    await redis.set(room_id, json.dumps(room))
+    await RoomRedisDAO.save(redis, room_id, room, ttl=None)
     logger.info(f"[TEST] Создана тестовая комната {room_id}")
 
     return {"ok": True, "room": room}
@@ -1285,7 +1416,7 @@ async def create_last_hand_room(redis: CustomRedis = Depends(get_redis)):
         "current_turn_idx": 0
     }
 
-    await redis.setex(room_id, 3600, json.dumps(room))
+    await RoomRedisDAO.save(redis, room_id, room)
     logger.info(f"[TEST] Создана тестовая 'последняя раздача' {room_id}")
 
     return {"ok": True, "room": room}
@@ -1355,7 +1486,7 @@ async def create_one_out_room(redis: CustomRedis = Depends(get_redis)):
         "current_turn_idx": 0
     }
 
-    await redis.setex(room_id, 3600, json.dumps(room))
+    await RoomRedisDAO.save(redis, room_id, room)
     logger.info(f"[TEST] Создана тестовая комната '1 игрок выбыл' {room_id}")
 
     return {"ok": True, "room": room}
@@ -1429,7 +1560,7 @@ async def create_final_move_room(redis: CustomRedis = Depends(get_redis)):
         "current_turn_idx": 0  # следующий ход - первый игрок в turn_order (111)
     }
 
-    await redis.setex(room_id, 3600, json.dumps(room))
+    await RoomRedisDAO.save(redis, room_id, room)
     logger.info(f"[TEST] Создана тестовая комната 'последний ход' {room_id}")
 
     return {"ok": True, "room": room}
@@ -1437,19 +1568,70 @@ async def create_final_move_room(redis: CustomRedis = Depends(get_redis)):
 
 @router.post("/clear_redis")
 async def clear_redis(redis_client: CustomRedis = Depends(get_redis)):
-    # Очищаем все ключи из Redis
-    await redis_client.flushdb()
+    # Очищаем только ключи приложения (room:*, idx:*, cache:*, player:*, outbox:*), а не всю базу
+    for prefix in NAMESPACES:
+        await redis_client.delete_keys_by_prefix(prefix)
     return {"message": "Redis база данных очищена"}
 
 
 @router.get("/room/{room_id}")
 async def current_room(
-     room_id: str, redis_client: CustomRedis = Depends(get_redis)
+    room_id: str,
+    redis_client: CustomRedis = Depends(get_redis),
+    tg_id: Optional[int] = Query(None, description="Telegram ID зрителя: игроку комнаты — его рука"),
 ):
-    # Получаем данные о комнате из Redis
-    room_data = await redis_client.get(room_id)
-    if not room_data:
+    """
+    Снимок комнаты для зрителя: без колоды и чужих рук (см. projections.py).
+    Игрок комнаты (tg_id) видит свою руку, остальные — публичное представление.
+    Параллельные запросы одной комнаты ждут одно чтение (см. room_locks.py),
+    а пока комната в Redis не менялась, отдаётся уже закодированный ответ без её разбора.
+    """
+    raw = await room_locks.load_raw(redis_client, room_id)
+    if not raw:
+        raise HTTPException(status_code=404, detail="Комната не найдена")
+    try:
+        views = projections.views_for_raw(room_id, raw, RoomRedisDAO.loads)
+    except ValueError as e:
+        logger.error(f"Не удалось декодировать комнату {room_id}: {e}")
         raise HTTPException(status_code=404, detail="Комната не найдена")
 
-    room_info = json.loads(room_data)
-    return room_info
+    return RawJSONResponse(views.encoded(tg_id))
+
+
+@router.get("/my_room")
+async def my_room(
+    tg_id: int = Query(..., description="Telegram ID игрока"),
+    redis_client: CustomRedis = Depends(get_redis),
+):
+    """
+    Комната, где сейчас сидит игрок, одним чтением индекса player:{tg_id}.
+    Mini App вызывает его при старте вместо списка комнат; room=null — игрок не в комнате.
+    """
+    room = await RoomRedisDAO.get_by_player(redis_client, tg_id)
+    return {"room_id": room["room_id"] if room else None, "room": viewer_view(room, tg_id) if room else None}
+
+
+@router.get("/room/{room_id}/events")
+async def room_events(
+    room_id: str,
+    redis_client: CustomRedis = Depends(get_redis),
+    after: Optional[str] = Query(None, description="id последнего полученного события"),
+    limit: int = Query(100, ge=1, le=500, description="Сколько событий вернуть"),
+):
+    """
+    События канала комнаты после after — для переподключившегося клиента.
+    reset=true: часть событий уже вытеснена из журнала, комнату нужно
+    перечитать целиком через GET /burkozel/room/{room_id}.
+    """
+    try:
+        events, has_more, reset = await RoomEventsDAO.read_after(redis_client, room_id, after, limit)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Некорректный id события")
+
+    return {
+        "room_id": room_id,
+        "events": events,
+        "last_id": events[-1]["id"] if events else after,
+        "has_more": has_more,
+        "reset": reset,
+    }
@@ -0,0 +1,134 @@
+"""
+Каналы зрителей spectate#{room_id}.
+
+Канал комнаты room#{room_id} — для игроков (журнал, seq, личные события в user#).
+Зрители подписываются на spectate#{room_id} и получают на каждое изменение
+комнаты одно сообщение
+
+    {"event": "state", "payload": {"trigger": <событие>, "room": <публичное представление>,
+                                   "spectators": <число зрителей>, ...}}
+
+Публичное представление берётся из кэша представлений (projections.py) — того же,
+из которого отвечают игрокам, поэтому зритель не видит карт и не обращается к API:
+последнее состояние при подписке отдаёт история Centrifugo (канал с историей,
+см. centrifugo.HISTORY_CHANNEL_PREFIXES). Сколько бы ни было зрителей, изменение
+комнаты — одна публикация: раздаёт её Centrifugo. Исключение — game_over: итоговую
+комнату (штрафы, результаты, без вышедшего игрока) перед удалением не сохраняют,
+и её представление строится отдельно, мимо кэша.
+
+Задержка. Сообщения уходят через SPECTATE_DELAY секунд после изменения, чтобы
+трансляция не подсказывала игрокам. Отложенные сообщения, срок которых наступил
+одновременно, публикуются одним вызовом batch. Пока фоновая задача не запущена
+(тесты, скрипты), сообщение публикуется сразу.
+
+Число зрителей — из опроса присутствия (presence_stats.py).
+"""
+import asyncio
+import time
+from collections import deque
+from typing import Any, Dict
+
+from loguru import logger
+
+from app.config import settings
+from app.game.api import utils
+from app.game.api.presence_stats import SPECTATE_CHANNEL_PREFIX, presence_stats
+from app.game.api.projections import RoomViews, public_view
+
+# события, после которых комната удаляется, не сохраняясь
+FINAL_TRIGGERS = frozenset({"game_over"})
+
+
+def spectate_channel(room_id: str) -> str:
+    return f"{SPECTATE_CHANNEL_PREFIX}{room_id}"
+
+
+class SpectatorFeed:
+    """Отложенная публикация состояния комнат в каналы зрителей"""
+
+    def __init__(self, delay: float = 3):
+        self.delay = delay
+        self.running = False
+        # (срок, канал, данные) в порядке изменений: задержка одна, поэтому сроки не убывают
+        self._queue: deque = deque()
+        self._wakeup = asyncio.Event()
+        self.pushed = 0
+        self.published = 0
+        self.batches = 0
+
+    async def push(self, room: Dict[str, Any], trigger: str, **extra):
+        """Ставит публичное состояние комнаты в канал зрителей"""
+        payload = {
+            "trigger": trigger,
+            "room": RoomViews(room).public if trigger in FINAL_TRIGGERS else public_view(room),
+            "spectators": presence_stats.spectators(room["room_id"]),
+            **extra,
+        }
+        channel = spectate_channel(room["room_id"])
+        self.pushed += 1
+        if not self.running or self.delay <= 0:
+            await utils.send_msg("state", payload, channel_name=channel)
+            self.published += 1
+            return
+        self._queue.append((time.monotonic() + self.delay, channel, payload))
+        self._wakeup.set()
+
+    async def publish_due(self) -> int:
+        """Публикует сообщения, срок которых наступил, одним пакетом"""
+        now = time.monotonic()
+        due = []
+        while self._queue and self._queue[0][0] <= now:
+            due.append(self._queue.popleft())
+        if not due:
+            return 0
+
+        @utils.batched_publish
+        async def send():
+            for _, channel, payload in due:
+                await utils.send_msg("state", payload, channel_name=channel)
+
+        await send()
+        self.published += len(due)
+        self.batches += 1
+        return len(due)
+
+    async def run(self):
+        """Фоновая задача lifespan"""
+        self.running = True
+        logger.info(f"[SPECTATE] Каналы зрителей с задержкой {self.delay} с")
+        try:
+            while True:
+                if not self._queue:
+                    self._wakeup.clear()
+                    await self._wakeup.wait()
+                    continue
+                await asyncio.sleep(max(0.0, self._queue[0][0] - time.monotonic()))
+                try:
+                    await self.publish_due()
+                except Exception as e:
+                    logger.error(f"[SPECTATE] Ошибка публикации зрителям: {e}")
+        finally:
+            self.running = False
+            # очередь не теряем: остаток уходит без задержки
+            self._queue = deque((0.0, channel, payload) for _, channel, payload in self._queue)
+            try:
+                await self.publish_due()
+            except Exception as e:
+                logger.warning(f"[SPECTATE] Не удалось отправить остаток очереди: {e}")
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "running": self.running,
+            "delay": self.delay,
+            "queued": len(self._queue),
+            "pushed": self.pushed,
+            "published": self.published,
+            "batches": self.batches,
+        }
+
+
+spectators = SpectatorFeed(delay=settings.SPECTATE_DELAY)
+
+
+async def run_spectator_feed():
+    await spectators.run()
@@ -1,17 +1,23 @@
-import json
+import functools
 import time
 import uuid
+from contextvars import ContextVar
 from datetime import datetime
 from typing import List, Dict, Any
 
-import httpx
 import jwt
 from fastapi import HTTPException
 from loguru import logger
 
 from app.config import settings
 from app.users.dao import UserDAO
+from app.game.api.centrifugo import PublishBatch, centrifugo
+from app.game.api.lobby import LOBBY_EVENTS, lobby
+from app.game.api.outbox import outbox
+from app.game.redis_dao import manager
 from app.game.redis_dao.custom_redis import CustomRedis
+from app.game.redis_dao.events import ROOM_CHANNEL_PREFIX, RoomEventsDAO
+from app.game.redis_dao.redis_room_dao import RoomRedisDAO
 
 
 # ===============================
@@ -19,32 +25,151 @@ from app.game.redis_dao.custom_redis import CustomRedis
 # ===============================
 
 async def send_msg(event: str, payload: dict, channel_name: str) -> bool:
-    """Публикация события в Centrifugo."""
+    """
+    Публикация события в Centrifugo.
+    События канала комнаты room#{room_id} сначала записываются в журнал комнаты,
+    и id записи уходит в сообщении: по нему клиент догоняет пропущенное
+    через GET /burkozel/room/{room_id}/events?after=<id>.
+    Внутри обработчика с @batched_publish событие только ставится в пакет,
+    при запущенном публикаторе outbox — в очередь (см. outbox.py).
+    new_room / close_room при запущенном агрегаторе лобби копятся в нём (см. lobby.py).
+    """
+    if event in LOBBY_EVENTS and lobby.running:
+        lobby.record(event, payload)
+        return True
+
     message = {"event": event, "payload": payload}
+    if channel_name.startswith(ROOM_CHANNEL_PREFIX):
+        event_id = await _log_room_event(channel_name[len(ROOM_CHANNEL_PREFIX):], event, payload)
+        if event_id:
+            message["id"] = event_id
+
+    batch = _current_batch.get()
+    if batch is not None:
+        batch.add(channel_name, message)
+        return True
+    if outbox.running:
+        await outbox.enqueue([(channel_name, message)])
+        return True
+
+    ok = await centrifugo.publish(channel_name, message)
+    logger.info(f"[Centrifugo] -> channel={channel_name}, event={event}, status={ok}")
+    return ok
+
 
-    data = {"method": "publish", "params": {"channel": channel_name, "data": message}}
-    headers = {"X-API-Key": settings.CENTRIFUGO_API_KEY}
+_current_batch: ContextVar[PublishBatch | None] = ContextVar("centrifugo_batch", default=None)
 
+
+def batched_publish(func):
+    """
+    Собирает события, опубликованные обработчиком через send_msg, в один
+    запрос batch к Centrifugo (или в одну постановку в outbox). Пакет уходит
+    и при исключении: события, сгенерированные до ошибки, раньше тоже
+    доходили до клиентов.
+    """
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        if _current_batch.get() is not None:
+            return await func(*args, **kwargs)
+        batch = PublishBatch()
+        token = _current_batch.set(batch)
+        try:
+            return await func(*args, **kwargs)
+        finally:
+            _current_batch.reset(token)
+            if batch.messages and outbox.running:
+                await outbox.enqueue(batch.items())
+            elif batch.messages:
+                ok = await centrifugo.send(batch)
+                logger.info(
+                    f"[Centrifugo] -> {func.__name__}: {batch.messages} событий, "
+                    f"{len(batch)} команд, status={ok}"
+                )
+
+    return wrapper
+
+
+async def _log_room_event(room_id: str, event: str, payload: dict) -> str | None:
     try:
-        async with httpx.AsyncClient(timeout=30) as client:
-            response = await client.post(settings.CENTRIFUGO_URL, json=data, headers=headers)
-            ok = response.status_code == 200
-            logger.info(f"[Centrifugo] -> channel={channel_name}, event={event}, status={ok}")
-            if not ok:
-                logger.error(f"[Centrifugo] Ошибка: {response.text}")
-            return ok
+        redis = await manager.get_redis()
+        return await RoomEventsDAO.append(redis, room_id, event, payload)
     except Exception as e:
-        logger.error(f"[Centrifugo] Ошибка отправки: {e}")
-        return False
+        # журнал — для догоняющих клиентов; публикацию он не блокирует
+        logger.warning(f"[EVENTS] Не удалось записать событие {event} комнаты {room_id}: {e}")
+        return None
 
 
 async def generate_client_token(tg_id: int, secret_key: str) -> str:
-    """Сгенерировать токен для клиента Centrifugo."""
+    """
+    Сгенерировать токен для клиента Centrifugo.
+    subs — серверная подписка на личный канал user#{tg_id} с позиционированием
+    и восстановлением: после переподключения Centrifugo сам досылает пропущенные
+    сообщения (история каналов — в config.json).
+    """
     exp = int(time.time()) + 60 * 60
-    payload = {"sub": str(tg_id), "exp": exp}
+    payload = {
+        "sub": str(tg_id),
+        "exp": exp,
+        "subs": {
+            f"user#{tg_id}": {
+                "override": {"force_positioning": {"value": True}, "force_recovery": {"value": True}},
+            },
+        },
+    }
     return jwt.encode(payload, secret_key, algorithm="HS256")
 
 
+# ===============================
+# === События комнаты ==========
+# ===============================
+
+def next_seq(room: Dict[str, Any]) -> int:
+    """
+    Следующий номер события комнаты. seq растёт на 1 с каждым событием
+    game_start / move / players_out / reshuffle и хранится в комнате: клиент,
+    получивший seq больше ожидаемого, перечитывает комнату через GET /burkozel/room/{room_id}.
+    """
+    room["seq"] = room.get("seq", 0) + 1
+    return room["seq"]
+
+
+def move_delta(
+    room: Dict[str, Any],
+    player_id: str,
+    cards: List[list],
+    trick: Dict[str, Any] | None,
+    drawn: Dict[str, int],
+) -> Dict[str, Any]:
+    """
+    Событие move: только изменения хода, без колоды и чужих рук.
+    trick — завершённая ходом взятка (победитель, очки, ходы), drawn — сколько
+    карт добрал каждый игрок (сами карты уходят лично в событии hand).
+    """
+    players = room["players"]
+    order = room.get("turn_order") or room.get("seats") or list(players)
+    delta = {
+        "room_id": room["room_id"],
+        "seq": room["seq"],
+        "player": player_id,
+        "cards": cards,
+        "next": order[room.get("current_turn_idx", 0) % len(order)] if order else None,
+        "attacker": room.get("attacker"),
+        "defender": room.get("defender"),
+        "hand_counts": {pid: len(pdata.get("hand") or []) for pid, pdata in players.items()},
+        "deck_count": len(room.get("deck") or []),
+    }
+    if trick is not None:
+        winner = players[trick["winner"]]
+        delta["trick"] = {
+            **trick,
+            "round_score": winner["round_score"],
+            "taken_tricks": winner["taken_tricks"],
+        }
+    if drawn:
+        delta["drawn"] = drawn
+    return delta
+
+
 # ===============================
 # === Комнаты ==================
 # ===============================
@@ -83,7 +208,7 @@ async def create_new_room(
             }
         },
     }
-    await redis_client.setex(room_id, 3600, json.dumps(room_data))
+    await RoomRedisDAO.save(redis_client, room_id, room_data)
 
     return {
         "status": "waiting",
@@ -110,7 +235,7 @@ async def add_user_to_room(
         "token": token,
     }
 
-    await redis_client.setex(room["room_id"], 3600, json.dumps(room))
+    await RoomRedisDAO.save(redis_client, room["room_id"], room)
 
     return {
         "status": "matched",
@@ -124,18 +249,7 @@ async def add_user_to_room(
 
 async def get_all_rooms(redis_client: CustomRedis) -> List[Dict[str, Any]]:
     """Вернуть список всех комнат."""
-    all_keys = await redis_client.keys("*")
-    rooms_data = []
-
-    if all_keys:
-        values = await redis_client.mget(all_keys)
-        for key, value in zip(all_keys, values):
-            if value:
-                try:
-                    rooms_data.append(json.loads(value))
-                except json.JSONDecodeError:
-                    logger.error(f"Ошибка JSON для ключа {key}")
-    return rooms_data
+    return await RoomRedisDAO.get_all(redis_client)
 
 
 # ===============================
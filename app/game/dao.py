@@ -2,11 +2,28 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.dao.base import BaseDAO
 from app.game.models import GameType
+from app.game.redis_dao.manager import GAME_TYPES_TAG, invalidate_on_commit
 
 
 class GameTypeDAO(BaseDAO):
     model = GameType
 
+    # справочник игр кэшируется (all_games_router.load_active_games): запись сбрасывает кэш после commit
+    @classmethod
+    async def add(cls, session: AsyncSession, **values):
+        invalidate_on_commit(session, GAME_TYPES_TAG)
+        return await super().add(session, **values)
+
+    @classmethod
+    async def update(cls, session: AsyncSession, filter_by, **values):
+        invalidate_on_commit(session, GAME_TYPES_TAG)
+        return await super().update(session, filter_by, **values)
+
+    @classmethod
+    async def delete(cls, session: AsyncSession, **filter_by):
+        invalidate_on_commit(session, GAME_TYPES_TAG)
+        return await super().delete(session, **filter_by)
+
     @classmethod
     async def get_active_games(cls, session: AsyncSession):
         """Получить все активные игры"""
@@ -0,0 +1,325 @@
+"""
+Двухуровневый кэш декоратора cached (см. manager.py).
+
+L1 — LRU в памяти процесса с TTL и ограничением размера.
+L2 — Redis, ключи cache:*; значение — обычный JSON, как и раньше.
+
+Промах по ключу загружает данные один раз (single-flight): параллельные
+вызовы ждут ту же загрузку. При stale_ttl > 0 устаревшее значение отдаётся
+сразу, а обновление идёт в фоне (stale-while-revalidate): в Redis ключ живёт
+ttl + stale_ttl, свежесть определяется по оставшемуся PTTL. Фоновое обновление
+идёт уже после ответа на запрос, поэтому для него можно передать отдельный
+загрузчик refresh_loader, не привязанный к объектам запроса (см. cached).
+Пустой результат (None) кэшируется на negative_ttl.
+
+Теги: ключ с тегами (например user:{tg_id}) хранится вместе с поколениями
+своих тегов — cache:{key}#{поколение}. invalidate(tag) увеличивает счётчик
+cache:tag:{tag} одним INCR, и все зависимые ключи разом становятся
+недоступны (старые значения доживают свой TTL). Поколения кэшируются в
+процессе на gen_ttl секунд: другие процессы увидят сброс не позже чем через gen_ttl.
+
+Значения из L1 отдаются всем вызывающим одним и тем же объектом —
+изменять их нельзя.
+"""
+import asyncio
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Tuple
+
+from loguru import logger
+
+from app.game.redis_dao.keys import cache_tag_key
+
+
+_MISSING = object()
+
+
+class CacheMetrics:
+    """Счётчики кэша: попадания по уровням, загрузки и их время"""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.l1_hits = 0
+        self.l2_hits = 0
+        self.misses = 0
+        self.stale_hits = 0
+        self.negative_hits = 0
+        self.coalesced = 0
+        self.loads = 0
+        self.load_errors = 0
+        self.load_time_total = 0.0
+        self.load_time_max = 0.0
+
+    def observe_load(self, elapsed: float):
+        self.loads += 1
+        self.load_time_total += elapsed
+        self.load_time_max = max(self.load_time_max, elapsed)
+
+    @property
+    def hit_ratio(self) -> float:
+        hits = self.l1_hits + self.l2_hits
+        total = hits + self.misses
+        return hits / total if total else 0.0
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "l1_hits": self.l1_hits,
+            "l2_hits": self.l2_hits,
+            "misses": self.misses,
+            "stale_hits": self.stale_hits,
+            "negative_hits": self.negative_hits,
+            "coalesced": self.coalesced,
+            "hit_ratio": round(self.hit_ratio, 4),
+            "loads": self.loads,
+            "load_errors": self.load_errors,
+            "load_time_avg_ms": round(self.load_time_total / self.loads * 1000, 3) if self.loads else 0.0,
+            "load_time_max_ms": round(self.load_time_max * 1000, 3),
+        }
+
+
+class LocalCache:
+    """L1: LRU с TTL. Запись — (значение, свежо до, годно до) в time.monotonic()"""
+
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self._data: "OrderedDict[str, Tuple[Any, float, float]]" = OrderedDict()
+
+    def get(self, key: str) -> Tuple[Any, bool]:
+        """Возвращает (значение, свежее ли) или (_MISSING, False)"""
+        entry = self._data.get(key)
+        if entry is None:
+            return _MISSING, False
+        value, fresh_until, stale_until = entry
+        now = time.monotonic()
+        if now >= stale_until:
+            del self._data[key]
+            return _MISSING, False
+        self._data.move_to_end(key)
+        return value, now < fresh_until
+
+    def set(self, key: str, value: Any, ttl: float, stale_ttl: float = 0):
+        if self.maxsize <= 0 or ttl + stale_ttl <= 0:
+            return
+        now = time.monotonic()
+        self._data[key] = (value, now + ttl, now + ttl + stale_ttl)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def delete(self, key: str):
+        self._data.pop(key, None)
+
+    def clear(self):
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class TwoTierCache:
+    """L1 в памяти + L2 в Redis с single-flight загрузкой"""
+
+    def __init__(self, maxsize: int = 1024, l1_ttl: float = 30, gen_ttl: float = 1):
+        self.local = LocalCache(maxsize)
+        self.l1_ttl = l1_ttl
+        self.gen_ttl = gen_ttl
+        self._generations: Dict[str, Tuple[int, float]] = {}
+        self.metrics = CacheMetrics()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._refreshing: set = set()
+        self._tasks: set = set()
+
+    async def versioned_key(self, redis, key: str, tags: Iterable[str]) -> str:
+        """Ключ с поколениями тегов: после invalidate(tag) он другой"""
+        tags = list(tags)
+        if not tags:
+            return key
+        generations = await self._tag_generations(redis, tags)
+        return f"{key}#{'.'.join(str(g) for g in generations)}"
+
+    async def invalidate(self, redis, *tags: str):
+        """Сбрасывает все ключи с данными тегами (атомарно для каждого тега)"""
+        if not tags:
+            return
+        now = time.monotonic()
+        try:
+            pipe = redis.pipeline(transaction=False)
+            for tag in tags:
+                pipe.incr(cache_tag_key(tag))
+            generations = await pipe.execute()
+        except Exception as e:
+            logger.error(f"[CACHE] Ошибка сброса тегов {tags}: {e}")
+            generations = [self._generations.get(tag, (0, 0))[0] + 1 for tag in tags]
+        for tag, generation in zip(tags, generations):
+            self._generations[tag] = (int(generation), now)
+        logger.debug(f"[CACHE] Сброшены теги: {', '.join(tags)}")
+
+    async def _tag_generations(self, redis, tags: List[str]) -> List[int]:
+        now = time.monotonic()
+        expired = [
+            tag for tag in tags
+            if tag not in self._generations or now - self._generations[tag][1] >= self.gen_ttl
+        ]
+        if expired and redis is not None:
+            try:
+                values = await redis.mget([cache_tag_key(tag) for tag in expired])
+                for tag, value in zip(expired, values):
+                    self._generations[tag] = (int(value or 0), now)
+            except Exception as e:
+                logger.error(f"[CACHE] Ошибка чтения поколений тегов: {e}")
+        return [self._generations.get(tag, (0, 0))[0] for tag in tags]
+
+    async def get_or_load(
+        self,
+        redis,
+        key: str,
+        loader: Callable[[], Awaitable[Any]],
+        *,
+        ttl: int,
+        stale_ttl: int = 0,
+        negative_ttl: int = 0,
+        refresh_loader: Callable[[], Awaitable[Any]] | None = None,
+    ) -> Any:
+        """refresh_loader — загрузчик для фонового обновления (по умолчанию loader)"""
+        refresh_loader = refresh_loader or loader
+        value, fresh = self.local.get(key)
+        if value is not _MISSING:
+            self.metrics.l1_hits += 1
+            if value is None:
+                self.metrics.negative_hits += 1
+            if not fresh:
+                self.metrics.stale_hits += 1
+                self._refresh_in_background(redis, key, refresh_loader, ttl, stale_ttl, negative_ttl)
+            logger.debug(f"[CACHE] L1 {'hit' if fresh else 'stale'}: {key}")
+            return value
+
+        return await self._single_flight(
+            key, lambda: self._load(redis, key, loader, refresh_loader, ttl, stale_ttl, negative_ttl)
+        )
+
+    async def _single_flight(self, key: str, load: Callable[[], Awaitable[Any]]) -> Any:
+        future = self._inflight.get(key)
+        if future is not None:
+            self.metrics.coalesced += 1
+            # shield: отмена одного ожидающего не отменяет общую загрузку
+            return await asyncio.shield(future)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            result = await load()
+        except BaseException as e:
+            if not future.cancelled():
+                future.set_exception(e)
+                # исключение получает вызывающий; ожидающие — через future
+                future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            self._inflight.pop(key, None)
+
+    async def _load(
+        self, redis, key: str, loader, refresh_loader, ttl: int, stale_ttl: int, negative_ttl: int
+    ) -> Any:
+        raw, pttl = await self._read_l2(redis, key)
+        if raw is not None:
+            value = self._decode(raw)
+            remaining = pttl / 1000 if pttl and pttl > 0 else ttl
+            fresh_left = remaining - stale_ttl
+            if fresh_left > 0:
+                self.metrics.l2_hits += 1
+                if value is None:
+                    self.metrics.negative_hits += 1
+                self.local.set(key, value, min(self.l1_ttl, fresh_left), stale_ttl)
+                logger.debug(f"[CACHE] L2 hit: {key}")
+                return value
+            if stale_ttl:
+                # в Redis лежит устаревшее значение — отдаём его и обновляем в фоне
+                self.metrics.l2_hits += 1
+                self.metrics.stale_hits += 1
+                self.local.set(key, value, 0, remaining)
+                self._refresh_in_background(redis, key, refresh_loader, ttl, stale_ttl, negative_ttl)
+                logger.debug(f"[CACHE] L2 stale: {key}")
+                return value
+
+        self.metrics.misses += 1
+        logger.debug(f"[CACHE] miss: {key}")
+        return await self._fetch_and_store(redis, key, loader, ttl, stale_ttl, negative_ttl)
+
+    async def _fetch_and_store(self, redis, key: str, loader, ttl: int, stale_ttl: int, negative_ttl: int) -> Any:
+        started = time.perf_counter()
+        try:
+            value = await loader()
+        except Exception:
+            self.metrics.load_errors += 1
+            raise
+        finally:
+            self.metrics.observe_load(time.perf_counter() - started)
+
+        if value is None:
+            if negative_ttl > 0:
+                self.local.set(key, None, min(self.l1_ttl, negative_ttl))
+                await self._write_l2(redis, key, "null", negative_ttl)
+            return None
+
+        value = self._to_plain(value)
+        self.local.set(key, value, min(self.l1_ttl, ttl), stale_ttl)
+        await self._write_l2(redis, key, json.dumps(value), ttl + stale_ttl)
+        return value
+
+    def _refresh_in_background(self, redis, key: str, loader, ttl: int, stale_ttl: int, negative_ttl: int):
+        if key in self._refreshing:
+            return
+        self._refreshing.add(key)
+
+        async def refresh():
+            try:
+                await self._fetch_and_store(redis, key, loader, ttl, stale_ttl, negative_ttl)
+            except Exception as e:
+                logger.warning(f"[CACHE] Не удалось обновить {key}: {e}")
+            finally:
+                self._refreshing.discard(key)
+
+        task = asyncio.create_task(refresh())
+        # держим ссылку, чтобы фоновую задачу не собрал GC
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    @staticmethod
+    async def _read_l2(redis, key: str):
+        if redis is None:
+            return None, None
+        try:
+            pipe = redis.pipeline(transaction=False)
+            pipe.get(key)
+            pipe.pttl(key)
+            raw, pttl = await pipe.execute()
+            return raw, pttl
+        except Exception as e:
+            logger.error(f"[CACHE] Ошибка чтения Redis для {key}: {e}")
+            return None, None
+
+    @staticmethod
+    async def _write_l2(redis, key: str, raw: str, ttl: int):
+        if redis is None:
+            return
+        try:
+            await redis.setex(key, ttl, raw)
+        except Exception as e:
+            logger.error(f"[CACHE] Ошибка записи Redis для {key}: {e}")
+
+    @staticmethod
+    def _to_plain(value: Any) -> Any:
+        """Модели с to_dict() приводятся к словарям — так же, как их вернёт L2"""
+        if isinstance(value, list):
+            return [item.to_dict() if hasattr(item, "to_dict") else item for item in value]
+        return value.to_dict() if hasattr(value, "to_dict") else value
+
+    @staticmethod
+    def _decode(raw) -> Any:
+        return json.loads(raw)
@@ -1,23 +1,83 @@
+import asyncio
 import json
-from redis.asyncio import Redis
+from redis.asyncio import Redis, RedisCluster
+from redis.crc import key_slot
 from loguru import logger
 from typing import Any, Callable, Awaitable, Dict, List
 
+from app.config import settings
+from app.game.redis_dao.instrumentation import redis_metrics, observed, instrument_pipeline, payload_size
+from app.game.redis_dao.keys import ROOM_PREFIX, room_key, registry_key, decode_key
+from app.game.redis_dao.near_cache import NearCache
+from app.game.redis_dao.redis_room_dao import RoomRedisDAO
+from app.game.redis_dao.serializers import loads_room
 
-class CustomRedis(Redis):
-    """Расширенный класс Redis с дополнительными методами"""
+
+class RedisCommandsMixin:
+    """Дополнительные методы, общие для одиночного Redis и Redis Cluster"""
+
+    is_cluster = False
+    near_cache: NearCache | None = None
+
+    async def execute_command(self, *args, **options):
+        """Выполняет команду; при REDIS_METRICS — с учётом в метриках (см. instrumentation.py)"""
+        if not redis_metrics.enabled:
+            return await super().execute_command(*args, **options)
+        command = args[0].upper() if isinstance(args[0], str) else str(args[0])
+        return await observed(
+            command, lambda: super(RedisCommandsMixin, self).execute_command(*args, **options), 1, payload_size(args)
+        )
+
+    def pipeline(self, *args, **kwargs):
+        pipe = super().pipeline(*args, **kwargs)
+        if redis_metrics.enabled:
+            transaction = getattr(pipe, "is_transaction", getattr(pipe, "_transaction", False))
+            instrument_pipeline(pipe, bool(transaction))
+        return pipe
+
+    def enable_near_cache(self, prefixes=(ROOM_PREFIX,), maxsize: int = 10000) -> NearCache | None:
+        """
+        Включает ближний кэш ключей с данными префиксами (см. near_cache.py).
+        Читаются через него только вызовы get_tracked.
+        """
+        if self.is_cluster:
+            logger.warning("[NEAR-CACHE] В Redis Cluster ближний кэш не поддерживается")
+            return None
+        if self.near_cache is None:
+            self.near_cache = NearCache(self, prefixes, maxsize)
+            self.near_cache.start()
+        return self.near_cache
+
+    async def get_tracked(self, key: str):
+        """GET через ближний кэш, если он включён и покрывает ключ"""
+        near = self.near_cache
+        if near is None or not near.covers(key):
+            return await self.get(key)
+        return await near.get(key, lambda: self.get(key))
+
+    def forget_tracked(self, *keys: str):
+        """Сбрасывает ключи из ближнего кэша после собственной записи"""
+        if self.near_cache is not None:
+            self.near_cache.invalidate(keys)
 
     async def delete_key(self, key: str):
         """Удаляет ключ из Redis."""
         await self.delete(key)
         logger.info(f"Ключ {key} удален")
 
-    async def delete_keys_by_prefix(self, prefix: str):
-        """Удаляет ключи, начинающиеся с указанного префикса."""
-        keys = await self.keys(prefix + '*')
-        if keys:
-            await self.delete(*keys)
-            logger.info(f"Удалены ключи, начинающиеся с {prefix}")
+    async def delete_keys_by_prefix(self, prefix: str, batch_size: int = 500):
+        """Удаляет ключи, начинающиеся с указанного префикса (SCAN + UNLINK пачками)."""
+        batch = []
+        deleted = 0
+        async for key in self.scan_iter(match=prefix + '*', count=batch_size):
+            batch.append(key)
+            if len(batch) >= batch_size:
+                deleted += await self.unlink(*batch)
+                batch = []
+        if batch:
+            deleted += await self.unlink(*batch)
+        if deleted:
+            logger.info(f"Удалены ключи, начинающиеся с {prefix}: {deleted}")
 
     async def delete_all_keys(self):
         """Удаляет все ключи из текущей базы данных Redis."""
@@ -75,10 +135,10 @@ class CustomRedis(Redis):
         cached_data = await self.get(cache_key)
 
         if cached_data:
-            logger.info(f"Данные получены из кэша для ключа: {cache_key}")
+            logger.debug(f"Данные получены из кэша для ключа: {cache_key}")
             return json.loads(cached_data)
         else:
-            logger.info(f"Данные не найдены в кэше для ключа: {cache_key}, получаем из источника")
+            logger.debug(f"Данные не найдены в кэше для ключа: {cache_key}, получаем из источника")
             data = await fetch_data_func(*args, **kwargs)
 
             # Преобразуем данные в зависимости от их типа
@@ -92,50 +152,115 @@ class CustomRedis(Redis):
 
             # Сохраняем данные в кэше с указанным временем жизни
             await self.setex(cache_key, ttl, json.dumps(processed_data))
-            logger.info(f"Данные сохранены в кэш для ключа: {cache_key} с TTL: {ttl} сек")
+            logger.debug(f"Данные сохранены в кэш для ключа: {cache_key} с TTL: {ttl} сек")
 
             return processed_data
 
 
-    async def get_rooms_by_bet(self, bet: int) -> List[Dict[str, Any]]:
+    async def get_rooms_by_bet(
+        self,
+        bet: int,
+        status: str | None = None,
+        page_size: int | None = None,
+        limit: int | None = None,
+    ) -> List[Dict[str, Any]]:
         """
-        Возвращает список комнат, чьи ключи начинаются со строки '{bet}_'.
-        Предполагается, что каждая комната хранится под ключом = её id (например, '10_a535d472')
-        и значение — JSON-строка с полями комнаты.
-        Если у тебя комнаты хранятся НЕ как JSON-строка, см. комментарий внутри.
+        Возвращает список комнат со ставкой bet (и статусом status), не больше limit.
+        id комнат читаются из среза реестра idx:registry:stake:{bet}[:status:{status}]
+        страницами по page_size (ZSCAN), каждая страница — один MGET.
+        Пока Redis отвечает на MGET следующей страницы, декодируется предыдущая.
         """
-        pattern = f"{bet}_*"
+        page_size = max(1, page_size or settings.ROOMS_PAGE_SIZE)
+        limit = min(limit or settings.ROOMS_LIST_MAX, settings.ROOMS_LIST_MAX)
+        index_key = registry_key(stake=bet, status=status)
+
         rooms: List[Dict[str, Any]] = []
+        stale: List[str] = []
+        seen = set()
+        prev = None  # (id комнат, задача MGET) предыдущей страницы
+        cursor = 0
+        try:
+            while len(rooms) < limit:
+                cursor, items = await self.zscan(index_key, cursor, count=page_size)
+                # ZSCAN может вернуть элемент повторно — отбрасываем дубли
+                ids = [room_id for room_id in (decode_key(m) for m, _ in items) if room_id not in seen]
+                seen.update(ids)
 
-        async for raw_key in self.scan_iter(match=pattern, count=1000):
-            key = raw_key.decode() if isinstance(raw_key, (bytes, bytearray)) else raw_key
-            try:
-                raw = await self.get(key)  # <-- если у тебя Hash, замени на: data = await self.hgetall(key) + декод
-                if raw is None:
-                    continue
+                task = asyncio.create_task(self.mget([room_key(r) for r in ids])) if ids else None
+                if prev:
+                    self._decode_rooms(prev[0], await prev[1], rooms, stale)
+                prev = (ids, task) if task else None
+                if cursor == 0:
+                    break
+
+            if prev and len(rooms) < limit:
+                self._decode_rooms(prev[0], await prev[1], rooms, stale)
+                prev = None
+        finally:
+            if prev:
+                prev[1].cancel()
 
-                if isinstance(raw, (bytes, bytearray)):
-                    raw = raw.decode()
+        if stale:
+            # комнаты истекли по TTL — убираем из среза и общего реестра
+            await RoomRedisDAO.prune(self, index_key, stale)
+        return rooms[:limit]
 
+    @staticmethod
+    def _decode_rooms(room_ids: List[str], values: List[Any], rooms: List[Dict[str, Any]], stale: List[str]):
+        """Декодирует страницу MGET, дописывая комнаты в rooms, а истёкшие id — в stale"""
+        for room_id, raw in zip(room_ids, values):
+            if raw is None:
+                stale.append(room_id)
+                continue
+            try:
                 data: Dict[str, Any]
                 try:
-                    data = json.loads(raw)
-                except json.JSONDecodeError:
-                    # если хранится как Hash, раскомментируй этот блок и закомментируй GET/JSON выше:
-                    # raw_hash = await self.hgetall(key)
-                    # data = {
-                    #     (k.decode() if isinstance(k, (bytes, bytearray)) else k):
-                    #     (v.decode() if isinstance(v, (bytes, bytearray)) else v)
-                    #     for k, v in raw_hash.items()
-                    # }
-                    # или, если хранится как строка — оборачиваем как есть:
+                    data = loads_room(raw)
+                except ValueError:
+                    # не комната (например, произвольная строка) — оборачиваем как есть
+                    if isinstance(raw, (bytes, bytearray)):
+                        raw = raw.decode(errors="replace")
                     data = {"value": raw}
 
-                # добавим id ключа для удобства
-                data.setdefault("id", key)
+                # добавим id комнаты для удобства
+                data.setdefault("id", room_id)
                 rooms.append(data)
 
             except Exception as e:
-                logger.warning("Не удалось прочитать комнату %s: %s", key, e)
+                logger.warning(f"Не удалось прочитать комнату {room_id}: {e}")
+
+
+class CustomRedis(RedisCommandsMixin, Redis):
+    """Расширенный класс Redis с дополнительными методами"""
+
+
+class ClusterSafeMixin:
+    """
+    Многоключевые команды для Redis Cluster.
+    DEL/UNLINK/EXISTS клиент кластера сам делит по слотам, а MGET требует
+    ключей одного слота: здесь он делится по слотам и выполняется параллельно.
+    """
+
+    is_cluster = True
+
+    async def mget(self, keys, *args):
+        keys = [keys, *args] if isinstance(keys, (str, bytes)) else [*keys, *args]
+        by_slot: Dict[int, List[int]] = {}
+        for i, key in enumerate(keys):
+            by_slot.setdefault(key_slot(key.encode() if isinstance(key, str) else key), []).append(i)
+
+        base_mget = super().mget
+        if len(by_slot) <= 1:
+            return await base_mget(keys)
+
+        groups = list(by_slot.values())
+        replies = await asyncio.gather(*(base_mget([keys[i] for i in group]) for group in groups))
+        values: List[Any] = [None] * len(keys)
+        for group, reply in zip(groups, replies):
+            for i, value in zip(group, reply):
+                values[i] = value
+        return values
+
 
-        return rooms
\ No newline at end of file
+class CustomRedisCluster(ClusterSafeMixin, RedisCommandsMixin, RedisCluster):
+    """Клиент Redis Cluster с теми же дополнительными методами, что и CustomRedis"""
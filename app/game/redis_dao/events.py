@@ -0,0 +1,83 @@
+"""
+Журнал событий комнаты.
+
+room:{room_id}:events — Redis Stream событий, опубликованных в канал комнаты
+room#{room_id} (см. send_msg). Поток ограничен ROOM_EVENTS_MAXLEN записями
+(MAXLEN ~) и живёт столько же, сколько комната. id записи приходит клиенту в
+поле id сообщения Centrifugo; после переподключения клиент запрашивает только
+события после последнего полученного id, а не всю комнату.
+
+Если запрошенный id старше самой старой записи потока (журнал обрезан или
+истёк), часть событий потеряна: клиент получает reset и перечитывает комнату.
+"""
+import json
+import re
+from typing import Any, Dict, List, Tuple
+
+from app.config import settings
+from app.game.redis_dao.keys import room_events_key, decode_key
+from app.game.redis_dao.redis_room_dao import ROOM_TTL
+
+
+ROOM_CHANNEL_PREFIX = "room#"
+EVENT_ID_RE = re.compile(r"^\d+-\d+$")
+
+
+def parse_event_id(event_id: str) -> Tuple[int, int]:
+    """'1700000000000-0' -> (1700000000000, 0); бросает ValueError на некорректном id"""
+    if not EVENT_ID_RE.match(event_id or ""):
+        raise ValueError(f"Некорректный id события: {event_id}")
+    ms, seq = event_id.split("-")
+    return int(ms), int(seq)
+
+
+class RoomEventsDAO:
+    """DAO журнала событий комнаты (Redis Stream)"""
+
+    @staticmethod
+    async def append(redis, room_id: str, event: str, payload: Dict[str, Any]) -> str:
+        """Добавляет событие в журнал комнаты и продлевает его срок жизни. Возвращает id записи."""
+        key = room_events_key(room_id)
+        pipe = redis.pipeline(transaction=False)
+        pipe.xadd(
+            key,
+            {"event": event, "payload": json.dumps(payload, default=str)},
+            maxlen=settings.ROOM_EVENTS_MAXLEN,
+            approximate=True,
+        )
+        pipe.expire(key, ROOM_TTL + settings.ROOM_EXPIRY_GRACE)
+        event_id, _ = await pipe.execute()
+        return decode_key(event_id)
+
+    @staticmethod
+    async def read_after(
+        redis, room_id: str, after: str | None = None, limit: int = 100
+    ) -> Tuple[List[Dict[str, Any]], bool, bool]:
+        """
+        События после after (все — если after не задан), не больше limit.
+        Возвращает (события, есть ли ещё, reset — часть событий после after потеряна).
+        Бросает ValueError на некорректном after.
+        """
+        key = room_events_key(room_id)
+        start = "-"
+        if after:
+            parse_event_id(after)
+            start = f"({after}"
+
+        pipe = redis.pipeline(transaction=False)
+        pipe.xrange(key, "-", "+", count=1)
+        pipe.xrange(key, start, "+", count=limit + 1)
+        first, entries = await pipe.execute()
+
+        if after and (not first or parse_event_id(decode_key(first[0][0])) > parse_event_id(after)):
+            return [], False, True
+
+        events = []
+        for entry_id, fields in entries[:limit]:
+            fields = {decode_key(k): v for k, v in fields.items()}
+            events.append({
+                "id": decode_key(entry_id),
+                "event": decode_key(fields["event"]),
+                "payload": json.loads(fields["payload"]),
+            })
+        return events, len(entries) > limit, False
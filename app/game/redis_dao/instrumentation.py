@@ -0,0 +1,234 @@
+"""
+Учёт команд Redis по эндпоинтам.
+
+При REDIS_METRICS клиент (RedisCommandsMixin) замеряет каждую команду и
+pipeline: число вызовов и команд, время (сумма, максимум, гистограмма),
+байты запроса и ответа. Вызов приписывается эндпоинту текущего HTTP-запроса:
+RedisMetricsMiddleware кладёт запрос в contextvar, а метка вида
+'POST /burkozel/move' вычисляется по маршруту при первой команде. Команды вне
+запросов (сборщик комнат, миграция) попадают в метку 'background'.
+
+Запросы, потратившие на Redis больше REDIS_SLOW_REQUEST_MS, логируются.
+Когда учёт выключен, клиент и middleware делают одну проверку флага.
+Метрики отдаёт GET /admin/redis.
+"""
+import time
+from contextvars import ContextVar
+from typing import Any, Dict, List, Tuple
+
+from loguru import logger
+
+from app.config import settings
+
+
+# Верхние границы корзин гистограммы времени команды, мс (последняя корзина — больше 1000)
+BUCKETS_MS = (0.5, 1, 2, 5, 10, 25, 50, 100, 250, 500, 1000)
+BACKGROUND = "background"
+
+
+def payload_size(value: Any) -> int:
+    """Приблизительный размер аргументов или ответа Redis в байтах"""
+    if isinstance(value, (bytes, bytearray, str)):
+        return len(value)
+    if isinstance(value, (list, tuple, set)):
+        return sum(payload_size(v) for v in value)
+    if isinstance(value, dict):
+        return sum(payload_size(k) + payload_size(v) for k, v in value.items())
+    if value is None:
+        return 0
+    return 8
+
+
+class CommandStats:
+    """Счётчики одной команды в одной метке"""
+
+    __slots__ = ("calls", "commands", "errors", "time_total", "time_max", "buckets", "bytes_out", "bytes_in")
+
+    def __init__(self):
+        self.calls = 0
+        self.commands = 0
+        self.errors = 0
+        self.time_total = 0.0
+        self.time_max = 0.0
+        self.buckets = [0] * (len(BUCKETS_MS) + 1)
+        self.bytes_out = 0
+        self.bytes_in = 0
+
+    def observe(self, elapsed: float, commands: int, bytes_out: int, bytes_in: int, error: bool):
+        self.calls += 1
+        self.commands += commands
+        self.errors += error
+        self.time_total += elapsed
+        self.time_max = max(self.time_max, elapsed)
+        elapsed_ms = elapsed * 1000
+        for i, bound in enumerate(BUCKETS_MS):
+            if elapsed_ms <= bound:
+                self.buckets[i] += 1
+                break
+        else:
+            self.buckets[-1] += 1
+        self.bytes_out += bytes_out
+        self.bytes_in += bytes_in
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "commands": self.commands,
+            "errors": self.errors,
+            "time_ms": round(self.time_total * 1000, 3),
+            "avg_ms": round(self.time_total * 1000 / self.calls, 3) if self.calls else 0.0,
+            "max_ms": round(self.time_max * 1000, 3),
+            "histogram_ms": dict(zip([*map(str, BUCKETS_MS), "+inf"], self.buckets)),
+            "bytes_out": self.bytes_out,
+            "bytes_in": self.bytes_in,
+        }
+
+
+class RequestStats:
+    """Redis-нагрузка одного HTTP-запроса"""
+
+    __slots__ = ("scope", "_label", "calls", "commands", "time_total")
+
+    def __init__(self, scope):
+        self.scope = scope
+        self._label = None
+        self.calls = 0
+        self.commands = 0
+        self.time_total = 0.0
+
+    @property
+    def label(self) -> str:
+        if self._label is None:
+            label = route_label(self.scope)
+            if self.scope.get("endpoint") is None:
+                # маршрут ещё не найден — не запоминаем
+                return label
+            self._label = label
+        return self._label
+
+
+_current_request: ContextVar[RequestStats | None] = ContextVar("redis_request", default=None)
+_route_labels: Dict[Tuple[str, Any], str] = {}
+
+
+def route_label(scope) -> str:
+    """'METHOD /path/{param}' по найденному маршруту запроса"""
+    method = scope.get("method", "")
+    endpoint = scope.get("endpoint")
+    if endpoint is None:
+        return f"{method} <unmatched>"
+    label = _route_labels.get((method, endpoint))
+    if label is None:
+        app = scope.get("app")
+        path = next(
+            (r.path for r in getattr(app, "routes", ()) if getattr(r, "endpoint", None) is endpoint),
+            getattr(endpoint, "__name__", "?"),
+        )
+        label = _route_labels[(method, endpoint)] = f"{method} {path}"
+    return label
+
+
+class RedisMetrics:
+    """Метрики команд Redis: метка эндпоинта -> команда -> CommandStats"""
+
+    def __init__(self, enabled: bool = False, slow_request_ms: float = 0):
+        self.enabled = enabled
+        self.slow_request_ms = slow_request_ms
+        self._stats: Dict[str, Dict[str, CommandStats]] = {}
+
+    def observe(self, command: str, elapsed: float, commands: int, bytes_out: int, bytes_in: int, error: bool):
+        request = _current_request.get()
+        label = request.label if request is not None else BACKGROUND
+        by_command = self._stats.get(label)
+        if by_command is None:
+            by_command = self._stats[label] = {}
+        stats = by_command.get(command)
+        if stats is None:
+            stats = by_command[command] = CommandStats()
+        stats.observe(elapsed, commands, bytes_out, bytes_in, error)
+        if request is not None:
+            request.calls += 1
+            request.commands += commands
+            request.time_total += elapsed
+
+    def reset(self):
+        self._stats = {}
+
+    def snapshot(self) -> Dict[str, Any]:
+        endpoints = {}
+        for label, by_command in self._stats.items():
+            commands = {name: stats.snapshot() for name, stats in sorted(by_command.items())}
+            endpoints[label] = {
+                "calls": sum(c["calls"] for c in commands.values()),
+                "commands": sum(c["commands"] for c in commands.values()),
+                "time_ms": round(sum(c["time_ms"] for c in commands.values()), 3),
+                "bytes_out": sum(c["bytes_out"] for c in commands.values()),
+                "bytes_in": sum(c["bytes_in"] for c in commands.values()),
+                "by_command": commands,
+            }
+        return {
+            "enabled": self.enabled,
+            "endpoints": dict(sorted(endpoints.items(), key=lambda item: -item[1]["time_ms"])),
+        }
+
+
+redis_metrics = RedisMetrics(enabled=settings.REDIS_METRICS, slow_request_ms=settings.REDIS_SLOW_REQUEST_MS)
+
+
+async def observed(command: str, call, commands: int, args_size: int):
+    """Выполняет call() и записывает метрики команды"""
+    started = time.perf_counter()
+    result = None
+    error = False
+    try:
+        result = await call()
+        return result
+    except Exception:
+        error = True
+        raise
+    finally:
+        redis_metrics.observe(
+            command, time.perf_counter() - started, commands, args_size, payload_size(result), error
+        )
+
+
+def instrument_pipeline(pipe, transaction: bool):
+    """Подменяет execute у pipeline: весь pipeline учитывается одним вызовом PIPELINE/MULTI"""
+    execute = pipe.execute
+
+    async def instrumented_execute(*args, **kwargs):
+        stack: List = pipe.command_stack
+        return await observed(
+            "MULTI" if transaction else "PIPELINE",
+            lambda: execute(*args, **kwargs),
+            len(stack),
+            sum(payload_size(cmd_args) for cmd_args, _ in stack),
+        )
+
+    pipe.execute = instrumented_execute
+    return pipe
+
+
+class RedisMetricsMiddleware:
+    """ASGI middleware: привязывает команды Redis к текущему HTTP-запросу"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not redis_metrics.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        request = RequestStats(scope)
+        token = _current_request.set(request)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _current_request.reset(token)
+            threshold = redis_metrics.slow_request_ms
+            if threshold and request.time_total * 1000 > threshold:
+                logger.warning(
+                    f"[REDIS] {request.label}: {request.calls} вызовов, {request.commands} команд, "
+                    f"{request.time_total * 1000:.1f} мс в Redis"
+                )
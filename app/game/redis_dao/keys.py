@@ -0,0 +1,120 @@
+"""
+Схема ключей Redis.
+
+Все ключи приложения лежат в пространствах имён:
+    room:{room_id}                  — комната
+    room:{room_id}:state / :ready   — служебные данные комнаты (GameRedisDAO)
+    room:{room_id}:expiry           — теневой ключ срока жизни комнаты (см. reaper.py)
+    room:{room_id}:events           — журнал событий комнаты, Redis Stream (см. events.py)
+    idx:registry[...]               — реестр комнат (ZSET по created_at) и его срезы
+    idx:online                      — игроки в комнатах (ZSET по времени истечения)
+    player:{tg_id}                  — id комнаты, где сидит игрок (см. presence.py)
+    idx:...                         — прочие индексы
+    cache:...                       — результаты декоратора cached
+    cache:tag:{tag}                 — поколение тега кэша (см. cache.py)
+    outbox:{centrifugo}[:...]       — очередь публикаций в Centrifugo (см. outbox.py)
+
+Фигурные скобки в ключах комнаты — hash tag Redis Cluster: все ключи одной
+комнаты попадают в один слот, поэтому операции над комнатой и её служебными
+ключами работают и в кластере. Индексы idx:* — отдельные ключи в своих слотах.
+
+Благодаря индексам ни одному пути кода не нужен KEYS * или SCAN по всей базе.
+"""
+
+ROOM_PREFIX = "room:"
+INDEX_PREFIX = "idx:"
+CACHE_PREFIX = "cache:"
+PLAYER_PREFIX = "player:"
+OUTBOX_PREFIX = "outbox:"
+
+NAMESPACES = (ROOM_PREFIX, INDEX_PREFIX, CACHE_PREFIX, PLAYER_PREFIX, OUTBOX_PREFIX)
+
+# Реестр комнат: ZSET room_id -> created_at (unix time) и срезы по ставке и статусу
+REGISTRY = f"{INDEX_PREFIX}registry"
+ROOM_STATUSES = ("waiting", "matched", "playing")
+
+# Игроки онлайн: ZSET tg_id -> время истечения (см. presence.py)
+ONLINE_INDEX = f"{INDEX_PREFIX}online"
+
+# Очередь публикаций (LIST), сообщения в отправке и блокировка публикующего процесса;
+# общий hash tag — один слот в кластере
+OUTBOX = f"{OUTBOX_PREFIX}{{centrifugo}}"
+OUTBOX_PROCESSING = f"{OUTBOX}:processing"
+OUTBOX_LOCK = f"{OUTBOX}:lock"
+
+
+def room_key(room_id: str) -> str:
+    return f"{ROOM_PREFIX}{{{room_id}}}"
+
+
+def room_state_key(room_id: str) -> str:
+    return f"{room_key(room_id)}:state"
+
+
+def room_ready_key(room_id: str) -> str:
+    return f"{room_key(room_id)}:ready"
+
+
+def room_expiry_key(room_id: str) -> str:
+    return f"{room_key(room_id)}:expiry"
+
+
+def room_events_key(room_id: str) -> str:
+    return f"{room_key(room_id)}:events"
+
+
+def room_reaping_key(room_id: str) -> str:
+    return f"{room_key(room_id)}:reaping"
+
+
+def parse_room_key(key: str) -> tuple[str, str] | None:
+    """room:{room_id}[:suffix] -> (room_id, suffix); None для прочих ключей"""
+    if not key.startswith(ROOM_PREFIX + "{"):
+        return None
+    room_id, sep, suffix = key[len(ROOM_PREFIX) + 1:].partition("}")
+    if not sep or not room_id or (suffix and not suffix.startswith(":")):
+        return None
+    return room_id, suffix[1:]
+
+
+def parse_room_expiry_key(key: str) -> str | None:
+    """room:{room_id}:expiry -> room_id (None для прочих ключей)"""
+    parsed = parse_room_key(key)
+    if parsed and parsed[1] == "expiry":
+        return parsed[0]
+    return None
+
+
+def player_key(tg_id) -> str:
+    return f"{PLAYER_PREFIX}{tg_id}"
+
+
+def registry_key(stake=None, status: str | None = None) -> str:
+    """
+    Ключ среза реестра:
+        idx:registry, idx:registry:stake:{stake}, idx:registry:status:{status},
+        idx:registry:stake:{stake}:status:{status}
+    """
+    key = REGISTRY
+    if stake is not None:
+        key += f":stake:{stake}"
+    if status is not None:
+        key += f":status:{status}"
+    return key
+
+
+def cache_key(key: str) -> str:
+    return f"{CACHE_PREFIX}{key}"
+
+
+def cache_tag_key(tag: str) -> str:
+    return f"{CACHE_PREFIX}tag:{tag}"
+
+
+def is_namespaced(key: str) -> bool:
+    return key.startswith(NAMESPACES)
+
+
+def decode_key(key) -> str:
+    """Ключ из ответа Redis (bytes при decode_responses=False) -> str"""
+    return key.decode() if isinstance(key, (bytes, bytearray)) else key
@@ -1,9 +1,16 @@
+import asyncio
+
 from fastapi import Depends
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.config import settings
+from app.database import async_session_maker
 from app.game.redis_dao.redis_client import RedisClient
-from app.game.redis_dao.custom_redis import CustomRedis
+from app.game.redis_dao.custom_redis import CustomRedis, CustomRedisCluster
+from app.game.redis_dao.keys import cache_key as make_cache_key
+from app.game.redis_dao.cache import TwoTierCache
 from functools import wraps
-from typing import Callable, Awaitable, Any
+from typing import Callable, Awaitable, Any, Iterable
 from loguru import logger
 
 
@@ -12,21 +19,52 @@ redis_manager = RedisClient(
     port=settings.REDIS_PORT,
     password=settings.REDIS_PASSWORD,
     ssl_flag=settings.REDIS_SSL,
+    cluster=settings.REDIS_CLUSTER,
+    near_cache_size=settings.REDIS_NEAR_CACHE_SIZE,
 )
 
 
-async def get_redis() -> CustomRedis:
+async def get_redis() -> CustomRedis | CustomRedisCluster:
     """Функция зависимости для получения клиента Redis"""
     return redis_manager.get_client()
 
 
-def cached(cache_key: str, ttl: int = 1800):
+# Теги кэша: результаты, зависящие от пользователя, и справочник игр
+USER_TAG = "user:{tg_id}"
+GAME_TYPES_TAG = "game_types"
+
+
+def user_tag(tg_id) -> str:
+    return USER_TAG.format(tg_id=tg_id)
+
+
+cache = TwoTierCache(
+    maxsize=settings.CACHE_L1_MAXSIZE,
+    l1_ttl=settings.CACHE_L1_TTL,
+    gen_ttl=settings.CACHE_TAG_GEN_TTL,
+)
+
+
+def cached(
+    cache_key: str,
+    ttl: int = 1800,
+    stale_ttl: int = 0,
+    negative_ttl: int = 60,
+    tags: Iterable[str] = (),
+):
     """
-    Декоратор для кэширования результатов функции.
+    Декоратор для кэширования результатов функции (L1 в памяти + L2 в Redis, см. cache.py).
 
     Args:
         cache_key: Ключ для кэширования данных. Поддерживает форматирование строки с использованием параметров функции.
+            В Redis хранится с префиксом cache:.
         ttl: Время жизни кэша в секундах (по умолчанию 30 минут).
+        stale_ttl: Сколько секунд после ttl отдавать устаревшее значение, обновляя его в фоне (0 — не отдавать).
+            Фоновое обновление идёт после ответа, когда сессия запроса уже закрыта: оно открывает
+            свою сессию через async_session_maker. Сессию поэтому передают именованным аргументом.
+        negative_ttl: Время жизни пустого результата (None) в секундах (0 — не кэшировать).
+        tags: Теги результата, форматируются как cache_key (например "user:{tg_id}").
+            invalidate(tag) сбрасывает все результаты с этим тегом.
     """
 
     def decorator(func: Callable[..., Awaitable[Any]]):
@@ -35,6 +73,7 @@ def cached(cache_key: str, ttl: int = 1800):
             try:
                 # Форматируем ключ кэша, используя все доступные параметры
                 formatted_key = cache_key.format(**kwargs)
+                formatted_tags = [tag.format(**kwargs) for tag in tags]
             except KeyError as e:
                 logger.error(f"Ошибка форматирования ключа кэша: {e}")
                 # В случае ошибки форматирования возвращаем результат без кэширования
@@ -45,23 +84,79 @@ def cached(cache_key: str, ttl: int = 1800):
 
             try:
                 redis = await get_redis()
-                result = await redis.get_cached_data(
-                    cache_key=formatted_key,
-                    fetch_data_func=func,
-                    ttl=ttl,
-                    *args,
-                    **kwargs,
-                )
-                if result is None:
-                    logger.warning(
-                        f"Получено пустое значение из кэша для ключа {formatted_key}"
-                    )
-                return result
             except Exception as e:
                 logger.error(f"Ошибка при работе с Redis: {e}")
-                # В случае ошибки Redis возвращаем результат без кэширования
-                return await func(*args, **kwargs)
+                # без Redis работаем только с L1
+                redis = None
+
+            # ошибки Redis обрабатываются внутри кэша, ошибки func пробрасываются как есть
+            return await cache.get_or_load(
+                redis,
+                await cache.versioned_key(redis, make_cache_key(formatted_key), formatted_tags),
+                lambda: func(*args, **kwargs),
+                ttl=ttl,
+                stale_ttl=stale_ttl,
+                negative_ttl=negative_ttl,
+                refresh_loader=_with_own_session(func, args, kwargs) if stale_ttl > 0 else None,
+            )
 
         return wrapper
 
     return decorator
+
+
+def _with_own_session(func: Callable[..., Awaitable[Any]], args: tuple, kwargs: dict):
+    """Загрузчик для фонового обновления: сессии БД из kwargs заменяются своей"""
+    if any(isinstance(arg, AsyncSession) for arg in args):
+        raise TypeError(f"{func.__name__}: при stale_ttl сессию передают именованным аргументом")
+    names = [name for name, value in kwargs.items() if isinstance(value, AsyncSession)]
+    if not names:
+        return lambda: func(*args, **kwargs)
+
+    async def load():
+        async with async_session_maker() as session:
+            return await func(*args, **{**kwargs, **dict.fromkeys(names, session)})
+
+    return load
+
+
+async def invalidate(*tags: str):
+    """Сбрасывает результаты cached с данными тегами"""
+    try:
+        redis = await get_redis()
+    except Exception as e:
+        logger.error(f"Ошибка при работе с Redis: {e}")
+        redis = None
+    await cache.invalidate(redis, *tags)
+
+
+_invalidation_tasks: set = set()
+
+
+def invalidate_on_commit(session: AsyncSession, *tags: str):
+    """
+    Сбрасывает теги после успешного commit сессии.
+    Сброс до commit не годится: параллельный запрос успел бы закэшировать старые данные.
+    При rollback теги забываются.
+    """
+    info = session.info
+    if "cache_tags" not in info:
+        info["cache_tags"] = set()
+        event.listen(session.sync_session, "after_commit", _flush_cache_tags)
+        event.listen(session.sync_session, "after_rollback", _drop_cache_tags)
+    info["cache_tags"].update(tags)
+
+
+def _flush_cache_tags(sync_session):
+    tags = sync_session.info.get("cache_tags")
+    if not tags:
+        return
+    pending = tuple(tags)
+    tags.clear()
+    task = asyncio.get_running_loop().create_task(invalidate(*pending))
+    _invalidation_tasks.add(task)
+    task.add_done_callback(_invalidation_tasks.discard)
+
+
+def _drop_cache_tags(sync_session):
+    sync_session.info.get("cache_tags", set()).clear()
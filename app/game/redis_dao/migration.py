@@ -0,0 +1,91 @@
+"""
+Онлайн-миграция ключей Redis на схему с пространствами имён (см. keys.py).
+
+Старые комнаты лежали под голыми ключами вида '10_a535d472', а служебные
+данные GameRedisDAO — под 'game:{room_id}:state|ready'. Миграция идёт фоном
+после старта: SCAN небольшими страницами, перенос с сохранением TTL и UNLINK
+старого ключа. Перенесённая комната сразу заносится в реестр idx:registry*,
+счётчик онлайна и привязки игроков player:{tg_id} (RoomRedisDAO.migrate_legacy).
+
+Пока миграция не закончилась в этом процессе (RoomRedisDAO.legacy_pending),
+RoomRedisDAO.get переносит непрошедшие миграцию комнаты сам при первом
+обращении; после — промах остаётся промахом. Переносится только значение,
+похожее на комнату (room_id, stake, players).
+
+В Redis Cluster старые и новые ключи лежат в разных слотах, поэтому перенос
+там не выполняется: кластер предполагается новым, без данных старой схемы.
+
+Ключи старого декоратора cached не переносятся: они заполнятся заново
+под cache:* и истекут по своему TTL.
+"""
+import asyncio
+
+from loguru import logger
+from redis.exceptions import ResponseError
+
+from app.game.redis_dao.keys import room_state_key, room_ready_key, decode_key
+from app.game.redis_dao.redis_room_dao import RoomRedisDAO
+
+
+# Старый ключ комнаты: '{stake}_{id}'
+LEGACY_ROOM_PATTERN = "[0-9]*_*"
+# Старые ключи GameRedisDAO: 'game:{room_id}:state' и 'game:{room_id}:ready'
+LEGACY_GAME_PATTERN = "game:*"
+
+
+async def _migrate_game_key(redis, key: str) -> bool:
+    """Переносит game:{room_id}:state|ready на room:{room_id}:state|ready"""
+    parts = key.split(":")
+    if len(parts) != 3:
+        return False
+    _, room_id, kind = parts
+    if kind == "state":
+        new_key = room_state_key(room_id)
+    elif kind == "ready":
+        new_key = room_ready_key(room_id)
+    else:
+        return False
+
+    # RENAMENX сохраняет TTL и тип значения; если новый ключ уже есть — старый не нужен
+    if not await redis.renamenx(key, new_key):
+        await redis.unlink(key)
+    return True
+
+
+async def migrate_legacy_keys(redis, batch_size: int = 500) -> dict:
+    """Один проход миграции. Возвращает число перенесённых ключей."""
+    rooms = 0
+    game_keys = 0
+
+    if getattr(redis, "is_cluster", False):
+        # переносы между слотами в кластере невозможны
+        return {"rooms": rooms, "game_keys": game_keys}
+
+    async for raw_key in redis.scan_iter(match=LEGACY_ROOM_PATTERN, count=batch_size):
+        if await RoomRedisDAO.migrate_legacy(redis, decode_key(raw_key)) is not None:
+            rooms += 1
+
+    async for raw_key in redis.scan_iter(match=LEGACY_GAME_PATTERN, count=batch_size):
+        try:
+            if await _migrate_game_key(redis, decode_key(raw_key)):
+                game_keys += 1
+        except ResponseError as e:
+            logger.warning(f"Не удалось перенести ключ {raw_key}: {e}")
+
+    return {"rooms": rooms, "game_keys": game_keys}
+
+
+async def run_key_migration(redis, batch_size: int = 500):
+    """Фоновая задача миграции для lifespan: ошибки логируются, старт приложения не блокируется."""
+    try:
+        result = await migrate_legacy_keys(redis, batch_size=batch_size)
+        # старых ключей не осталось: промахи RoomRedisDAO.get больше не ищут их
+        RoomRedisDAO.legacy_pending = False
+        logger.info(
+            f"Миграция ключей Redis завершена: комнат {result['rooms']}, "
+            f"служебных ключей {result['game_keys']}"
+        )
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        logger.error(f"Ошибка миграции ключей Redis: {e}")
@@ -0,0 +1,178 @@
+"""
+Ближний кэш (client-side caching) горячих ключей Redis в памяти процесса.
+
+Кэш держится на серверном отслеживании ключей (CLIENT TRACKING): отдельное
+соединение включает режим BCAST по префиксам и перенаправляет уведомления
+(REDIRECT) соединению-слушателю, подписанному на __redis__:invalidate. Любая
+запись в ключ с этим префиксом — из любого соединения, истечение TTL, вытеснение —
+приходит слушателю, и ключ удаляется из памяти.
+
+Значение сохраняется, только если во время чтения не пришло уведомление об этом
+ключе: ответ на GET, прочитанный до параллельной записи, в кэш не попадает.
+Пока слушатель не подключён (старт, обрыв связи), кэш пуст и чтения идут в Redis.
+
+Собственные записи процесса кэш узнаёт тем же уведомлением, но раньше его
+DAO сбрасывает ключ сам (forget_tracked), чтобы следующий запрос в этом же
+процессе сразу прочитал новую версию.
+"""
+import asyncio
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Iterable, List
+
+from loguru import logger
+
+
+INVALIDATE_CHANNEL = "__redis__:invalidate"
+RECONNECT_DELAY = 5
+HEALTH_CHECK_INTERVAL = 30
+
+_MISSING = object()
+
+
+class NearCache:
+    """LRU значений ключей с инвалидацией по уведомлениям Redis"""
+
+    def __init__(self, redis, prefixes: Iterable[str], maxsize: int = 10000):
+        self._redis = redis
+        self.prefixes = tuple(prefixes)
+        self.maxsize = maxsize
+        self.active = False
+        self._data: "OrderedDict[str, Any]" = OrderedDict()
+        # ключ -> [число чтений в полёте, пришло ли уведомление во время чтения]
+        self._pending: Dict[str, List] = {}
+        self._epoch = 0
+        self._task: asyncio.Task | None = None
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def covers(self, key: str) -> bool:
+        return key.startswith(self.prefixes)
+
+    async def get(self, key: str, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        """Значение из памяти или fetch() с сохранением результата"""
+        if not self.active:
+            return await fetch()
+
+        value = self._data.get(key, _MISSING)
+        if value is not _MISSING:
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+        self.misses += 1
+        epoch = self._epoch
+        pending = self._pending.setdefault(key, [0, False])
+        pending[0] += 1
+        try:
+            value = await fetch()
+            if value is not None and self.active and epoch == self._epoch and not pending[1]:
+                self._store(key, value)
+            return value
+        finally:
+            pending[0] -= 1
+            if pending[0] == 0:
+                self._pending.pop(key, None)
+
+    def invalidate(self, keys: Iterable[str] | None = None):
+        """Удаляет ключи из памяти; None — сбросить всё (FLUSHDB, потеря связи)"""
+        if keys is None:
+            self._epoch += 1
+            self._data.clear()
+            for pending in self._pending.values():
+                pending[1] = True
+            return
+        for key in keys:
+            self.invalidations += 1
+            self._data.pop(key, None)
+            pending = self._pending.get(key)
+            if pending is not None:
+                pending[1] = True
+
+    def _store(self, key: str, value: Any):
+        self._data[key] = value
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def snapshot(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "active": self.active,
+            "size": len(self._data),
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+        }
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        self.active = False
+        self.invalidate()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            pool = self._redis.connection_pool
+            listener = pool.make_connection()
+            tracker = pool.make_connection()
+            try:
+                await listener.connect()
+                await tracker.connect()
+                listener_id = await self._command(listener, "CLIENT", "ID")
+                await listener.send_command("SUBSCRIBE", INVALIDATE_CHANNEL)
+                await listener.read_response()
+                await self._enable_tracking(tracker, listener_id)
+
+                self.invalidate()
+                self.active = True
+                logger.info(f"[NEAR-CACHE] Отслеживание ключей включено: {', '.join(self.prefixes)}")
+                while True:
+                    message = await listener.read_response(timeout=HEALTH_CHECK_INTERVAL)
+                    if message is None:
+                        # тишина: убеждаемся, что соединение с отслеживанием живо
+                        await self._command(tracker, "PING")
+                        continue
+                    self._handle(message)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"[NEAR-CACHE] Отслеживание ключей прервано: {e}")
+            finally:
+                # без уведомлений кэшу верить нельзя
+                self.active = False
+                self.invalidate()
+                await listener.disconnect()
+                await tracker.disconnect()
+            await asyncio.sleep(RECONNECT_DELAY)
+
+    async def _enable_tracking(self, tracker, listener_id):
+        prefixes = [arg for prefix in self.prefixes for arg in ("PREFIX", prefix)]
+        await self._command(tracker, "CLIENT", "TRACKING", "ON", "REDIRECT", listener_id, "BCAST", *prefixes)
+
+    @staticmethod
+    async def _command(connection, *args):
+        await connection.send_command(*args)
+        return await connection.read_response()
+
+    def _handle(self, message):
+        kind = message[0].decode() if isinstance(message[0], bytes) else message[0]
+        if kind != "message":
+            return
+        keys = message[2]
+        if keys is None:
+            self.invalidate()
+            return
+        if not isinstance(keys, list):
+            keys = [keys]
+        self.invalidate(k.decode() if isinstance(k, bytes) else k for k in keys)
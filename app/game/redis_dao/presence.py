@@ -0,0 +1,66 @@
+"""
+Счётчик игроков онлайн.
+
+idx:online — ZSET tg_id -> время истечения (unix time). Игрок попадает туда,
+когда сохраняется комната, где он сидит, и уходит при выходе из комнаты или
+её удалении. Если комната истекла по TTL, игрок выпадает из счётчика сам:
+перед подсчётом просроченные записи снимаются ZREMRANGEBYSCORE.
+
+player:{tg_id} — обратный индекс: id комнаты, где сидит игрок. Обновляется
+в той же транзакции, что и сама комната, и живёт столько же, сколько она.
+"""
+import time
+from typing import Iterable
+
+from app.config import settings
+from app.game.redis_dao.keys import ONLINE_INDEX, player_key
+
+
+class OnlineDAO:
+    """Инкрементальный учёт игроков, сидящих в комнатах"""
+
+    @staticmethod
+    def touch(pipe, player_ids: Iterable, ttl: int):
+        """Добавляет в pipeline отметку игроков онлайн на ttl секунд"""
+        expires_at = time.time() + ttl
+        mapping = {str(pid): expires_at for pid in player_ids}
+        if mapping:
+            pipe.zadd(ONLINE_INDEX, mapping)
+
+    @staticmethod
+    def remove(pipe, player_ids: Iterable):
+        """Добавляет в pipeline снятие игроков из онлайна"""
+        members = [str(pid) for pid in player_ids]
+        if members:
+            pipe.zrem(ONLINE_INDEX, *members)
+
+    @staticmethod
+    async def count(redis) -> int:
+        """Число игроков онлайн: не зависит от количества комнат"""
+        pipe = redis.pipeline(transaction=False)
+        pipe.zremrangebyscore(ONLINE_INDEX, "-inf", time.time())
+        pipe.zcard(ONLINE_INDEX)
+        _, online = await pipe.execute()
+        return online
+
+
+class PlayerRoomDAO:
+    """Обратный индекс игрок -> комната (ключи player:{tg_id})"""
+
+    @staticmethod
+    def assign(pipe, room_id: str, player_ids: Iterable, ttl: int | None, nx: bool = False):
+        """Добавляет в pipeline привязку игроков к комнате (ttl=None — без времени жизни)"""
+        ex = ttl + settings.ROOM_EXPIRY_GRACE if ttl else None
+        for pid in player_ids:
+            pipe.set(player_key(pid), room_id, ex=ex, nx=nx)
+
+    @staticmethod
+    def release(pipe, player_ids: Iterable):
+        """Добавляет в pipeline снятие привязки игроков (по ключу на команду — ключи в разных слотах)"""
+        for pid in player_ids:
+            pipe.unlink(player_key(pid))
+
+    @staticmethod
+    async def get_room_id(redis, tg_id) -> str | None:
+        room_id = await redis.get(player_key(tg_id))
+        return room_id.decode() if isinstance(room_id, bytes) else room_id
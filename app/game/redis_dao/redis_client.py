@@ -1,10 +1,14 @@
 from loguru import logger
-from typing import Optional
-from app.game.redis_dao.custom_redis import CustomRedis
+from typing import Optional, List
+from app.game.redis_dao.custom_redis import CustomRedis, CustomRedisCluster
 
 
 class RedisClient:
-    """Класс для управления подключением к Redis с поддержкой явного и автоматического управления."""
+    """
+    Класс для управления подключением к Redis с поддержкой явного и автоматического управления.
+    При cluster=True host:port — любой узел Redis Cluster, остальные узлы клиент находит сам.
+    near_cache_size > 0 включает ближний кэш комнат на это число ключей (только без кластера).
+    """
 
     def __init__(
         self,
@@ -14,6 +18,8 @@ class RedisClient:
         ssl_cert_reqs: str = "none",
         password: str | None = None,
         user: str = "default",
+        cluster: bool = False,
+        near_cache_size: int = 0,
     ):
         self.host = host
         self.port = port
@@ -21,37 +27,82 @@ class RedisClient:
         self.ssl_flag = ssl_flag
         self.user = user
         self.ssl_cert_reqs = ssl_cert_reqs
-        self._client: Optional[CustomRedis] = None
+        self.cluster = cluster
+        self.near_cache_size = near_cache_size
+        self._client: Optional[CustomRedis | CustomRedisCluster] = None
+        self._node_clients: List[CustomRedis] = []
 
     async def connect(self):
         """Создает и сохраняет подключение к Redis."""
         if self._client is None:
             try:
-                self._client = CustomRedis(
-                    host=self.host,
-                    port=self.port,
+                if self.cluster:
+                    self._client = CustomRedisCluster(
+                        host=self.host,
+                        port=self.port,
+                        password=self.password,
+                        ssl=self.ssl_flag,
+                        username=self.user,
+                        ssl_cert_reqs=self.ssl_cert_reqs,
+                        health_check_interval=30,
+                    )
+                    await self._client.initialize()
+                else:
+                    self._client = CustomRedis(
+                        host=self.host,
+                        port=self.port,
+                        password=self.password,
+                        ssl=self.ssl_flag,
+                        username=self.user,
+                        ssl_cert_reqs=self.ssl_cert_reqs,
+                        retry_on_timeout=True,
+                        health_check_interval=30,
+                    )
+                # Проверяем подключение
+                await self._client.ping()
+                logger.info(f"Redis подключен успешно{' (cluster)' if self.cluster else ''}")
+                if self.near_cache_size > 0:
+                    self._client.enable_near_cache(maxsize=self.near_cache_size)
+            except Exception as e:
+                logger.error(f"Ошибка подключения к Redis: {e}")
+                raise
+
+    def node_clients(self) -> List[CustomRedis]:
+        """
+        Клиенты отдельных мастер-узлов — для того, что в кластере работает
+        только в пределах узла (Pub/Sub событий keyspace). Без кластера — сам клиент.
+        """
+        client = self.get_client()
+        if not self.cluster:
+            return [client]
+        if not self._node_clients:
+            self._node_clients = [
+                CustomRedis(
+                    host=node.host,
+                    port=node.port,
                     password=self.password,
                     ssl=self.ssl_flag,
                     username=self.user,
                     ssl_cert_reqs=self.ssl_cert_reqs,
-                    retry_on_timeout=True,
                     health_check_interval=30,
                 )
-                # Проверяем подключение
-                await self._client.ping()
-                logger.info("Redis подключен успешно")
-            except Exception as e:
-                logger.error(f"Ошибка подключения к Redis: {e}")
-                raise
+                for node in client.get_primaries()
+            ]
+        return self._node_clients
 
     async def close(self):
         """Закрывает подключение к Redis."""
+        for node_client in self._node_clients:
+            await node_client.aclose()
+        self._node_clients = []
         if self._client:
+            if self._client.near_cache is not None:
+                await self._client.near_cache.stop()
             await self._client.aclose()
             self._client = None
             logger.info("Redis соединение закрыто")
 
-    def get_client(self) -> CustomRedis:
+    def get_client(self) -> CustomRedis | CustomRedisCluster:
         """Возвращает объект клиента Redis."""
         if self._client is None:
             raise RuntimeError("Redis клиент не инициализирован. Проверьте lifespan.")
@@ -1,5 +1,6 @@
 import json
 from typing import Any, Dict
+from app.game.redis_dao.keys import room_state_key, room_ready_key
 from app.game.redis_dao.manager import get_redis
 
 
@@ -10,14 +11,14 @@ class GameRedisDAO:
     async def save_game_state(room_id: str, state: Dict[str, Any], ttl: int = 3600):
         """Сохраняет состояние игры"""
         redis = await get_redis()
-        key = f"game:{room_id}:state"
+        key = room_state_key(room_id)
         await redis.setex(key, ttl, json.dumps(state))
 
     @staticmethod
     async def get_game_state(room_id: str) -> Dict[str, Any] | None:
         """Возвращает состояние игры"""
         redis = await get_redis()
-        key = f"game:{room_id}:state"
+        key = room_state_key(room_id)
         value = await redis.get(key)
         return json.loads(value) if value else None
 
@@ -25,14 +26,14 @@ class GameRedisDAO:
     async def delete_game_state(room_id: str):
         """Удаляет состояние игры"""
         redis = await get_redis()
-        key = f"game:{room_id}:state"
+        key = room_state_key(room_id)
         await redis.delete_key(key)
 
     @staticmethod
     async def add_player_ready(room_id: str, player_id: str, ttl: int = 600):
         """Помечает игрока как готового"""
         redis = await get_redis()
-        key = f"game:{room_id}:ready"
+        key = room_ready_key(room_id)
         await redis.hset(key, player_id, "ready")
         await redis.expire(key, ttl)
 
@@ -40,6 +41,6 @@ class GameRedisDAO:
     async def get_ready_players(room_id: str) -> list[str]:
         """Возвращает список игроков, которые нажали 'Готов'"""
         redis = await get_redis()
-        key = f"game:{room_id}:ready"
+        key = room_ready_key(room_id)
         players = await redis.hkeys(key)
         return [p.decode() for p in players]
\ No newline at end of file
@@ -0,0 +1,461 @@
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Tuple
+
+from loguru import logger
+from redis.exceptions import ResponseError, WatchError
+
+from app.config import settings
+from app.exception import RoomIsFullException
+from app.game.redis_dao.keys import (
+    REGISTRY,
+    ROOM_STATUSES,
+    room_key,
+    room_expiry_key,
+    room_events_key,
+    player_key,
+    registry_key,
+    is_namespaced,
+    decode_key,
+)
+from app.game.redis_dao.presence import OnlineDAO, PlayerRoomDAO
+from app.game.redis_dao.serializers import get_room_serializer, loads_room
+
+
+ROOM_TTL = 3600
+LOBBY_PAGE_MAX = 100
+
+
+def room_score(room: Dict[str, Any]) -> float:
+    """Score комнаты в реестре: created_at в unix time (наивное время считаем UTC)"""
+    try:
+        created_at = datetime.fromisoformat(room["created_at"])
+    except (KeyError, TypeError, ValueError):
+        return time.time()
+    if created_at.tzinfo is None:
+        created_at = created_at.replace(tzinfo=timezone.utc)
+    return created_at.timestamp()
+
+
+def encode_cursor(score: float, room_id: str) -> str:
+    return f"{score!r}:{room_id}"
+
+
+def decode_cursor(cursor: str) -> Tuple[float, str]:
+    """Бросает ValueError на некорректном курсоре"""
+    score, sep, room_id = cursor.partition(":")
+    if not sep or not room_id:
+        raise ValueError(f"Некорректный курсор: {cursor}")
+    return float(score), room_id
+
+
+def is_legacy_room(value: Any, room_id: str) -> bool:
+    """Значение старого ключа — комната room_id, а не посторонний JSON под похожим ключом"""
+    return (
+        isinstance(value, dict)
+        and value.get("room_id") == room_id
+        and "stake" in value
+        and isinstance(value.get("players"), dict)
+    )
+
+
+class RoomRedisDAO:
+    """DAO для хранения комнат в Redis (ключ room:{room_id} + реестр idx:registry*)"""
+
+    serializer = get_room_serializer(settings.ROOM_SERIALIZER)
+    # комнаты могут лежать под старыми ключами, пока фоновая миграция (migration.py)
+    # не прошла в этом процессе: до тех пор промах get переносит комнату сам
+    legacy_pending = True
+
+    @classmethod
+    def dumps(cls, room: Dict[str, Any]) -> bytes | str:
+        """Сериализует комнату текущим форматом (settings.ROOM_SERIALIZER)"""
+        return cls.serializer.dumps(room)
+
+    @staticmethod
+    def loads(raw: bytes | str) -> Dict[str, Any]:
+        """Декодирует комнату в любом поддерживаемом формате"""
+        return loads_room(raw)
+
+    @staticmethod
+    def _index(pipe, room_id: str, room: Dict[str, Any], ttl: int | None = ROOM_TTL):
+        """
+        Добавляет в pipeline обновление реестра: комната попадает в срезы
+        своей ставки и текущего статуса и удаляется из срезов других статусов.
+        Игроки комнаты отмечаются онлайн и привязываются к ней на время жизни комнаты.
+        """
+        OnlineDAO.touch(pipe, room.get("players", {}), ttl or ROOM_TTL)
+        PlayerRoomDAO.assign(pipe, room_id, room.get("players", {}), ttl)
+
+        score = room_score(room)
+        stake = room.get("stake")
+        status = room.get("status")
+
+        pipe.zadd(REGISTRY, {room_id: score})
+        if stake is not None:
+            pipe.zadd(registry_key(stake=stake), {room_id: score})
+        for st in ROOM_STATUSES:
+            if st == status:
+                pipe.zadd(registry_key(status=st), {room_id: score})
+                if stake is not None:
+                    pipe.zadd(registry_key(stake=stake, status=st), {room_id: score})
+            else:
+                pipe.zrem(registry_key(status=st), room_id)
+                if stake is not None:
+                    pipe.zrem(registry_key(stake=stake, status=st), room_id)
+
+    @staticmethod
+    def _unindex(pipe, room_id: str, room: Dict[str, Any] | None):
+        """Добавляет в pipeline удаление комнаты из всех срезов реестра и её игроков из онлайна"""
+        if room:
+            OnlineDAO.remove(pipe, room.get("players", {}))
+            PlayerRoomDAO.release(pipe, room.get("players", {}))
+        stake = room.get("stake") if room else None
+        pipe.zrem(REGISTRY, room_id)
+        if stake is not None:
+            pipe.zrem(registry_key(stake=stake), room_id)
+        for st in ROOM_STATUSES:
+            pipe.zrem(registry_key(status=st), room_id)
+            if stake is not None:
+                pipe.zrem(registry_key(stake=stake, status=st), room_id)
+
+    @staticmethod
+    def _pipeline(redis):
+        """
+        Pipeline записи комнаты: MULTI/EXEC, чтобы комната, реестр и привязки
+        игроков менялись вместе. В Redis Cluster ключи лежат в разных слотах,
+        и транзакция невозможна — там это обычный pipeline.
+        """
+        return redis.pipeline(transaction=not getattr(redis, "is_cluster", False))
+
+    @staticmethod
+    def _set_room(pipe, room_id: str, raw, ttl_ms: int | None, nx: bool = False):
+        """Добавляет в pipeline запись комнаты и её теневого ключа срока жизни"""
+        if ttl_ms:
+            pipe.set(room_key(room_id), raw, px=ttl_ms + settings.ROOM_EXPIRY_GRACE * 1000, nx=nx)
+            pipe.set(room_expiry_key(room_id), 1, px=ttl_ms, nx=nx)
+        else:
+            pipe.set(room_key(room_id), raw, nx=nx)
+            if not nx:
+                pipe.unlink(room_expiry_key(room_id))
+
+    @staticmethod
+    async def _get_raw(redis, key: str):
+        """GET через ближний кэш клиента, если он включён (см. near_cache.py)"""
+        if getattr(redis, "near_cache", None) is None:
+            return await redis.get(key)
+        return await redis.get_tracked(key)
+
+    @staticmethod
+    def _forget(redis, room_id: str):
+        """Сбрасывает комнату из ближнего кэша после записи этого процесса"""
+        if getattr(redis, "near_cache", None) is not None:
+            redis.forget_tracked(room_key(room_id))
+
+    @classmethod
+    async def get(cls, redis, room_id: str) -> Dict[str, Any] | None:
+        """Возвращает комнату или None, если её нет"""
+        raw = await cls._get_raw(redis, room_key(room_id))
+        if not raw:
+            # комната могла остаться под старым ключом без пространства имён
+            return await cls.migrate_legacy(redis, room_id) if cls.legacy_pending else None
+        try:
+            return cls.loads(raw)
+        except ValueError as e:
+            logger.error(f"Не удалось декодировать комнату {room_id}: {e}")
+            return None
+
+    @classmethod
+    async def get_raw(cls, redis, room_id: str) -> bytes | str | None:
+        """Значение комнаты как оно лежит в Redis, без декодирования, или None"""
+        raw = await cls._get_raw(redis, room_key(room_id))
+        if raw or not cls.legacy_pending:
+            return raw or None
+        room = await cls.migrate_legacy(redis, room_id)
+        return cls.dumps(room) if room is not None else None
+
+    @classmethod
+    async def save(
+        cls,
+        redis,
+        room_id: str,
+        room: Dict[str, Any],
+        ttl: int | None = ROOM_TTL,
+        left: Iterable = (),
+    ):
+        """
+        Сохраняет комнату и обновляет реестр (ttl=None — без времени жизни).
+        Срок жизни отсчитывает теневой ключ room:{id}:expiry, а сама комната
+        живёт ещё ROOM_EXPIRY_GRACE секунд, чтобы сборщик успел её прочитать.
+        left — игроки, вышедшие из комнаты: они снимаются из онлайна и с привязки к комнате.
+        room["rev"] — номер версии комнаты, растёт с каждым сохранением этого процесса
+        (у двух процессов, сохранивших одну версию, номера совпадут: представления
+        поэтому кэшируются по содержимому, см. projections.py).
+        """
+        room["rev"] = room.get("rev", 0) + 1
+        pipe = cls._pipeline(redis)
+        cls._write(pipe, room_id, room, ttl, left)
+        await pipe.execute()
+        cls._forget(redis, room_id)
+
+    @classmethod
+    def _write(cls, pipe, room_id: str, room: Dict[str, Any], ttl: int | None, left: Iterable = ()):
+        """Добавляет в pipeline запись комнаты, реестра и привязок игроков (см. save)"""
+        cls._set_room(pipe, room_id, cls.dumps(room), ttl * 1000 if ttl else None)
+        OnlineDAO.remove(pipe, left)
+        PlayerRoomDAO.release(pipe, left)
+        cls._index(pipe, room_id, room, ttl)
+
+    @classmethod
+    async def delete(cls, redis, room_id: str, room: Dict[str, Any] | None = None, left: Iterable = ()):
+        """
+        Удаляет комнату с журналом событий и убирает её из реестра
+        (left — вышедшие игроки, которых уже нет в room)
+        """
+        pipe = cls._pipeline(redis)
+        pipe.unlink(room_key(room_id), room_expiry_key(room_id), room_events_key(room_id))
+        OnlineDAO.remove(pipe, left)
+        PlayerRoomDAO.release(pipe, left)
+        cls._unindex(pipe, room_id, room)
+        await pipe.execute()
+        cls._forget(redis, room_id)
+
+    @classmethod
+    async def get_by_player(cls, redis, tg_id) -> Dict[str, Any] | None:
+        """Комната, где сидит игрок, по индексу player:{tg_id} (None, если её нет)"""
+        room_id = await PlayerRoomDAO.get_room_id(redis, tg_id)
+        if not room_id:
+            return None
+        room = await cls.get(redis, room_id)
+        if not room or str(tg_id) not in room.get("players", {}):
+            # комната истекла или игрок из неё вышел, а привязка ещё жива
+            return None
+        return room
+
+    @classmethod
+    async def seat_player(
+        cls, redis, tg_id, room_id: str, room: Dict[str, Any], ttl: int | None = ROOM_TTL
+    ) -> Dict[str, Any] | None:
+        """
+        Сохраняет комнату room, в которую посажен игрок tg_id, вместе с привязкой player:{tg_id}.
+        Если игрок уже сидит в другой живой комнате (или уже есть в этой), ничего не пишет
+        и возвращает её, иначе None.
+        Проверка и запись атомарны: WATCH привязки, комнаты, на которую она указывает,
+        и самой room:{room_id}, затем одна транзакция с комнатой, реестром и привязками,
+        как в save; при гонке — повтор.
+        Если комната уже есть в Redis, игрок добавляется в сохранённую версию, а не
+        в переданную: параллельно посаженные игроки не затираются. room обновляется
+        на месте записанной версией. Если комната за это время заполнилась
+        или исчезла — RoomIsFullException.
+        Привязка к истёкшей комнате или к той, из которой игрок вышел, перезаписывается.
+        В Redis Cluster ключи лежат в разных слотах и WATCH недоступен — там проверка и запись раздельны.
+        """
+        if getattr(redis, "is_cluster", False):
+            current = await cls.get_by_player(redis, tg_id)
+            if current and current["room_id"] != room_id:
+                return current
+            await cls.save(redis, room_id, room, ttl)
+            return None
+
+        key = player_key(tg_id)
+        seat = room["players"][str(tg_id)]
+        is_new = "rev" not in room
+        while True:
+            async with redis.pipeline(transaction=True) as pipe:
+                try:
+                    await pipe.watch(key, room_key(room_id))
+                    bound = await pipe.get(key)
+                    bound = bound.decode() if isinstance(bound, bytes) else bound
+                    if bound and bound != room_id:
+                        await pipe.watch(room_key(bound))
+                        current = cls._load(await pipe.get(room_key(bound)))
+                        if current and str(tg_id) in current.get("players", {}):
+                            return current
+
+                    stored = cls._load(await pipe.get(room_key(room_id)))
+                    if stored is None and not is_new:
+                        raise RoomIsFullException
+                    if stored is not None:
+                        merged = cls._with_player(stored, tg_id, seat)
+                        if merged is None:
+                            return stored
+                    else:
+                        merged = dict(room)
+                    merged["rev"] = merged.get("rev", 0) + 1
+
+                    pipe.multi()
+                    cls._write(pipe, room_id, merged, ttl)
+                    await pipe.execute()
+                except WatchError:
+                    # привязку или комнату изменили параллельно — проверяем заново
+                    continue
+            room.clear()
+            room.update(merged)
+            cls._forget(redis, room_id)
+            return None
+
+    @classmethod
+    def _load(cls, raw) -> Dict[str, Any] | None:
+        try:
+            return cls.loads(raw) if raw else None
+        except ValueError:
+            return None
+
+    @staticmethod
+    def _with_player(stored: Dict[str, Any], tg_id, seat: Dict[str, Any]) -> Dict[str, Any] | None:
+        """
+        Сохранённая комната с добавленным игроком; None, если игрок в ней уже есть.
+        Заполненная комната — RoomIsFullException.
+        """
+        players = stored.get("players", {})
+        if str(tg_id) in players:
+            return None
+        capacity = int(stored.get("capacity", 2))
+        if len(players) >= capacity:
+            raise RoomIsFullException
+
+        room = {**stored, "players": {**players, str(tg_id): seat}}
+        if len(room["players"]) >= capacity:
+            room["status"] = "matched"
+        return room
+
+    @classmethod
+    async def get_all(cls, redis, status: str | None = None) -> List[Dict[str, Any]]:
+        """Все живые комнаты (или комнаты с данным статусом) по реестру"""
+        index_key = registry_key(status=status)
+        room_ids = await redis.zrange(index_key, 0, -1)
+        return await cls.get_many(redis, room_ids, index_key=index_key)
+
+    @classmethod
+    async def get_by_stake(cls, redis, stake, status: str | None = None) -> List[Dict[str, Any]]:
+        """Комнаты с данной ставкой (и статусом), от старых к новым"""
+        index_key = registry_key(stake=stake, status=status)
+        room_ids = await redis.zrange(index_key, 0, -1)
+        return await cls.get_many(redis, room_ids, index_key=index_key)
+
+    @classmethod
+    async def list_page(
+        cls,
+        redis,
+        *,
+        stake=None,
+        status: str | None = None,
+        limit: int = 20,
+        cursor: str | None = None,
+        raw: bool = False,
+    ) -> Tuple[List[Any], str | None]:
+        """
+        Страница комнат из реестра, от новых к старым.
+        Читается только limit id из среза реестра и одна пачка комнат (MGET).
+        Возвращает (комнаты, курсор следующей страницы или None);
+        raw=True — пары (room_id, значение из Redis) без декодирования.
+        """
+        limit = max(1, min(limit, LOBBY_PAGE_MAX))
+        index_key = registry_key(stake=stake, status=status)
+        max_score, after_id = decode_cursor(cursor) if cursor else ("+inf", None)
+
+        # Комнаты с одинаковым score упорядочены по id; при совпадении score
+        # с курсором пропускаем уже отданные id, дочитывая при необходимости
+        fetch = limit + 1
+        while True:
+            items = await redis.zrevrangebyscore(
+                index_key, max_score, "-inf", start=0, num=fetch, withscores=True
+            )
+            page = [
+                (decode_key(member), score) for member, score in items
+                if after_id is None or score != max_score or decode_key(member) < after_id
+            ]
+            if len(page) > limit or len(items) < fetch:
+                break
+            fetch *= 2
+
+        has_more = len(page) > limit
+        page = page[:limit]
+        rooms = await cls.get_many(redis, [room_id for room_id, _ in page], index_key=index_key, raw=raw)
+
+        next_cursor = encode_cursor(page[-1][1], page[-1][0]) if has_more else None
+        return rooms, next_cursor
+
+    @classmethod
+    async def get_many(
+        cls, redis, room_ids: Iterable, index_key: str | None = None, raw: bool = False
+    ) -> List[Any]:
+        """
+        Читает комнаты одним MGET, сохраняя порядок room_ids.
+        Комнаты, истёкшие по TTL, лениво удаляются из index_key и общего реестра.
+        raw=True — пары (room_id, значение из Redis) без декодирования.
+        """
+        room_ids = [decode_key(r) for r in room_ids]
+        if not room_ids:
+            return []
+
+        values = await redis.mget([room_key(r) for r in room_ids])
+        rooms, stale = [], []
+        for room_id, value in zip(room_ids, values):
+            if not value:
+                stale.append(room_id)
+                continue
+            if raw:
+                rooms.append((room_id, value))
+                continue
+            try:
+                rooms.append(cls.loads(value))
+            except ValueError as e:
+                logger.error(f"Не удалось декодировать комнату {room_id}: {e}")
+
+        if stale and index_key:
+            await cls.prune(redis, index_key, stale)
+        return rooms
+
+    @staticmethod
+    async def prune(redis, index_key: str, room_ids: List[str]):
+        """Убирает комнаты, истёкшие по TTL, из среза index_key и общего реестра"""
+        pipe = redis.pipeline(transaction=False)
+        pipe.zrem(index_key, *room_ids)
+        if index_key != REGISTRY:
+            pipe.zrem(REGISTRY, *room_ids)
+        await pipe.execute()
+
+    @classmethod
+    async def migrate_legacy(cls, redis, room_id: str) -> Dict[str, Any] | None:
+        """
+        Переносит комнату со старого ключа <room_id> на room:{room_id},
+        сохраняя оставшийся TTL, и удаляет старый ключ через UNLINK.
+        Возвращает комнату или None, если старого ключа нет или это не комната.
+        В Redis Cluster старые ключи лежат в других слотах, и перенос не выполняется.
+        """
+        if is_namespaced(room_id) or getattr(redis, "is_cluster", False):
+            return None
+
+        async with redis.pipeline(transaction=True) as pipe:
+            try:
+                await pipe.watch(room_id)
+                raw = await pipe.get(room_id)
+                if not raw:
+                    return None
+                pttl = await pipe.pttl(room_id)
+                try:
+                    room = cls.loads(raw)
+                except ValueError:
+                    return None
+                if not is_legacy_room(room, room_id):
+                    return None
+
+                pipe.multi()
+                cls._set_room(pipe, room_id, raw, pttl if pttl > 0 else None, nx=True)
+                cls._index(pipe, room_id, room, max(1, pttl // 1000) if pttl > 0 else None)
+                pipe.unlink(room_id)
+                created, *_ = await pipe.execute()
+                cls._forget(redis, room_id)
+            except WatchError:
+                # старый ключ изменили параллельно — перенесём при следующем обращении
+                return None
+            except ResponseError:
+                # ключ другого типа (не строка) — это не комната
+                return None
+
+        logger.info(f"Комната {room_id} перенесена на ключ {room_key(room_id)}")
+        if not created:
+            # новый ключ уже записан более свежей версией — он главнее
+            return await cls.get(redis, room_id)
+        return room
@@ -0,0 +1,151 @@
+from typing import Any, Dict
+
+import msgpack
+import orjson
+
+from app.game.core.constants import NOMINALS, SPADES, HEARTS, DIAMS, CLUBS
+
+
+# Первый байт значения в Redis определяет формат комнаты.
+# Старые комнаты записаны как чистый JSON и всегда начинаются с "{",
+# поэтому версии бинарных форматов выбраны из управляющих байтов.
+FORMAT_MSGPACK = 0x01
+FORMAT_PACKED = 0x02
+
+# Коды msgpack ExtType для карт в упакованном формате
+EXT_CARD = 1
+EXT_CARD_LIST = 2
+
+SUITS = [SPADES, HEARTS, DIAMS, CLUBS]
+_CARD_TO_INT = {
+    (nominal, suit): n * len(SUITS) + s
+    for n, nominal in enumerate(NOMINALS)
+    for s, suit in enumerate(SUITS)
+}
+
+
+def card_to_int(card) -> int:
+    """Карта ('10', '♠') -> число 0..35"""
+    return _CARD_TO_INT[(card[0], card[1])]
+
+
+def int_to_card(value: int) -> list:
+    """Число 0..35 -> карта ['10', '♠'] (списком, как после json.loads)"""
+    nominal, suit = divmod(value, len(SUITS))
+    return [NOMINALS[nominal], SUITS[suit]]
+
+
+def _card_code(obj: Any) -> int | None:
+    """Код карты, если obj — пара (достоинство, масть), иначе None."""
+    if type(obj) in (list, tuple) and len(obj) == 2 and type(obj[0]) is str and type(obj[1]) is str:
+        return _CARD_TO_INT.get((obj[0], obj[1]))
+    return None
+
+
+def _pack_cards(obj: Any) -> Any:
+    """Рекурсивно заменяет карты и списки карт на ExtType с байтами-индексами."""
+    if type(obj) is dict:
+        return {k: _pack_cards(v) for k, v in obj.items()}
+    if type(obj) in (list, tuple):
+        code = _card_code(obj)
+        if code is not None:
+            return msgpack.ExtType(EXT_CARD, bytes((code,)))
+        codes = [_card_code(c) for c in obj]
+        if codes and None not in codes:
+            return msgpack.ExtType(EXT_CARD_LIST, bytes(codes))
+        return [_pack_cards(v) for v in obj]
+    return obj
+
+
+def _unpack_ext(code: int, data: bytes) -> Any:
+    if code == EXT_CARD:
+        return int_to_card(data[0])
+    if code == EXT_CARD_LIST:
+        return [int_to_card(b) for b in data]
+    return msgpack.ExtType(code, data)
+
+
+class RoomSerializer:
+    """Базовый сериализатор комнаты для хранения в Redis."""
+
+    name: str = ""
+    format_id: int | None = None
+
+    def dumps(self, room: Dict[str, Any]) -> bytes | str:
+        raise NotImplementedError
+
+    def loads(self, payload: bytes | str) -> Dict[str, Any]:
+        raise NotImplementedError
+
+
+class JsonRoomSerializer(RoomSerializer):
+    """Исходный формат: JSON без байта версии (кодирует orjson, UTF-8 без экранирования)."""
+
+    name = "json"
+
+    def dumps(self, room: Dict[str, Any]) -> bytes:
+        return orjson.dumps(room, option=orjson.OPT_NON_STR_KEYS)
+
+    def loads(self, payload: bytes | str) -> Dict[str, Any]:
+        return orjson.loads(payload)
+
+
+class MsgpackRoomSerializer(RoomSerializer):
+    """msgpack с байтом версии FORMAT_MSGPACK."""
+
+    name = "msgpack"
+    format_id = FORMAT_MSGPACK
+
+    def dumps(self, room: Dict[str, Any]) -> bytes:
+        return bytes((self.format_id,)) + msgpack.packb(room, use_bin_type=True)
+
+    def loads(self, payload: bytes) -> Dict[str, Any]:
+        return msgpack.unpackb(memoryview(payload)[1:], raw=False)
+
+
+class PackedRoomSerializer(RoomSerializer):
+    """msgpack, где каждая карта хранится одним байтом (ExtType), с байтом версии FORMAT_PACKED."""
+
+    name = "packed"
+    format_id = FORMAT_PACKED
+
+    def dumps(self, room: Dict[str, Any]) -> bytes:
+        return bytes((self.format_id,)) + msgpack.packb(_pack_cards(room), use_bin_type=True)
+
+    def loads(self, payload: bytes) -> Dict[str, Any]:
+        return msgpack.unpackb(memoryview(payload)[1:], raw=False, ext_hook=_unpack_ext)
+
+
+SERIALIZERS: Dict[str, RoomSerializer] = {
+    s.name: s for s in (JsonRoomSerializer(), MsgpackRoomSerializer(), PackedRoomSerializer())
+}
+_BY_FORMAT_ID: Dict[int, RoomSerializer] = {
+    s.format_id: s for s in SERIALIZERS.values() if s.format_id is not None
+}
+
+
+def get_room_serializer(name: str) -> RoomSerializer:
+    """Возвращает сериализатор по имени ('json', 'msgpack', 'packed')."""
+    try:
+        return SERIALIZERS[name]
+    except KeyError:
+        raise ValueError(f"Неизвестный формат сериализации комнат: {name}")
+
+
+def loads_room(raw: bytes | str) -> Dict[str, Any]:
+    """
+    Декодирует комнату в любом поддерживаемом формате.
+    Формат определяется по первому байту, поэтому старые JSON-комнаты читаются как раньше.
+    Бросает ValueError, если значение не является комнатой.
+    """
+    if isinstance(raw, str):
+        return SERIALIZERS["json"].loads(raw)
+    if not raw:
+        raise ValueError("Пустое значение комнаты")
+
+    serializer = _BY_FORMAT_ID.get(raw[0])
+    if serializer is not None:
+        return serializer.loads(raw)
+    if raw[:1] == b"{":
+        return SERIALIZERS["json"].loads(raw)
+    raise ValueError(f"Неизвестная версия формата комнаты: {raw[0]:#04x}")
@@ -0,0 +1,243 @@
+"""
+Заглушка HTTP API Centrifugo в памяти процесса.
+
+Понимает publish, broadcast, batch и history с историей каналов как у сервера:
+у канала есть epoch и растущий offset, история ограничена history_size.
+Каналы с историей определяются так же, как в Centrifugo, — настройками
+channel.without_namespace из config.json (если не заданы явно) и skip_history
+публикации. recover() повторяет восстановление при переподключении клиента.
+Присутствие (presence, presence_stats, channels) задаётся подключениями
+клиентов через subscribe() / unsubscribe().
+
+Для нагрузки и отказов: latency (+ jitter) — задержка ответа, с; fail_rate —
+доля запросов с ответом fail_status; fail_next(n) — следующие n запросов с ошибкой.
+stats — публикации и байты данных по типу события (поле event сообщения).
+
+Подключение к CentrifugoClient:
+    standin = CentrifugoStandIn()
+    # в процессе, без сокетов
+    client = CentrifugoClient("http://centrifugo/api", standin.api_key, transport=standin.transport())
+    # настоящий HTTP на localhost (uvicorn)
+    async with standin.serve() as url:
+        client = CentrifugoClient(url, standin.api_key)
+"""
+import asyncio
+import fnmatch
+import json
+import random
+import socket
+import uuid
+from collections import deque
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+import httpx
+
+
+CONFIG_PATH = Path(__file__).resolve().parents[3] / "config.json"
+
+
+def load_channel_options(path: Path = CONFIG_PATH) -> Dict[str, Any]:
+    """Настройки каналов без пространства имён из конфига Centrifugo"""
+    return json.loads(path.read_text())["channel"]["without_namespace"]
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class Stream:
+    """История канала: epoch и публикации с offset"""
+
+    def __init__(self, size: int):
+        self.epoch = uuid.uuid4().hex[:8]
+        self.offset = 0
+        self.publications: deque = deque(maxlen=size)
+
+    def add(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        self.offset += 1
+        self.publications.append({"data": data, "offset": self.offset})
+        return {"offset": self.offset, "epoch": self.epoch}
+
+
+class CentrifugoStandIn:
+    """Сервер API Centrifugo: команды, история, присутствие и опубликованные сообщения"""
+
+    def __init__(
+        self,
+        api_key: str = "key",
+        history_size: int | None = None,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        fail_rate: float = 0.0,
+        fail_status: int = 503,
+        seed: int | None = None,
+    ):
+        self.api_key = api_key
+        if history_size is None:
+            options = load_channel_options()
+            history_size = options.get("history_size", 0) if options.get("force_recovery") else 0
+        self.history_size = history_size
+        self.latency = latency
+        self.jitter = jitter
+        self.fail_rate = fail_rate
+        self.fail_status = fail_status
+        self._random = random.Random(seed)
+        self._fail_next = 0
+        self.streams: Dict[str, Stream] = {}
+        # канал -> {client_id: user_id}
+        self.presence: Dict[str, Dict[str, str]] = {}
+        # (канал, данные) в порядке публикации
+        self.published: List[Tuple[str, Dict[str, Any]]] = []
+        # событие -> {"publishes": ..., "bytes": ...}
+        self.stats: Dict[str, Dict[str, int]] = {}
+        self.requests = 0
+        self.failed = 0
+
+    def fail_next(self, n: int = 1, status: int | None = None):
+        """Следующие n запросов получат ошибку"""
+        self._fail_next = n
+        if status is not None:
+            self.fail_status = status
+
+    # --- транспорт ---
+
+    def transport(self) -> httpx.MockTransport:
+        return httpx.MockTransport(self.handle)
+
+    async def handle(self, request: httpx.Request) -> httpx.Response:
+        status, body = await self.respond(request.headers.get("X-API-Key"), request.content)
+        return httpx.Response(status, json=body)
+
+    async def respond(self, api_key: str | None, content: bytes) -> Tuple[int, Dict[str, Any]]:
+        """Ответ на запрос API: (код, тело)"""
+        self.requests += 1
+        if self.latency or self.jitter:
+            await asyncio.sleep(self.latency + self._random.uniform(0, self.jitter))
+        if api_key != self.api_key:
+            return 401, {}
+        if self._fail_next or (self.fail_rate and self._random.random() < self.fail_rate):
+            self._fail_next = max(0, self._fail_next - 1)
+            self.failed += 1
+            return self.fail_status, {}
+        body = json.loads(content)
+        return 200, self.command(body["method"], body["params"])
+
+    async def __call__(self, scope, receive, send):
+        """ASGI-приложение: тот же API по настоящему HTTP"""
+        if scope["type"] != "http":
+            return
+        content = b""
+        while True:
+            message = await receive()
+            content += message.get("body", b"")
+            if not message.get("more_body"):
+                break
+        headers = {k.decode().lower(): v.decode() for k, v in scope["headers"]}
+        status, body = await self.respond(headers.get("x-api-key"), content)
+        await send({"type": "http.response.start", "status": status,
+                    "headers": [(b"content-type", b"application/json")]})
+        await send({"type": "http.response.body", "body": json.dumps(body).encode()})
+
+    @asynccontextmanager
+    async def serve(self):
+        """Поднимает заглушку на uvicorn (localhost, свободный порт); отдаёт URL API"""
+        import uvicorn
+
+        server = uvicorn.Server(uvicorn.Config(self, host="127.0.0.1", port=free_port(), log_level="warning"))
+        task = asyncio.create_task(server.serve())
+        while not server.started:
+            await asyncio.sleep(0.01)
+        try:
+            yield f"http://127.0.0.1:{server.config.port}/api"
+        finally:
+            server.should_exit = True
+            await task
+
+    # --- команды API ---
+
+    def command(self, method: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        if method == "publish":
+            return {"result": self._publish(params["channel"], params)}
+        if method == "broadcast":
+            return {"result": {"responses": [
+                {"result": self._publish(channel, params)} for channel in params["channels"]
+            ]}}
+        if method == "batch":
+            return {"replies": [
+                self.command(name, command_params)
+                for command in params["commands"]
+                for name, command_params in command.items()
+            ]}
+        if method == "history":
+            return self._history(params)
+        if method == "presence":
+            clients = self.presence.get(params["channel"], {})
+            return {"result": {"presence": {
+                client: {"client": client, "user": user} for client, user in clients.items()
+            }}}
+        if method == "presence_stats":
+            clients = self.presence.get(params["channel"], {})
+            return {"result": {"num_clients": len(clients), "num_users": len(set(clients.values()))}}
+        if method == "channels":
+            pattern = params.get("pattern") or "*"
+            return {"result": {"channels": {
+                channel: {"num_clients": len(clients)}
+                for channel, clients in self.presence.items()
+                if clients and fnmatch.fnmatchcase(channel, pattern)
+            }}}
+        return {"error": {"code": 104, "message": "unknown method"}}
+
+    def _publish(self, channel: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        data = params["data"]
+        self.published.append((channel, data))
+        event = data.get("event", "?") if isinstance(data, dict) else "?"
+        stats = self.stats.setdefault(event, {"publishes": 0, "bytes": 0})
+        stats["publishes"] += 1
+        stats["bytes"] += len(json.dumps(data, ensure_ascii=False).encode())
+        if params.get("skip_history") or not self.history_size:
+            return {}
+        stream = self.streams.setdefault(channel, Stream(self.history_size))
+        return stream.add(data)
+
+    def _history(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        stream = self.streams.get(params["channel"])
+        if stream is None:
+            return {"result": {"publications": [], "offset": 0, "epoch": ""}}
+        publications = list(stream.publications)
+        since = params.get("since")
+        if since is not None:
+            publications = [p for p in publications if p["offset"] > since["offset"]]
+        return {"result": {"publications": publications[: params.get("limit") or None],
+                           "offset": stream.offset, "epoch": stream.epoch}}
+
+    # --- клиенты ---
+
+    def subscribe(self, channel: str, user, client: str | None = None) -> str:
+        """Подключает клиента к каналу; возвращает id клиента"""
+        client = client or uuid.uuid4().hex
+        self.presence.setdefault(channel, {})[client] = str(user)
+        return client
+
+    def unsubscribe(self, channel: str, client: str):
+        self.presence.get(channel, {}).pop(client, None)
+
+    def position(self, channel: str) -> Dict[str, Any]:
+        """Позиция канала, которую клиент получает при подписке"""
+        stream = self.streams.get(channel)
+        return {"offset": stream.offset, "epoch": stream.epoch} if stream else {"offset": 0, "epoch": ""}
+
+    def recover(self, channel: str, offset: int, epoch: str) -> Tuple[List[Dict[str, Any]], bool]:
+        """
+        Восстановление при переподключении: пропущенные публикации после offset
+        и recovered=False, если epoch сменился или часть их вытеснена из истории.
+        """
+        stream = self.streams.get(channel)
+        if stream is None or stream.epoch != epoch:
+            return [], False
+        missed = [p for p in stream.publications if p["offset"] > offset]
+        oldest = stream.publications[0]["offset"] if stream.publications else stream.offset + 1
+        return [p["data"] for p in missed], oldest <= offset + 1
@@ -1,6 +1,7 @@
 """
 Фикстуры для тестов игровой логики.
 """
+import copy
 import pytest
 import pytest_asyncio
 import json
@@ -18,39 +19,36 @@ from app.game.models import GameResult, GameResultEnum, GameType
 from app.payments.models import PaymentTransaction
 from app.users.models import User
 
-from app.game.redis_dao.custom_redis import CustomRedis
+from redis.crc import key_slot
+from redis.exceptions import ResponseError
+
+from app.game.redis_dao.custom_redis import CustomRedis, ClusterSafeMixin, RedisCommandsMixin
 from app.game.redis_dao.manager import get_redis
 
 
+def make_room(
+    room_id: str = "10_room", *, stake: int = 10, status: str = "waiting", players=("1",), **fields
+) -> dict:
+    """
+    Комната для тестов Redis-слоя (from app.game.tests.conftest import make_room).
+    players — словарь игроков (копируется) или перечень tg_id: игроки p{tg_id}, не готовы.
+    Остальные поля комнаты (capacity, rev, deck, ...) передаются в fields.
+    """
+    if isinstance(players, dict):
+        players = copy.deepcopy(players)
+    else:
+        players = {str(pid): {"nickname": f"p{pid}", "is_ready": False} for pid in players}
+    return {"room_id": room_id, "stake": stake, "status": status, "players": players, **fields}
+
+
 @pytest.fixture
 def fake_redis(monkeypatch):
     """Создаёт фейковый Redis для тестов."""
-    fake_redis = fakeredis.aioredis.FakeRedis(decode_responses=True)
-    
-    # Создаём обёртку CustomRedis
-    class FakeCustomRedis(CustomRedis):
-        def __init__(self):
-            self.redis = fake_redis
-        
-        async def get(self, key):
-            return await fake_redis.get(key)
-        
-        async def set(self, key, value):
-            return await fake_redis.set(key, value)
-        
-        async def setex(self, key, time, value):
-            return await fake_redis.setex(key, time, value)
-        
-        async def keys(self, pattern):
-            return await fake_redis.keys(pattern)
-        
-        async def unlink(self, *keys):
-            return await fake_redis.delete(*keys)
-        
-        async def flushdb(self):
-            return await fake_redis.flushdb()
-    
-    fake_custom_redis = FakeCustomRedis()
+    # CustomRedis поверх fakeredis: доступны все команды Redis (pipeline, множества и т.д.)
+    class FakeCustomRedis(fakeredis.aioredis.FakeRedis, CustomRedis):
+        pass
+
+    fake_custom_redis = FakeCustomRedis(decode_responses=True)
     
     # Мокаем get_redis
     async def get_fake_redis():
@@ -61,6 +59,80 @@ def fake_redis(monkeypatch):
     return fake_custom_redis
 
 
+# Команды с несколькими ключами, которые Redis Cluster выполняет только в одном слоте:
+# имя -> функция, возвращающая ключи по аргументам команды (без имени)
+MULTI_KEY_COMMANDS = {
+    "MGET": lambda args: args,
+    "MSET": lambda args: args[::2],
+    "MSETNX": lambda args: args[::2],
+    "RENAME": lambda args: args[:2],
+    "RENAMENX": lambda args: args[:2],
+    "WATCH": lambda args: args,
+    "SMOVE": lambda args: args[:2],
+    "SINTERSTORE": lambda args: args,
+    "SUNIONSTORE": lambda args: args,
+    "SDIFFSTORE": lambda args: args,
+    "ZUNIONSTORE": lambda args: [args[0], *args[2:2 + int(args[1])]],
+    "ZINTERSTORE": lambda args: [args[0], *args[2:2 + int(args[1])]],
+}
+# Эти команды клиент кластера сам делит по слотам
+SPLIT_BY_CLIENT = {"DEL", "UNLINK", "EXISTS", "TOUCH"}
+KEYLESS_COMMANDS = {"PING", "SCAN", "KEYS", "FLUSHDB", "FLUSHALL", "INFO", "CONFIG GET", "CONFIG SET", "MULTI", "EXEC"}
+
+
+def command_keys(args) -> list:
+    name = str(args[0]).upper()
+    if name in MULTI_KEY_COMMANDS:
+        return list(MULTI_KEY_COMMANDS[name](list(args[1:])))
+    if name in KEYLESS_COMMANDS or len(args) < 2:
+        return []
+    if name in SPLIT_BY_CLIENT:
+        return list(args[1:2])
+    return [args[1]]
+
+
+def check_same_slot(keys):
+    slots = {key_slot(k.encode() if isinstance(k, str) else k) for k in keys}
+    if len(slots) > 1:
+        raise ResponseError("CROSSSLOT Keys in request don't hash to the same slot")
+
+
+@pytest.fixture
+def fake_cluster_redis(monkeypatch):
+    """
+    Фейковый Redis, который ведёт себя как клиент Redis Cluster в части слотов:
+    многоключевые команды и транзакции с ключами разных слотов падают с CROSSSLOT.
+    Обычный pipeline, как и в кластере, может содержать команды любых слотов.
+    """
+    class FakeClusterRedis(ClusterSafeMixin, RedisCommandsMixin, fakeredis.aioredis.FakeRedis):
+        async def execute_command(self, *args, **options):
+            check_same_slot(command_keys(args))
+            return await super().execute_command(*args, **options)
+
+        def pipeline(self, transaction=True, shard_hint=None):
+            pipe = super().pipeline(transaction=transaction, shard_hint=shard_hint)
+            execute = pipe.execute
+
+            async def checked_execute(raise_on_error=True):
+                if transaction:
+                    check_same_slot([k for args, _ in pipe.command_stack for k in command_keys(args)])
+                else:
+                    for args, _ in pipe.command_stack:
+                        check_same_slot(command_keys(args))
+                return await execute(raise_on_error=raise_on_error)
+
+            pipe.execute = checked_execute
+            return pipe
+
+    client = FakeClusterRedis(decode_responses=True)
+
+    async def get_fake_redis():
+        return client
+
+    monkeypatch.setattr("app.game.redis_dao.manager.get_redis", get_fake_redis)
+    return client
+
+
 @pytest_asyncio.fixture
 async def fake_session(monkeypatch):
     """Создаёт фейковую сессию БД для тестов."""
@@ -173,6 +245,22 @@ def mock_send_msg(monkeypatch):
     return sent_messages
 
 
+@pytest.fixture(autouse=True)
+def centrifugo_standin(monkeypatch):
+    """
+    Centrifugo в памяти процесса для всех тестов: обработчики роутера, пакеты
+    @batched_publish и лента зрителей публикуют через utils.centrifugo,
+    и без подмены запросы уходили бы на CENTRIFUGO_URL.
+    """
+    from app.game.api.centrifugo import CentrifugoClient
+    from app.game.tests.centrifugo_standin import CentrifugoStandIn
+
+    server = CentrifugoStandIn()
+    client = CentrifugoClient("http://centrifugo/api", server.api_key, transport=server.transport())
+    monkeypatch.setattr("app.game.api.utils.centrifugo", client)
+    return server
+
+
 @pytest_asyncio.fixture
 async def test_users_with_reliability(fake_session):
     """Создаёт 3 тестовых пользователя с данными о надежности."""
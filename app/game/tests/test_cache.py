@@ -0,0 +1,179 @@
+"""
+Тесты двухуровневого кэша декоратора cached.
+Тестирует:
+- Попадания в L1 и L2, вытеснение LRU
+- Single-flight: параллельные промахи вызывают функцию один раз
+- Stale-while-revalidate и кэширование пустого результата
+- Фоновое обновление со своей сессией БД вместо сессии запроса
+- Работу без Redis и метрики
+"""
+import asyncio
+import json
+from contextlib import asynccontextmanager
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.game.redis_dao import manager
+from app.game.redis_dao.cache import TwoTierCache, LocalCache
+from app.game.redis_dao.manager import cached
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    fresh = TwoTierCache(maxsize=16, l1_ttl=30)
+    monkeypatch.setattr(manager, "cache", fresh)
+    return fresh
+
+
+@pytest.mark.asyncio
+async def test_l1_then_l2_hits(fake_redis, cache):
+    calls = []
+
+    @cached("user:{user_id}", ttl=60)
+    async def load_user(user_id: int):
+        calls.append(user_id)
+        return {"id": user_id}
+
+    assert await load_user(user_id=1) == {"id": 1}
+    assert await load_user(user_id=1) == {"id": 1}
+    assert json.loads(await fake_redis.get("cache:user:1")) == {"id": 1}
+
+    # другой процесс: L1 пуст, данные берутся из Redis
+    cache.local.clear()
+    assert await load_user(user_id=1) == {"id": 1}
+
+    assert calls == [1]
+    assert cache.metrics.snapshot()["l1_hits"] == 1
+    assert cache.metrics.snapshot()["l2_hits"] == 1
+    assert cache.metrics.snapshot()["misses"] == 1
+
+
+@pytest.mark.asyncio
+async def test_concurrent_misses_load_once(fake_redis, cache):
+    calls = 0
+
+    @cached("slow:{key}", ttl=60)
+    async def slow(key: str):
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        return [key]
+
+    results = await asyncio.gather(*(slow(key="a") for _ in range(20)))
+
+    assert calls == 1
+    assert results == [["a"]] * 20
+    assert cache.metrics.coalesced == 19
+
+
+@pytest.mark.asyncio
+async def test_loader_error_reaches_all_waiters(fake_redis, cache):
+    @cached("broken:{key}", ttl=60)
+    async def broken(key: str):
+        await asyncio.sleep(0.01)
+        raise RuntimeError("db down")
+
+    results = await asyncio.gather(*(broken(key="a") for _ in range(3)), return_exceptions=True)
+
+    assert all(isinstance(r, RuntimeError) for r in results)
+    assert cache.metrics.load_errors == 1
+
+
+@pytest.mark.asyncio
+async def test_negative_caching(fake_redis, cache):
+    calls = 0
+
+    @cached("missing:{key}", ttl=60, negative_ttl=30)
+    async def missing(key: str):
+        nonlocal calls
+        calls += 1
+        return None
+
+    assert await missing(key="x") is None
+    cache.local.clear()
+    assert await missing(key="x") is None
+
+    assert calls == 1
+    assert 0 < await fake_redis.ttl("cache:missing:x") <= 30
+
+
+@pytest.mark.asyncio
+async def test_stale_while_revalidate(fake_redis, cache):
+    version = 0
+
+    @cached("board", ttl=60, stale_ttl=60)
+    async def board():
+        nonlocal version
+        version += 1
+        return {"v": version}
+
+    # в Redis лежит значение, чей свежий срок (ttl) уже вышел
+    await fake_redis.setex("cache:board", 30, json.dumps({"v": 0}))
+
+    assert await board() == {"v": 0}
+    await asyncio.sleep(0.01)
+
+    assert await board() == {"v": 1}
+    assert version == 1
+    assert cache.metrics.stale_hits == 1
+
+
+@pytest.mark.asyncio
+async def test_background_refresh_opens_own_session(fake_redis, cache, monkeypatch):
+    request_session, own_session = AsyncSession(), AsyncSession()
+    seen = []
+
+    @asynccontextmanager
+    async def session_maker():
+        yield own_session
+
+    monkeypatch.setattr(manager, "async_session_maker", session_maker)
+
+    @cached("stats", ttl=60, stale_ttl=60)
+    async def stats(session):
+        seen.append(session)
+        return {"v": len(seen)}
+
+    await fake_redis.setex("cache:stats", 30, json.dumps({"v": 0}))
+
+    assert await stats(session=request_session) == {"v": 0}
+    await asyncio.sleep(0.01)
+
+    # сессия запроса к этому времени уже закрыта — обновление взяло свою
+    assert seen == [own_session]
+    with pytest.raises(TypeError):
+        await stats(request_session)
+
+
+@pytest.mark.asyncio
+async def test_works_without_redis(cache, monkeypatch):
+    async def no_redis():
+        raise ConnectionError("redis down")
+
+    monkeypatch.setattr(manager, "get_redis", no_redis)
+    calls = 0
+
+    @cached("plain", ttl=60)
+    async def plain():
+        nonlocal calls
+        calls += 1
+        return 42
+
+    assert await plain() == 42
+    assert await plain() == 42
+    assert calls == 1
+
+
+def test_local_cache_lru_bound():
+    local = LocalCache(maxsize=2)
+    local.set("a", 1, ttl=60)
+    local.set("b", 2, ttl=60)
+    local.get("a")
+    local.set("c", 3, ttl=60)
+
+    assert len(local) == 2
+    # вытеснен давно не читанный "b"
+    assert local.get("b")[1] is False and "b" not in local._data
+    assert local.get("a") == (1, True)
+    assert local.get("c") == (3, True)
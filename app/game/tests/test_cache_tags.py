@@ -0,0 +1,140 @@
+"""
+Тесты тегов кэша (поколения тегов в cache:tag:*).
+Тестирует:
+- Сброс всех результатов с тегом через invalidate
+- Видимость сброса в другом процессе
+- Сброс после commit при изменении баланса в TransactionDAO и его отмену при rollback
+- Сброс при обновлении пользователя (админка, UserDAO.update), в том числе под прежним tg_id, и его удалении (UserDAO.delete)
+- Сброс справочника игр при записи через GameTypeDAO
+"""
+import asyncio
+
+import pytest
+
+from app.game.all_games_router import load_active_games
+from app.game.dao import GameTypeDAO
+from app.game.models import GameType
+from app.game.redis_dao import manager
+from app.game.redis_dao.cache import TwoTierCache
+from app.game.redis_dao.manager import cached, invalidate, invalidate_on_commit, user_tag
+from app.payments.dao import TransactionDAO
+from app.users.dao import UserDAO
+from app.users.router import load_user_stats
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    fresh = TwoTierCache(maxsize=64, l1_ttl=30, gen_ttl=30)
+    monkeypatch.setattr(manager, "cache", fresh)
+    return fresh
+
+
+async def settle():
+    """Сброс после commit выполняется фоновой задачей"""
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+@pytest.mark.asyncio
+async def test_invalidate_drops_tagged_results(fake_redis, cache):
+    calls = []
+
+    @cached("profile:{tg_id}", ttl=3600, tags=("user:{tg_id}",))
+    async def profile(tg_id: int):
+        calls.append(tg_id)
+        return {"tg_id": tg_id, "n": len(calls)}
+
+    assert (await profile(tg_id=1))["n"] == 1
+    assert (await profile(tg_id=2))["n"] == 2
+    assert (await profile(tg_id=1))["n"] == 1
+
+    await invalidate(user_tag(1))
+
+    assert (await profile(tg_id=1))["n"] == 3
+    assert (await profile(tg_id=2))["n"] == 2
+    assert await fake_redis.get("cache:tag:user:1") == "1"
+
+
+@pytest.mark.asyncio
+async def test_generation_seen_by_other_process(fake_redis):
+    first = TwoTierCache(gen_ttl=0)
+    second = TwoTierCache(gen_ttl=0)
+
+    key_before = await second.versioned_key(fake_redis, "cache:x", ["game_types"])
+    await first.invalidate(fake_redis, "game_types")
+    key_after = await second.versioned_key(fake_redis, "cache:x", ["game_types"])
+
+    assert key_before == "cache:x#0"
+    assert key_after == "cache:x#1"
+
+
+@pytest.mark.asyncio
+async def test_game_result_invalidates_after_commit(fake_redis, cache, fake_session, test_users_2players):
+    before = await load_user_stats(session=fake_session, tg_id=111111)
+
+    dao = TransactionDAO(fake_session)
+    await dao.apply_game_result(winner_id=111111, loser_id=222222, stake=100)
+    # до commit кэш не сброшен
+    await settle()
+    assert await load_user_stats(session=fake_session, tg_id=111111) == before
+
+    await fake_session.commit()
+    await settle()
+
+    after = await load_user_stats(session=fake_session, tg_id=111111)
+    assert after["balance"] == before["balance"] + 100
+    assert after["wins"] == before["wins"] + 1
+
+
+@pytest.mark.asyncio
+async def test_rollback_forgets_tags(fake_redis, cache, fake_session, test_users_2players):
+    invalidate_on_commit(fake_session, user_tag(111111))
+    await fake_session.rollback()
+    await fake_session.commit()
+    await settle()
+
+    assert await fake_redis.get("cache:tag:user:111111") is None
+
+
+@pytest.mark.asyncio
+async def test_user_update_invalidates(fake_redis, cache, fake_session, test_users_2players):
+    user1, _ = test_users_2players
+    assert (await load_user_stats(session=fake_session, tg_id=111111))["name"] == "Тестовый Игрок 1"
+
+    await UserDAO.update(fake_session, {"id": user1.id}, name="Новое имя")
+
+    assert (await load_user_stats(session=fake_session, tg_id=111111))["name"] == "Новое имя"
+
+
+@pytest.mark.asyncio
+async def test_user_tg_id_change_invalidates_old_tag(fake_redis, cache, fake_session, test_users_2players):
+    user1, _ = test_users_2players
+    assert (await load_user_stats(session=fake_session, tg_id=111111))["tg_id"] == 111111
+
+    await UserDAO.update(fake_session, {"id": user1.id}, tg_id=333333)
+
+    assert await load_user_stats(session=fake_session, tg_id=111111) is None
+    assert (await load_user_stats(session=fake_session, tg_id=333333))["tg_id"] == 333333
+
+
+@pytest.mark.asyncio
+async def test_user_delete_invalidates(fake_redis, cache, fake_session, test_users_2players):
+    assert (await load_user_stats(session=fake_session, tg_id=111111))["tg_id"] == 111111
+
+    assert await UserDAO.delete(fake_session, tg_id=111111) == 1
+    await settle()
+
+    assert await load_user_stats(session=fake_session, tg_id=111111) is None
+
+
+@pytest.mark.asyncio
+async def test_game_types_write_invalidates(fake_redis, cache, fake_session):
+    game = dict(rules="", max_users=3, min_users=2, max_rate=1000, min_rate=10, is_active=True)
+    fake_session.add(GameType(name="burkozel", **game))
+    await fake_session.commit()
+    assert [g["name"] for g in await load_active_games(session=fake_session)] == ["burkozel"]
+
+    await GameTypeDAO.add(fake_session, name="durak", **game)
+    await settle()
+
+    assert [g["name"] for g in await load_active_games(session=fake_session)] == ["burkozel", "durak"]
@@ -0,0 +1,125 @@
+"""
+Тесты долгоживущего клиента Centrifugo (centrifugo.py).
+Тестирует:
+- Переиспользование keep-alive соединения между публикациями
+- Заголовок X-API-Key и тело запроса publish
+- Учёт ошибок и таймаутов без исключений наружу
+- Откат на HTTP/1.1 без пакета h2 и пересоздание клиента после close
+"""
+import asyncio
+import json
+
+import httpx
+import pytest
+from loguru import logger
+
+from app.game.api import centrifugo as centrifugo_module
+from app.game.api.centrifugo import CentrifugoClient
+
+
+async def start_stand_in():
+    """Минимальный HTTP/1.1 сервер Centrifugo: отвечает {} и считает TCP-соединения"""
+    stats = {"connections": 0, "requests": 0}
+
+    async def handle(reader, writer):
+        stats["connections"] += 1
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                length = next(
+                    int(line.split(b":", 1)[1])
+                    for line in head.split(b"\r\n")
+                    if line.lower().startswith(b"content-length:")
+                )
+                await reader.readexactly(length)
+                stats["requests"] += 1
+                writer.write(b"HTTP/1.1 200 OK\r\nContent-Length: 2\r\nContent-Type: application/json\r\n\r\n{}")
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    server = await asyncio.start_server(handle, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    return server, f"http://127.0.0.1:{port}/api", stats
+
+
+@pytest.mark.asyncio
+async def test_connection_is_reused():
+    server, url, stats = await start_stand_in()
+    client = CentrifugoClient(url, "key", max_connections=4)
+    try:
+        for i in range(20):
+            assert await client.publish("rooms", {"n": i}) is True
+        await asyncio.gather(*(client.publish("rooms", {"n": i}) for i in range(8)))
+
+        assert stats["requests"] == 28
+        assert stats["connections"] <= 4
+        snapshot = client.snapshot()
+        assert snapshot["requests"] == 28
+        assert snapshot["errors"] == 0
+        assert snapshot["connections_opened"] == stats["connections"]
+        assert 1 <= snapshot["connections"]["open"] <= 4
+    finally:
+        await client.close()
+        server.close()
+        await server.wait_closed()
+
+
+@pytest.mark.asyncio
+async def test_publish_request_body():
+    seen = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        seen.append((str(request.url), request.headers["X-API-Key"], json.loads(request.content)))
+        return httpx.Response(200, json={})
+
+    client = CentrifugoClient("http://centrifugo/api", "secret", transport=httpx.MockTransport(handler))
+    assert await client.publish("room#10_a", {"event": "move"}) is True
+
+    assert seen == [(
+        "http://centrifugo/api",
+        "secret",
+        {"method": "publish", "params": {"channel": "room#10_a", "data": {"event": "move"}}},
+    )]
+
+
+@pytest.mark.asyncio
+async def test_errors_and_timeouts_are_counted():
+    responses = iter([httpx.Response(500, text="boom"), httpx.ReadTimeout("slow"), httpx.ConnectError("down")])
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        result = next(responses)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    client = CentrifugoClient("http://centrifugo/api", "key", timeout=0.1, transport=httpx.MockTransport(handler))
+    assert [await client.publish("rooms", {}) for _ in range(3)] == [False, False, False]
+
+    snapshot = client.snapshot()
+    assert snapshot["errors"] == 3
+    assert snapshot["timeouts"] == 1
+    assert snapshot["in_flight"] == 0
+
+
+@pytest.mark.asyncio
+async def test_http2_fallback_and_reopen(monkeypatch):
+    monkeypatch.setattr(centrifugo_module, "_h2_available", lambda: False)
+    transport = httpx.MockTransport(lambda request: httpx.Response(200, json={}))
+    client = CentrifugoClient("http://centrifugo/api", "key", http2=True, transport=transport)
+    logged = []
+    sink = logger.add(lambda message: logged.append(str(message)), level="WARNING")
+    try:
+        assert await client.publish("rooms", {}) is True
+    finally:
+        logger.remove(sink)
+
+    assert any("h2" in line for line in logged)
+    assert client.snapshot()["http2"] is False
+
+    first = client.client
+    await client.close()
+    assert await client.publish("rooms", {}) is True
+    assert client.client is not first
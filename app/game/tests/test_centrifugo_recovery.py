@@ -0,0 +1,108 @@
+"""
+Тесты истории каналов Centrifugo и восстановления после переподключения.
+Тестирует:
+- Историю и принудительное восстановление в config.json
+- Публикацию room# и user# в историю, лобби rooms — с skip_history
+- Broadcast не смешивает каналы с историей и без
+- Восстановление пропущенных сообщений по offset/epoch без запросов к API
+- Серверную подписку на user#{tg_id} в токене клиента
+"""
+import jwt
+import pytest
+
+from app.game.api import utils
+from app.game.api.centrifugo import CentrifugoClient, PublishBatch
+# настоящая send_msg: в conftest utils.send_msg подменяется для всех тестов
+from app.game.api.utils import generate_client_token, send_msg
+from app.game.tests.centrifugo_standin import CentrifugoStandIn, load_channel_options
+
+
+@pytest.fixture
+def standin(monkeypatch, fake_redis):
+    server = CentrifugoStandIn()
+    client = CentrifugoClient("http://centrifugo/api", server.api_key, transport=server.transport())
+    monkeypatch.setattr(utils, "centrifugo", client)
+    return server
+
+
+def test_config_enables_history_and_recovery():
+    options = load_channel_options()
+    assert options["history_size"] > 0
+    assert options["history_ttl"]
+    assert options["force_recovery"] and options["force_positioning"]
+
+
+@pytest.mark.asyncio
+async def test_room_and_user_channels_keep_history(standin):
+    await send_msg("move", {"n": 1}, channel_name="room#10_a")
+    await send_msg("hand", {"hand": []}, channel_name="user#1")
+    await send_msg("new_room", {"room": {"room_id": "10_a"}}, channel_name="rooms")
+
+    assert [channel for channel, _ in standin.published] == ["room#10_a", "user#1", "rooms"]
+    assert set(standin.streams) == {"room#10_a", "user#1"}
+    assert standin.position("room#10_a")["offset"] == 1
+
+
+@pytest.mark.asyncio
+async def test_broadcast_keeps_history_settings(standin):
+    batch = PublishBatch()
+    for channel in ("user#1", "user#2", "rooms"):
+        batch.add(channel, {"event": "tick"})
+
+    assert batch.commands() == [
+        {"broadcast": {"channels": ["user#1", "user#2"], "data": {"event": "tick"}}},
+        {"publish": {"channel": "rooms", "data": {"event": "tick"}, "skip_history": True}},
+    ]
+    assert await utils.centrifugo.send(batch) is True
+    assert set(standin.streams) == {"user#1", "user#2"}
+
+
+@pytest.mark.asyncio
+async def test_reconnecting_client_recovers_missed_messages(standin):
+    for n in range(3):
+        await send_msg("move", {"n": n}, channel_name="room#10_b")
+    # клиент отключился на позиции offset=3
+    seen = standin.position("room#10_b")
+
+    # пока клиента нет — ещё события; API приложения клиент больше не вызывает
+    for n in range(3, 7):
+        await send_msg("move", {"n": n}, channel_name="room#10_b")
+
+    missed, recovered = standin.recover("room#10_b", seen["offset"], seen["epoch"])
+    assert recovered
+    assert [m["payload"]["n"] for m in missed] == [3, 4, 5, 6]
+    # id журнала комнаты остаётся в сообщении для догона через API, если восстановления не было
+    assert all("id" in m for m in missed)
+
+    # history API отдаёт то же самое
+    reply = standin.command("history", {"channel": "room#10_b", "since": seen, "limit": 10})
+    assert [p["data"]["payload"]["n"] for p in reply["result"]["publications"]] == [3, 4, 5, 6]
+
+    # позиция вытеснена из истории или epoch сменился — клиент догоняет через /events
+    _, recovered = standin.recover("room#10_b", 0, "other-epoch")
+    assert not recovered
+
+
+@pytest.mark.asyncio
+async def test_history_is_bounded(monkeypatch, fake_redis):
+    server = CentrifugoStandIn(history_size=3)
+    monkeypatch.setattr(utils, "centrifugo", CentrifugoClient("http://c/api", "key", transport=server.transport()))
+    for n in range(5):
+        await send_msg("hand", {"n": n}, channel_name="user#7")
+
+    epoch = server.position("user#7")["epoch"]
+    assert server.recover("user#7", 2, epoch) == ([{"event": "hand", "payload": {"n": 2}},
+                                                   {"event": "hand", "payload": {"n": 3}},
+                                                   {"event": "hand", "payload": {"n": 4}}], True)
+    assert server.recover("user#7", 0, epoch)[1] is False
+
+
+@pytest.mark.asyncio
+async def test_client_token_subscribes_to_personal_channel():
+    token = await generate_client_token(42, "secret")
+    claims = jwt.decode(token, "secret", algorithms=["HS256"])
+
+    assert claims["sub"] == "42"
+    override = claims["subs"]["user#42"]["override"]
+    assert override["force_recovery"] == {"value": True}
+    assert override["force_positioning"] == {"value": True}
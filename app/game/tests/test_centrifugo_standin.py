@@ -0,0 +1,75 @@
+"""
+Тесты заглушки Centrifugo (centrifugo_standin.py).
+Тестирует:
+- publish, broadcast и batch по настоящему HTTP (uvicorn) и через MockTransport
+- Учёт публикаций и байт по типу события
+- Задержку ответа и отказы: fail_next и fail_rate
+- Ответ 401 на неверный ключ API
+"""
+import asyncio
+
+import pytest
+
+from app.game.api.centrifugo import CentrifugoClient, PublishBatch
+from app.game.tests.centrifugo_standin import CentrifugoStandIn
+
+
+def batch(*messages) -> PublishBatch:
+    result = PublishBatch()
+    for channel, event in messages:
+        result.add(channel, {"event": event, "payload": {}})
+    return result
+
+
+@pytest.mark.asyncio
+async def test_http_server_accepts_client_commands():
+    standin = CentrifugoStandIn()
+    async with standin.serve() as url:
+        client = CentrifugoClient(url, standin.api_key)
+        try:
+            assert await client.publish("room#10_a", {"event": "move", "payload": {"n": 1}}) is True
+            assert await client.send(batch(("user#1", "hand"), ("user#2", "hand"), ("rooms", "lobby"))) is True
+        finally:
+            await client.close()
+
+    assert standin.requests == 2
+    assert [channel for channel, _ in standin.published] == ["room#10_a", "user#1", "user#2", "rooms"]
+    assert standin.stats["hand"]["publishes"] == 2
+    assert standin.stats["move"]["bytes"] > 0
+
+
+@pytest.mark.asyncio
+async def test_latency_is_applied():
+    standin = CentrifugoStandIn(latency=0.05)
+    client = CentrifugoClient("http://centrifugo/api", standin.api_key, transport=standin.transport())
+
+    started = asyncio.get_running_loop().time()
+    await client.publish("rooms", {"event": "lobby"})
+    assert asyncio.get_running_loop().time() - started >= 0.05
+
+
+@pytest.mark.asyncio
+async def test_failure_injection():
+    standin = CentrifugoStandIn(seed=1)
+    client = CentrifugoClient("http://centrifugo/api", standin.api_key, transport=standin.transport())
+
+    standin.fail_next(2)
+    # 5xx — временная ошибка: outbox повторит пачку
+    assert await client.send(batch(("rooms", "a"))) is None
+    assert await client.send(batch(("rooms", "b"))) is None
+    assert await client.send(batch(("rooms", "c"))) is True
+    assert [data["event"] for _, data in standin.published] == ["c"]
+
+    standin.fail_rate = 0.5
+    results = [await client.publish("rooms", {"event": "x"}) for _ in range(40)]
+    assert 5 < results.count(False) < 35
+    assert standin.failed == 2 + results.count(False)
+
+
+@pytest.mark.asyncio
+async def test_wrong_api_key():
+    standin = CentrifugoStandIn()
+    client = CentrifugoClient("http://centrifugo/api", "wrong", transport=standin.transport())
+
+    assert await client.send(batch(("rooms", "a"))) is False
+    assert standin.published == []
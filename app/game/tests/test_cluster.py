@@ -0,0 +1,119 @@
+"""
+Тесты работы с Redis Cluster (фейковый клиент проверяет слоты ключей, см. conftest).
+Тестирует:
+- Hash tag: все ключи комнаты в одном слоте
+- Сохранение, чтение, удаление комнаты и лобби без CROSSSLOT
+- get_rooms_by_bet и счётчик онлайна
+- Сборщик истёкших комнат
+- Кэш с тегами (MGET поколений разных слотов)
+- Отказ от переноса старых ключей в кластере
+"""
+import json
+from unittest.mock import AsyncMock
+
+import pytest
+from redis.crc import key_slot
+from redis.exceptions import ResponseError
+
+from app.config import settings
+from app.game.api import reaper
+from app.game.redis_dao import manager
+from app.game.redis_dao.cache import TwoTierCache
+from app.game.redis_dao.keys import (
+    REGISTRY,
+    room_key,
+    room_state_key,
+    room_ready_key,
+    room_expiry_key,
+    room_reaping_key,
+)
+from app.game.redis_dao.manager import cached, invalidate
+from app.game.redis_dao.migration import migrate_legacy_keys
+from app.game.redis_dao.presence import OnlineDAO
+from app.game.redis_dao.redis_room_dao import RoomRedisDAO
+from app.game.tests.conftest import make_room
+
+
+def cluster_room(room_id: str) -> dict:
+    n = room_id.split("_")[1]
+    return make_room(room_id, players=(n + "1",), created_at=f"2026-01-01T12:00:{int(n):02d}")
+
+
+def test_room_keys_share_slot():
+    keys = [room_key("10_ab"), room_state_key("10_ab"), room_ready_key("10_ab"),
+            room_expiry_key("10_ab"), room_reaping_key("10_ab")]
+    assert len({key_slot(k.encode()) for k in keys}) == 1
+
+
+@pytest.mark.asyncio
+async def test_fake_rejects_cross_slot(fake_cluster_redis):
+    with pytest.raises(ResponseError, match="CROSSSLOT"):
+        await fake_cluster_redis.execute_command("MGET", room_key("10_1"), room_key("10_2"))
+
+
+@pytest.mark.asyncio
+async def test_rooms_and_lobby(fake_cluster_redis):
+    for i in range(1, 6):
+        await RoomRedisDAO.save(fake_cluster_redis, f"10_{i}", cluster_room(f"10_{i}"))
+
+    assert (await RoomRedisDAO.get(fake_cluster_redis, "10_3"))["room_id"] == "10_3"
+    assert [r["room_id"] for r in await RoomRedisDAO.get_by_stake(fake_cluster_redis, 10)] == [
+        "10_1", "10_2", "10_3", "10_4", "10_5"
+    ]
+
+    rooms, cursor = await RoomRedisDAO.list_page(fake_cluster_redis, status="waiting", limit=2)
+    assert [r["room_id"] for r in rooms] == ["10_5", "10_4"]
+    rooms, _ = await RoomRedisDAO.list_page(fake_cluster_redis, status="waiting", limit=2, cursor=cursor)
+    assert [r["room_id"] for r in rooms] == ["10_3", "10_2"]
+
+    by_bet = await fake_cluster_redis.get_rooms_by_bet(10, status="waiting", page_size=2)
+    assert sorted(r["room_id"] for r in by_bet) == ["10_1", "10_2", "10_3", "10_4", "10_5"]
+    assert await OnlineDAO.count(fake_cluster_redis) == 5
+
+    room = await RoomRedisDAO.get(fake_cluster_redis, "10_2")
+    await RoomRedisDAO.delete(fake_cluster_redis, "10_2", room)
+
+    assert await RoomRedisDAO.get(fake_cluster_redis, "10_2") is None
+    assert "10_2" not in await fake_cluster_redis.zrange(REGISTRY, 0, -1)
+    assert await OnlineDAO.count(fake_cluster_redis) == 4
+
+
+@pytest.mark.asyncio
+async def test_reaper_sweeps_expired_room(fake_cluster_redis, monkeypatch):
+    send = AsyncMock()
+    monkeypatch.setattr("app.game.api.reaper.send_msg", send)
+    await RoomRedisDAO.save(fake_cluster_redis, "10_7", cluster_room("10_7"), ttl=60)
+    # теневой ключ истёк, комната доживает grace-период
+    await fake_cluster_redis.delete(room_expiry_key("10_7"))
+    await fake_cluster_redis.expire(room_key("10_7"), settings.ROOM_EXPIRY_GRACE - 10)
+
+    assert await reaper.sweep_expired_rooms(fake_cluster_redis) == 1
+    assert await fake_cluster_redis.zrange(REGISTRY, 0, -1) == []
+    assert send.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_cached_with_tags(fake_cluster_redis, monkeypatch):
+    monkeypatch.setattr(manager, "cache", TwoTierCache(maxsize=64, gen_ttl=0))
+    calls = []
+
+    @cached("profile:{tg_id}", ttl=3600, tags=("user:{tg_id}", "game_types"))
+    async def profile(tg_id: int):
+        calls.append(tg_id)
+        return {"n": len(calls)}
+
+    assert (await profile(tg_id=1))["n"] == 1
+    assert (await profile(tg_id=1))["n"] == 1
+    await invalidate("game_types")
+    assert (await profile(tg_id=1))["n"] == 2
+
+
+@pytest.mark.asyncio
+async def test_legacy_keys_not_moved_in_cluster(fake_cluster_redis):
+    await fake_cluster_redis.set("10_old", json.dumps(cluster_room("10_8")))
+
+    result = await migrate_legacy_keys(fake_cluster_redis)
+
+    assert result["rooms"] == 0
+    assert await RoomRedisDAO.get(fake_cluster_redis, "10_old") is None
+    assert await fake_cluster_redis.get("10_old") is not None
@@ -0,0 +1,134 @@
+"""
+Тесты быстрого JSON: orjson в Redis и в ответах, отдача готовых тел (responses.py).
+Тестирует:
+- Запись комнат через orjson и чтение комнат, записанных json.dumps
+- GET /burkozel/room/{room_id}: пока комната в Redis не менялась, без её декодирования
+- Кодирование представления один раз на зрителя; чужой tg_id — публичное
+- GET /burkozel/lobby: карточки без колоды, рук и токенов, закодированные один раз
+- Ответы по HTTP: application/json и то же содержимое
+"""
+import json
+from functools import partial
+
+import httpx
+import orjson
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
+
+from app.game.api import router as router_module
+from app.game.api.projections import projections
+from app.game.api.router import current_room, lobby
+from app.game.redis_dao.keys import room_key
+from app.game.redis_dao.manager import get_redis
+from app.game.redis_dao.redis_room_dao import RoomRedisDAO
+from app.game.tests.conftest import make_room
+
+
+PLAYERS = {
+    "1": {"nickname": "Аня", "hand": [["7", "♥"], ["K", "♠"]], "token": "t1"},
+    "2": {"nickname": "b", "hand": [["A", "♥"]], "token": "t2"},
+}
+playing_room = partial(
+    make_room, room_id="10_f", status="playing", created_at="2026-01-01T12:00:00",
+    players=PLAYERS, deck=[["9", "♦"]], trump="♦",
+)
+
+
+@pytest.fixture
+def decodes(monkeypatch):
+    """Считает декодирования комнат"""
+    calls = []
+    original = RoomRedisDAO.loads
+
+    def loads(raw):
+        calls.append(raw)
+        return original(raw)
+
+    monkeypatch.setattr(RoomRedisDAO, "loads", staticmethod(loads))
+    return calls
+
+
+@pytest.mark.asyncio
+async def test_orjson_write_and_legacy_read(fake_redis):
+    room = playing_room()
+    await RoomRedisDAO.save(fake_redis, "10_f", room)
+
+    stored = await fake_redis.get(room_key("10_f"))
+    # UTF-8 без \\u-экранирования и пробелов
+    assert "♥" in stored and ", " not in stored
+    assert json.loads(stored) == room
+
+    await fake_redis.set(room_key("10_old"), json.dumps(playing_room(room_id="10_old")))
+    assert (await RoomRedisDAO.get(fake_redis, "10_old"))["players"]["1"]["nickname"] == "Аня"
+
+
+@pytest.mark.asyncio
+async def test_room_endpoint_skips_decode_while_unchanged(fake_redis, decodes):
+    room = playing_room()
+    await RoomRedisDAO.save(fake_redis, "10_f", room)
+    raw_hits = projections.raw_hits
+
+    first = await current_room("10_f", redis_client=fake_redis, tg_id=1)
+    second = await current_room("10_f", redis_client=fake_redis, tg_id=1)
+    assert len(decodes) == 1
+    assert second.body is first.body
+    assert projections.raw_hits == raw_hits + 1
+
+    room["players"]["1"]["hand"].pop()
+    await RoomRedisDAO.save(fake_redis, "10_f", room)
+    third = orjson.loads((await current_room("10_f", redis_client=fake_redis, tg_id=1)).body)
+    assert len(decodes) == 2
+    assert third["players"]["1"]["hand"] == [["7", "♥"]]
+
+
+@pytest.mark.asyncio
+async def test_encoded_once_per_viewer(fake_redis):
+    await RoomRedisDAO.save(fake_redis, "10_f", playing_room())
+    views = projections.views(await RoomRedisDAO.get(fake_redis, "10_f"))
+
+    assert orjson.loads(views.encoded(2)) == views.for_viewer(2)
+    assert views.encoded(2) is views.encoded("2")
+    # не игрок комнаты получает публичное представление
+    assert views.encoded(999) is views.encoded()
+    assert b"token" not in views.encoded()
+
+
+@pytest.mark.asyncio
+async def test_lobby_hides_cards_and_tokens(fake_redis, decodes):
+    for room_id in ("10_a", "10_b"):
+        await RoomRedisDAO.save(fake_redis, room_id, playing_room(room_id=room_id))
+
+    response = await lobby(redis=fake_redis, status="playing", stake=None, limit=20, cursor=None)
+    again = await lobby(redis=fake_redis, status="playing", stake=None, limit=20, cursor=None)
+
+    assert b'"hand"' not in response.body and b'"deck"' not in response.body
+    assert b'"token"' not in response.body and b"t1" not in response.body
+    page = orjson.loads(response.body)
+    assert page["count"] == 2 and page["next_cursor"] is None
+    assert page["rooms"][0] == {
+        "room_id": "10_b", "stake": 10, "status": "playing", "created_at": "2026-01-01T12:00:00",
+        "players": {"1": "Аня", "2": "b"},
+    }
+    # вторая страница — без декодирования комнат
+    assert again.body == response.body and len(decodes) == 2
+
+
+@pytest.mark.asyncio
+async def test_http_responses(fake_redis):
+    await RoomRedisDAO.save(fake_redis, "10_f", playing_room())
+    app = FastAPI(default_response_class=ORJSONResponse)
+    app.include_router(router_module.router)
+    app.dependency_overrides[get_redis] = lambda: fake_redis
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        room = await client.get("/burkozel/room/10_f", params={"tg_id": 2})
+        page = await client.get("/burkozel/lobby")
+        online = await client.get("/burkozel/online")
+
+    assert room.headers["content-type"] == "application/json"
+    assert room.json()["players"]["2"]["hand"] == [["A", "♥"]]
+    assert "hand" not in room.json()["players"]["1"]
+    assert page.json()["rooms"][0]["players"] == {"1": "Аня", "2": "b"}
+    assert not {"hand", "deck", "token"} & set(page.text.replace('"', " ").split())
+    assert online.status_code == 200 and "in_game" in online.json()
@@ -15,6 +15,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from app.game.api.router import find_players, ready, move, leave
 from app.game.api.schemas import FindPartnerRequest, ReadyRequest, MoveRequest
 from app.game.redis_dao.custom_redis import CustomRedis
+from app.game.redis_dao.keys import room_key
 from app.users.models import User
 from app.game.models import GameResult, GameResultEnum
 from app.payments.models import PaymentTransaction, TxTypeEnum
@@ -80,7 +81,7 @@ async def test_2players_full_game_winner_loser_balances(
     await ready(ready_req2, fake_redis)
     
     # Проверяем, что игра началась (есть карты)
-    room_data = json.loads(await fake_redis.get(room_id))
+    room_data = json.loads(await fake_redis.get(room_key(room_id)))
     assert room_data["status"] == "playing"
     assert "deck" in room_data
     assert len(room_data["players"]["111111"]["hand"]) == 4
@@ -14,6 +14,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from app.game.api.router import find_players, ready, leave
 from app.game.api.schemas import FindPartnerRequest, ReadyRequest
 from app.game.redis_dao.custom_redis import CustomRedis
+from app.game.redis_dao.keys import room_key
 from app.users.models import User
 from app.game.models import GameResult, GameResultEnum
 from sqlalchemy import select
@@ -69,7 +70,7 @@ async def test_3players_leave_continues_game(
     await ready(ReadyRequest(tg_id=333333, room_id=room_id), fake_redis)
     
     # Проверяем, что игра началась
-    room_data = json.loads(await fake_redis.get(room_id))
+    room_data = json.loads(await fake_redis.get(room_key(room_id)))
     assert room_data["status"] == "playing"
     assert len(room_data["players"]) == 3
     
@@ -86,7 +87,7 @@ async def test_3players_leave_continues_game(
     assert "222222" in result["remaining"]
     
     # Проверяем, что комната все ещё существует и игра продолжается
-    room_data = json.loads(await fake_redis.get(room_id))
+    room_data = json.loads(await fake_redis.get(room_key(room_id)))
     assert room_data["status"] == "playing"
     assert len(room_data["players"]) == 2  # Осталось 2 игрока
     
@@ -4,6 +4,7 @@ from unittest.mock import AsyncMock
 
 from app.game.api.router import move
 from app.game.api.schemas import MoveRequest
+from app.game.redis_dao.keys import room_key
 
 
 @pytest.mark.asyncio
@@ -42,15 +43,16 @@ async def test_move_gives_new_cards_and_sends_event(monkeypatch):
     session = AsyncMock()
     await move(session, req, fake_redis)
 
-    # Проверяем что карта ушла из руки Alice
-    updated = await fake_redis.get(room_id)
+    # Проверяем что карта ушла из руки Alice (комната перенесена на ключ room:*)
+    updated = await fake_redis.get(room_key(room_id))
     updated_room = __import__("json").loads(updated)
     assert ["7", "♥"] not in updated_room["players"]["1"]["hand"]
 
-    # Проверяем, что ушло событие move
+    # Проверяем, что ушло событие move (только изменения хода)
     move_msgs = [m for m in sent_messages if m["event"] == "move"]
     assert move_msgs
-    assert move_msgs[0]["payload"]["room"]["last_turn"]["attack"]["player"] == "1"
+    assert move_msgs[0]["payload"]["player"] == "1"
+    assert move_msgs[0]["payload"]["cards"] == [["7", "♥"]]
 
     # --- Эмуляция защиты от Bob ---
     req2 = MoveRequest(room_id=room_id, tg_id=2, cards=[["8", "♥"]])
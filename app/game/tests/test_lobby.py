@@ -0,0 +1,89 @@
+"""
+Тесты реестра комнат и постраничного лобби.
+Тестирует:
+- Перенос комнаты между срезами реестра при смене статуса
+- Пагинацию по курсору от новых к старым без пропусков и повторов
+- Комнаты с одинаковым created_at
+- Ошибку на некорректном курсоре
+"""
+from datetime import datetime, timedelta
+
+import orjson
+import pytest
+from fastapi import HTTPException
+
+from app.game.api.router import lobby
+from app.game.redis_dao.keys import REGISTRY, room_key, registry_key
+from app.game.redis_dao.redis_room_dao import RoomRedisDAO
+from app.game.tests.conftest import make_room
+
+
+BASE_TIME = datetime(2026, 1, 1, 12, 0, 0)
+
+
+def lobby_room(room_id: str, minute: int, **fields) -> dict:
+    return make_room(room_id, created_at=(BASE_TIME + timedelta(minutes=minute)).isoformat(), **fields)
+
+
+@pytest.mark.asyncio
+async def test_status_change_moves_room_between_slices(fake_redis):
+    room = lobby_room("10_a", 0)
+    await RoomRedisDAO.save(fake_redis, "10_a", room)
+    room["status"] = "matched"
+    await RoomRedisDAO.save(fake_redis, "10_a", room)
+
+    assert await fake_redis.zrange(registry_key(status="waiting"), 0, -1) == []
+    assert await fake_redis.zrange(registry_key(stake=10, status="matched"), 0, -1) == ["10_a"]
+
+    await RoomRedisDAO.delete(fake_redis, "10_a", room)
+
+    assert await fake_redis.keys("idx:*") == []
+
+
+@pytest.mark.asyncio
+async def test_lobby_pages_newest_first(fake_redis):
+    for i in range(7):
+        await RoomRedisDAO.save(fake_redis, f"10_{i}", lobby_room(f"10_{i}", i))
+    await RoomRedisDAO.save(fake_redis, "20_x", lobby_room("20_x", 100, stake=20))
+    await RoomRedisDAO.save(fake_redis, "10_p", lobby_room("10_p", 50, status="playing"))
+
+    seen, cursor = [], None
+    while True:
+        page = orjson.loads((await lobby(redis=fake_redis, status="waiting", stake=10, limit=3, cursor=cursor)).body)
+        seen += [r["room_id"] for r in page["rooms"]]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+
+    assert seen == [f"10_{i}" for i in reversed(range(7))]
+
+
+@pytest.mark.asyncio
+async def test_lobby_handles_equal_created_at(fake_redis):
+    for room_id in ("10_a", "10_b", "10_c", "10_d"):
+        await RoomRedisDAO.save(fake_redis, room_id, lobby_room(room_id, 0))
+
+    first, cursor = await RoomRedisDAO.list_page(fake_redis, limit=2)
+    second, last = await RoomRedisDAO.list_page(fake_redis, limit=2, cursor=cursor)
+
+    assert [r["room_id"] for r in first + second] == ["10_d", "10_c", "10_b", "10_a"]
+    assert last is None
+
+
+@pytest.mark.asyncio
+async def test_lobby_skips_expired_rooms(fake_redis):
+    await RoomRedisDAO.save(fake_redis, "10_live", lobby_room("10_live", 0))
+    await RoomRedisDAO.save(fake_redis, "10_gone", lobby_room("10_gone", 1))
+    await fake_redis.delete(room_key("10_gone"))
+
+    page = orjson.loads((await lobby(redis=fake_redis, status=None, stake=None, limit=20, cursor=None)).body)
+
+    assert [r["room_id"] for r in page["rooms"]] == ["10_live"]
+    assert await fake_redis.zrange(REGISTRY, 0, -1) == ["10_live"]
+
+
+@pytest.mark.asyncio
+async def test_lobby_rejects_bad_cursor(fake_redis):
+    with pytest.raises(HTTPException) as exc:
+        await lobby(redis=fake_redis, status=None, stake=None, limit=20, cursor="garbage")
+    assert exc.value.status_code == 400
@@ -0,0 +1,114 @@
+"""
+Тесты агрегатора обновлений лобби (lobby.py).
+Тестирует:
+- Схлопывание изменений одной комнаты за тик
+- Перехват new_room / close_room в send_msg при запущенном агрегаторе
+- Предел размера сообщения и перенос остатка в следующий тик
+- Публикацию раз в тик и остаток буфера при остановке
+"""
+import asyncio
+import json
+
+import pytest
+
+from app.game.api import utils
+from app.game.api.lobby import LobbyAggregator
+# настоящая send_msg: в conftest utils.send_msg подменяется для всех тестов
+from app.game.api.utils import send_msg
+
+
+def room(room_id: str, status: str = "waiting", players: int = 1) -> dict:
+    return {
+        "room_id": room_id,
+        "stake": 10,
+        "status": status,
+        "capacity": 3,
+        "deck": [["A", "♥"]] * 20,
+        "players": {str(i): {"nickname": f"p{i}", "is_ready": False, "hand": []} for i in range(1, players + 1)},
+    }
+
+
+class Published(list):
+    async def __call__(self, event, payload, channel_name):
+        self.append({"event": event, "payload": payload, "channel": channel_name})
+
+
+def test_changes_of_one_room_are_coalesced():
+    agg = LobbyAggregator()
+    agg.record("new_room", {"room": room("10_a")})
+    agg.record("new_room", {"room": room("10_b")})
+    agg.record("new_room", {"room": room("10_a", players=2)})
+    agg.record("close_room", {"room_id": "10_b"})
+    agg.record("close_room", {"room_id": "10_c"})
+
+    payload = agg.take()
+    assert [r["room_id"] for r in payload["rooms"]] == ["10_a"]
+    assert payload["rooms"][0]["players"] == {"1": "p1", "2": "p2"}
+    assert "deck" not in payload["rooms"][0]
+    assert payload["removed"] == ["10_b", "10_c"]
+    assert agg.coalesced == 2
+    assert agg.take() is None
+
+
+@pytest.mark.asyncio
+async def test_send_msg_hands_lobby_events_to_aggregator(monkeypatch):
+    agg = LobbyAggregator()
+    agg.running = True
+    monkeypatch.setattr(utils, "lobby", agg)
+
+    published = []
+
+    async def fake_publish(channel, message):
+        published.append((channel, message))
+        return True
+
+    monkeypatch.setattr(utils.centrifugo, "publish", fake_publish)
+
+    assert await send_msg("new_room", {"room": room("10_a")}, channel_name="rooms") is True
+    assert await send_msg("close_room", {"room_id": "10_b"}, channel_name="rooms") is True
+    assert published == []
+
+    await agg.flush(send_msg)
+    [(channel, message)] = published
+    assert channel == "rooms"
+    assert message["event"] == "lobby"
+    assert message["payload"]["removed"] == ["10_b"]
+
+
+@pytest.mark.asyncio
+async def test_message_size_is_capped():
+    agg = LobbyAggregator(max_bytes=1024)
+    for i in range(40):
+        agg.record("new_room", {"room": room(f"10_{i:02d}", players=3)})
+
+    publish = Published()
+    ticks = 0
+    while await agg.flush(publish):
+        ticks += 1
+
+    assert ticks > 1
+    assert all(len(json.dumps(m, ensure_ascii=False).encode()) <= 1024 for m in publish)
+    ids = [r["room_id"] for m in publish for r in m["payload"]["rooms"]]
+    assert ids == [f"10_{i:02d}" for i in range(40)]
+    assert agg.deferred > 0
+
+
+@pytest.mark.asyncio
+async def test_publishes_once_per_tick_and_flushes_on_stop():
+    agg = LobbyAggregator(tick=0.05)
+    publish = Published()
+    task = asyncio.create_task(agg.run(publish))
+    await asyncio.sleep(0)
+    assert agg.running
+
+    for i in range(10):
+        agg.record("new_room", {"room": room(f"10_{i}")})
+    await asyncio.sleep(0.08)
+    assert len(publish) == 1
+    assert len(publish[0]["payload"]["rooms"]) == 10
+
+    agg.record("close_room", {"room_id": "10_0"})
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+    assert not agg.running
+    assert publish[-1]["payload"]["removed"] == ["10_0"]
@@ -0,0 +1,113 @@
+"""
+Тесты событий move с дельтами и номером события seq.
+Тестирует:
+- Дельту хода без колоды и чужих рук
+- Рост seq на каждом событии и seq в комнате для снимка
+- Взятку, очки победителя и число добранных карт в дельте
+- seq в game_start
+"""
+import orjson
+import pytest
+import pytest_asyncio
+from unittest.mock import AsyncMock
+
+from app.game.api.router import current_room, move, ready
+from app.game.api.schemas import MoveRequest, ReadyRequest
+from app.game.redis_dao.redis_room_dao import RoomRedisDAO
+
+
+@pytest.fixture
+def sent(monkeypatch):
+    messages = []
+
+    async def fake_send_msg(event, payload, channel_name):
+        messages.append({"event": event, "payload": payload, "channel": channel_name})
+
+    monkeypatch.setattr("app.game.api.router.send_msg", fake_send_msg)
+    return messages
+
+
+def player(hand: list) -> dict:
+    return {"nickname": "p", "is_ready": True, "hand": hand, "round_score": 0, "penalty": 0, "taken_tricks": 0}
+
+
+@pytest_asyncio.fixture
+async def room(fake_redis):
+    data = {
+        "room_id": "10_m",
+        "stake": 10,
+        "status": "playing",
+        "players": {
+            "1": player([["7", "♥"], ["K", "♠"]]),
+            "2": player([["A", "♥"], ["9", "♠"]]),
+        },
+        "deck": [["9", "♦"], ["J", "♣"], ["10", "♠"], ["Q", "♣"], ["6", "♦"]],
+        "trump": "♦",
+        "field": {"attack": None, "defend": None, "winner": None},
+        "last_turn": {"attack": None, "defend": None},
+        "attacker": "1",
+        "defender": "2",
+        "seats": ["1", "2"],
+        "turn_order": ["1", "2"],
+        "seq": 4,
+    }
+    await RoomRedisDAO.save(fake_redis, "10_m", data)
+    return data
+
+
+def moves(sent: list) -> list:
+    return [m["payload"] for m in sent if m["event"] == "move"]
+
+
+@pytest.mark.asyncio
+async def test_move_delta_has_no_hidden_state(fake_redis, room, sent):
+    await move(AsyncMock(), MoveRequest(room_id="10_m", tg_id=1, cards=[["7", "♥"]]), fake_redis)
+
+    [delta] = moves(sent)
+    assert delta["seq"] == 5
+    assert delta["player"] == "1"
+    assert delta["cards"] == [["7", "♥"]]
+    assert delta["next"] == "2"
+    assert delta["hand_counts"] == {"1": 1, "2": 2}
+    assert delta["deck_count"] == 5
+    assert "trick" not in delta and "drawn" not in delta
+    assert "room" not in delta and "deck" not in delta and "players" not in delta
+
+
+@pytest.mark.asyncio
+async def test_trick_and_draw_in_delta(fake_redis, room, sent):
+    await move(AsyncMock(), MoveRequest(room_id="10_m", tg_id=1, cards=[["7", "♥"]]), fake_redis)
+    await move(AsyncMock(), MoveRequest(room_id="10_m", tg_id=2, cards=[["A", "♥"]]), fake_redis)
+
+    first, second = moves(sent)
+    assert second["seq"] == first["seq"] + 1
+    assert second["trick"]["winner"] == "2"
+    assert second["trick"]["points"] == 11
+    assert second["trick"]["round_score"] == 11
+    assert second["trick"]["taken_tricks"] == 1
+    assert [t["player"] for t in second["trick"]["turns"]] == ["1", "2"]
+    # добор по одной, начиная с победителя взятки
+    assert second["drawn"] == {"2": 3, "1": 2}
+    assert second["hand_counts"] == {"1": 3, "2": 4}
+    assert second["deck_count"] == 0
+    assert second["attacker"] == "2"
+
+    # личные карты добора уходят только в каналы игроков
+    hands = [m for m in sent if m["event"] == "hand"]
+    assert {m["channel"] for m in hands} == {"user#1", "user#2"}
+
+    # снимок для клиента, заметившего пропуск seq
+    snapshot = orjson.loads((await current_room("10_m", redis_client=fake_redis)).body)
+    assert snapshot["seq"] == second["seq"]
+
+
+@pytest.mark.asyncio
+async def test_game_start_carries_seq(fake_redis, sent):
+    players = {"1": {"nickname": "a", "is_ready": True}, "2": {"nickname": "b", "is_ready": False}}
+    await RoomRedisDAO.save(fake_redis, "10_s", {"room_id": "10_s", "stake": 10, "status": "matched", "players": players})
+
+    await ready(ReadyRequest(room_id="10_s", tg_id=2), fake_redis)
+
+    [start] = [m["payload"] for m in sent if m["event"] == "game_start"]
+    assert start["seq"] == 1
+    assert (await RoomRedisDAO.get(fake_redis, "10_s"))["seq"] == 1
@@ -0,0 +1,191 @@
+"""
+Тесты обратного индекса игрок -> комната (player:{tg_id}) и /burkozel/my_room.
+Тестирует:
+- Привязку игроков при создании комнаты и присоединении
+- Запрет сидеть в двух комнатах через find_player и join_room
+- Атомарную посадку: привязка и комната пишутся вместе, гонка за привязку — один победитель
+- Параллельную посадку двух игроков в одну комнату: оба остаются, лишний получает отказ
+- Снятие привязки при выходе и удалении комнаты
+- Устаревшую привязку к истёкшей комнате
+- Привязку игроков перенесённой старой комнаты
+"""
+import asyncio
+import copy
+from functools import partial
+import json
+from unittest.mock import AsyncMock
+
+import pytest
+from fastapi import HTTPException
+
+from app.exception import RoomIsFullException
+from app.game.api.router import find_players, join_room, leave, my_room
+from app.game.api.schemas import FindPartnerRequest, ReadyRequest
+from app.game.redis_dao.keys import player_key, room_key
+from app.game.redis_dao.migration import migrate_legacy_keys
+from app.game.redis_dao.redis_room_dao import RoomRedisDAO
+from app.game.tests.conftest import make_room
+
+
+@pytest.fixture(autouse=True)
+def rich_players(monkeypatch):
+    monkeypatch.setattr("app.game.api.router.send_msg", AsyncMock())
+    user = type("U", (), {"balance": 1000})()
+
+    async def find_one_or_none(session, **kwargs):
+        return user
+
+    monkeypatch.setattr("app.users.dao.UserDAO.find_one_or_none", find_one_or_none)
+
+
+def find(tg_id: int, stake: int = 10) -> FindPartnerRequest:
+    return FindPartnerRequest(tg_id=tg_id, nickname=f"p{tg_id}", stake=stake)
+
+
+@pytest.mark.asyncio
+async def test_find_and_join_bind_players(fake_redis):
+    created = await find_players(find(1), AsyncMock(), fake_redis)
+    joined = await find_players(find(2), AsyncMock(), fake_redis)
+
+    assert joined.room_id == created.room_id
+    for tg_id in (1, 2):
+        view = await my_room(tg_id=tg_id, redis_client=fake_redis)
+        assert view["room_id"] == created.room_id
+        assert str(tg_id) in view["room"]["players"]
+
+    assert await my_room(tg_id=3, redis_client=fake_redis) == {"room_id": None, "room": None}
+
+
+@pytest.mark.asyncio
+async def test_player_cannot_sit_in_two_rooms(fake_redis):
+    first = await find_players(find(1, stake=10), AsyncMock(), fake_redis)
+    other = await find_players(find(2, stake=50), AsyncMock(), fake_redis)
+
+    with pytest.raises(HTTPException) as exc:
+        await find_players(find(1, stake=50), AsyncMock(), fake_redis)
+    assert exc.value.status_code == 400
+    assert first.room_id in exc.value.detail
+
+    with pytest.raises(HTTPException):
+        await join_room(AsyncMock(), room_id=other.room_id, tg_id=1, nickname="p1", redis=fake_redis)
+
+    assert list((await RoomRedisDAO.get(fake_redis, other.room_id))["players"]) == ["2"]
+
+
+@pytest.mark.asyncio
+async def test_concurrent_find_creates_one_room(fake_redis):
+    results = await asyncio.gather(
+        find_players(find(1, stake=10), AsyncMock(), fake_redis),
+        find_players(find(1, stake=20), AsyncMock(), fake_redis),
+        return_exceptions=True,
+    )
+
+    assert sum(isinstance(r, HTTPException) for r in results) == 1
+    assert len(await RoomRedisDAO.get_all(fake_redis)) == 1
+
+
+waiting_room = partial(make_room, capacity=2)
+
+
+@pytest.mark.asyncio
+async def test_concurrent_seat_has_one_winner(fake_redis):
+    results = await asyncio.gather(
+        RoomRedisDAO.seat_player(fake_redis, 1, "10_a", waiting_room("10_a")),
+        RoomRedisDAO.seat_player(fake_redis, 1, "10_b", waiting_room("10_b")),
+    )
+
+    # второй перечитал привязку после записи первого и получил его комнату
+    assert results[0] is None and results[1]["room_id"] == "10_a"
+    assert await fake_redis.get(player_key(1)) == "10_a"
+    assert await RoomRedisDAO.get(fake_redis, "10_b") is None
+
+
+@pytest.mark.asyncio
+async def test_concurrent_seats_into_one_room_are_merged(fake_redis):
+    await RoomRedisDAO.save(fake_redis, "10_c", {**waiting_room("10_c"), "capacity": 3})
+    # оба процесса прочитали комнату до записи другого
+    stored = await RoomRedisDAO.get(fake_redis, "10_c")
+    first, second = copy.deepcopy(stored), copy.deepcopy(stored)
+    first["players"]["2"] = {"nickname": "p2"}
+    second["players"]["3"] = {"nickname": "p3"}
+
+    results = await asyncio.gather(
+        RoomRedisDAO.seat_player(fake_redis, 2, "10_c", first),
+        RoomRedisDAO.seat_player(fake_redis, 3, "10_c", second),
+    )
+
+    assert results == [None, None]
+    stored = await RoomRedisDAO.get(fake_redis, "10_c")
+    assert set(stored["players"]) == {"1", "2", "3"}
+    assert stored["status"] == "matched"
+    assert await fake_redis.get(player_key(2)) == await fake_redis.get(player_key(3)) == "10_c"
+
+
+@pytest.mark.asyncio
+async def test_seat_into_filled_room_is_refused(fake_redis):
+    await RoomRedisDAO.save(fake_redis, "10_d", waiting_room("10_d"))
+    stored = await RoomRedisDAO.get(fake_redis, "10_d")
+    first, second = copy.deepcopy(stored), copy.deepcopy(stored)
+    first["players"]["2"] = {"nickname": "p2"}
+    second["players"]["3"] = {"nickname": "p3"}
+
+    results = await asyncio.gather(
+        RoomRedisDAO.seat_player(fake_redis, 2, "10_d", first),
+        RoomRedisDAO.seat_player(fake_redis, 3, "10_d", second),
+        return_exceptions=True,
+    )
+
+    assert results[0] is None and isinstance(results[1], RoomIsFullException)
+    assert set((await RoomRedisDAO.get(fake_redis, "10_d"))["players"]) == {"1", "2"}
+    assert await fake_redis.exists(player_key(3)) == 0
+
+
+@pytest.mark.asyncio
+async def test_refused_seat_writes_nothing(fake_redis):
+    first = await find_players(find(1, stake=10), AsyncMock(), fake_redis)
+    other = await find_players(find(2, stake=50), AsyncMock(), fake_redis)
+
+    seated = await RoomRedisDAO.seat_player(fake_redis, 1, other.room_id, waiting_room(other.room_id))
+
+    assert seated["room_id"] == first.room_id
+    assert await fake_redis.get(player_key(1)) == first.room_id
+    assert list((await RoomRedisDAO.get(fake_redis, other.room_id))["players"]) == ["2"]
+
+
+@pytest.mark.asyncio
+async def test_leave_and_delete_release_binding(fake_redis, fake_session):
+    room = await find_players(find(1), AsyncMock(), fake_redis)
+    await find_players(find(2), AsyncMock(), fake_redis)
+
+    await leave(ReadyRequest(room_id=room.room_id, tg_id=1), fake_session, fake_redis)
+
+    assert await fake_redis.exists(player_key(1)) == 0
+    assert (await my_room(tg_id=2, redis_client=fake_redis))["room_id"] == room.room_id
+
+    await RoomRedisDAO.delete(fake_redis, room.room_id, await RoomRedisDAO.get(fake_redis, room.room_id))
+
+    assert await fake_redis.exists(player_key(2)) == 0
+
+
+@pytest.mark.asyncio
+async def test_stale_binding_is_ignored(fake_redis):
+    room = await find_players(find(1), AsyncMock(), fake_redis)
+    # комната истекла по TTL, привязка ещё жива
+    await fake_redis.delete(room_key(room.room_id))
+
+    assert (await my_room(tg_id=1, redis_client=fake_redis))["room"] is None
+
+    fresh = await find_players(find(1, stake=20), AsyncMock(), fake_redis)
+    assert await fake_redis.get(player_key(1)) == fresh.room_id
+
+
+@pytest.mark.asyncio
+async def test_migrated_room_binds_players(fake_redis):
+    room = {"room_id": "10_old", "stake": 10, "status": "waiting", "players": {"1": {"nickname": "a"}}}
+    await fake_redis.set("10_old", json.dumps(room))
+
+    result = await migrate_legacy_keys(fake_redis)
+
+    assert result["rooms"] == 1
+    assert await fake_redis.get(player_key(1)) == "10_old"
+    assert (await my_room(tg_id=1, redis_client=fake_redis))["room_id"] == "10_old"
@@ -0,0 +1,162 @@
+"""
+Тесты ближнего кэша комнат (CLIENT TRACKING, см. near_cache.py).
+fakeredis не умеет CLIENT TRACKING: уведомления __redis__:invalidate за сервер
+публикует писатель — отдельный клиент, как это делает Redis в режиме BCAST.
+Тестирует:
+- Повторные чтения неизменной комнаты из памяти
+- Быструю инвалидацию при записи из другого соединения, в том числе конкурентной
+- Отказ сохранять ответ, если ключ изменился во время чтения
+- Чтение собственной записи процесса без ожидания уведомления
+- Сброс кэша при остановке отслеживания
+"""
+import asyncio
+import json
+
+import fakeredis
+import pytest
+import pytest_asyncio
+
+from app.game.redis_dao.custom_redis import RedisCommandsMixin
+from app.game.redis_dao.keys import room_key
+from app.game.redis_dao.near_cache import INVALIDATE_CHANNEL, NearCache
+from app.game.redis_dao.redis_room_dao import RoomRedisDAO
+from app.game.tests.conftest import make_room
+
+
+WRITE_COMMANDS = {"SET", "SETEX", "DEL", "UNLINK"}
+
+
+class TrackingWriter(fakeredis.aioredis.FakeRedis):
+    """Другое соединение: после записи публикует уведомление, как Redis с CLIENT TRACKING BCAST"""
+
+    async def execute_command(self, *args, **options):
+        result = await super().execute_command(*args, **options)
+        if str(args[0]).upper() in WRITE_COMMANDS:
+            for key in (args[1:2] if str(args[0]).upper() in ("SET", "SETEX") else args[1:]):
+                await super().execute_command("PUBLISH", INVALIDATE_CHANNEL, key)
+        return result
+
+
+async def wait_for(predicate, timeout: float = 1.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not predicate():
+        assert asyncio.get_running_loop().time() < deadline, "условие не выполнилось вовремя"
+        await asyncio.sleep(0.005)
+
+
+@pytest_asyncio.fixture
+async def tracked(monkeypatch):
+    real_command = NearCache._command
+
+    async def emulated_command(connection, *args):
+        if args[:2] == ("CLIENT", "ID"):
+            return 1
+        if args[:2] == ("CLIENT", "TRACKING"):
+            return "OK"
+        return await real_command(connection, *args)
+
+    monkeypatch.setattr(NearCache, "_command", staticmethod(emulated_command))
+
+    class Reader(RedisCommandsMixin, fakeredis.aioredis.FakeRedis):
+        pass
+
+    server = fakeredis.FakeServer()
+    reader = Reader(server=server, decode_responses=True)
+    writer = TrackingWriter(server=server, decode_responses=True)
+    near = reader.enable_near_cache(maxsize=100)
+    await wait_for(lambda: near.active)
+
+    yield reader, writer, near
+
+    await near.stop()
+
+
+@pytest.mark.asyncio
+async def test_repeated_reads_served_from_memory(tracked):
+    reader, writer, near = tracked
+    await writer.set(room_key("10_a"), json.dumps(make_room("10_a", players=(), version=1)))
+
+    for _ in range(5):
+        assert (await RoomRedisDAO.get(reader, "10_a"))["version"] == 1
+
+    assert near.misses == 1
+    assert near.hits == 4
+
+
+@pytest.mark.asyncio
+async def test_other_connection_write_invalidates(tracked):
+    reader, writer, near = tracked
+    await writer.set(room_key("10_b"), json.dumps(make_room("10_b", players=(), version=1)))
+    assert (await RoomRedisDAO.get(reader, "10_b"))["version"] == 1
+
+    await writer.set(room_key("10_b"), json.dumps(make_room("10_b", players=(), version=2)))
+    await wait_for(lambda: room_key("10_b") not in near._data, timeout=0.5)
+    assert (await RoomRedisDAO.get(reader, "10_b"))["version"] == 2
+
+    await writer.delete(room_key("10_b"))
+    await wait_for(lambda: room_key("10_b") not in near._data, timeout=0.5)
+    assert await RoomRedisDAO.get(reader, "10_b") is None
+
+
+@pytest.mark.asyncio
+async def test_concurrent_writers_converge(tracked):
+    reader, writer, near = tracked
+    key = room_key("10_c")
+    await writer.set(key, json.dumps(make_room("10_c", players=(), version=0)))
+
+    async def write_all():
+        for version in range(1, 30):
+            await writer.set(key, json.dumps(make_room("10_c", players=(), version=version)))
+            await asyncio.sleep(0)
+
+    async def read_all():
+        seen = []
+        for _ in range(60):
+            seen.append((await RoomRedisDAO.get(reader, "10_c"))["version"])
+            await asyncio.sleep(0)
+        return seen
+
+    _, seen = await asyncio.gather(write_all(), read_all())
+
+    # версии, которые видит читатель, не идут назад
+    assert seen == sorted(seen)
+    await wait_for(lambda: key not in near._data or json.loads(near._data[key])["version"] == 29)
+    assert (await RoomRedisDAO.get(reader, "10_c"))["version"] == 29
+
+
+@pytest.mark.asyncio
+async def test_write_during_read_is_not_cached(tracked):
+    _, _, near = tracked
+
+    async def slow_fetch():
+        # пока ответ на GET «в пути», приходит уведомление о записи
+        near.invalidate(["room:{10_d}"])
+        return "old"
+
+    assert await near.get("room:{10_d}", slow_fetch) == "old"
+    assert "room:{10_d}" not in near._data
+
+
+@pytest.mark.asyncio
+async def test_own_write_visible_immediately(tracked):
+    reader, _, near = tracked
+    await RoomRedisDAO.save(reader, "10_e", make_room("10_e", players=(), version=1))
+    assert (await RoomRedisDAO.get(reader, "10_e"))["version"] == 1
+
+    await RoomRedisDAO.save(reader, "10_e", make_room("10_e", players=(), version=2))
+
+    assert (await RoomRedisDAO.get(reader, "10_e"))["version"] == 2
+
+
+@pytest.mark.asyncio
+async def test_stop_clears_cache(tracked):
+    reader, writer, near = tracked
+    await writer.set(room_key("10_f"), json.dumps(make_room("10_f", players=(), version=1)))
+    await RoomRedisDAO.get(reader, "10_f")
+    assert near.snapshot()["size"] == 1
+
+    await near.stop()
+
+    assert near.active is False
+    assert near.snapshot()["size"] == 0
+    assert (await RoomRedisDAO.get(reader, "10_f"))["version"] == 1
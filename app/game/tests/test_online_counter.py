@@ -0,0 +1,54 @@
+"""
+Тесты инкрементального счётчика игроков онлайн (idx:online).
+Тестирует:
+- Отметку игроков при сохранении комнаты и снятие при её удалении
+- Снятие игрока при выходе из комнаты (/leave)
+- Выпадение игроков истёкших комнат без перебора комнат
+"""
+import time
+from unittest.mock import AsyncMock
+
+import pytest
+
+from app.admin.stats_dao import StatsDAO
+from app.game.api.router import leave
+from app.game.api.schemas import ReadyRequest
+from app.game.redis_dao.keys import ONLINE_INDEX
+from app.game.redis_dao.presence import OnlineDAO
+from app.game.redis_dao.redis_room_dao import RoomRedisDAO
+from app.game.tests.conftest import make_room
+
+
+@pytest.mark.asyncio
+async def test_save_and_delete_update_counter(fake_redis):
+    room = make_room("10_a", players=(1, 2), capacity=3)
+    await RoomRedisDAO.save(fake_redis, "10_a", room)
+    await RoomRedisDAO.save(fake_redis, "10_b", make_room("10_b", players=(3,), capacity=3))
+    # повторное сохранение не удваивает игроков
+    await RoomRedisDAO.save(fake_redis, "10_a", room)
+
+    assert await OnlineDAO.count(fake_redis) == 3
+
+    await RoomRedisDAO.delete(fake_redis, "10_a", room)
+
+    assert await StatsDAO._count_online_players(fake_redis) == 1
+
+
+@pytest.mark.asyncio
+async def test_leave_removes_player(fake_redis, fake_session, monkeypatch):
+    monkeypatch.setattr("app.game.api.router.send_msg", AsyncMock())
+    await RoomRedisDAO.save(fake_redis, "10_a", make_room("10_a", players=(1, 2), capacity=3))
+
+    await leave(ReadyRequest(room_id="10_a", tg_id=1), fake_session, fake_redis)
+
+    assert await fake_redis.zrange(ONLINE_INDEX, 0, -1) == ["2"]
+
+
+@pytest.mark.asyncio
+async def test_expired_players_drop_out(fake_redis):
+    await RoomRedisDAO.save(fake_redis, "10_a", make_room("10_a", players=(1,), capacity=3))
+    # игрок комнаты, которая уже истекла по TTL
+    await fake_redis.zadd(ONLINE_INDEX, {"99": time.time() - 1})
+
+    assert await OnlineDAO.count(fake_redis) == 1
+    assert await fake_redis.zrange(ONLINE_INDEX, 0, -1) == ["1"]
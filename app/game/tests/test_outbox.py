@@ -0,0 +1,236 @@
+"""
+Тесты очереди публикаций в Centrifugo (outbox.py).
+Тестирует:
+- Ответ обработчика без ожидания Centrifugo и доставку фоновым публикатором
+- Пачки по batch_size и порядок сообщений в канале
+- Повтор с паузой при недоступном Centrifugo без потери сообщений
+- Дослать пачку, оставшуюся в processing после падения процесса
+- Ограничение длины очереди и сообщения в памяти при недоступном Redis
+- Единственного публикатора при нескольких процессах
+- Продление блокировки во время паузы повтора и только своей блокировки
+"""
+import asyncio
+import json
+
+import httpx
+import pytest
+import pytest_asyncio
+
+from app.game.api import outbox as outbox_module
+from app.game.api import utils
+from app.game.api.centrifugo import CentrifugoClient
+from app.game.api.outbox import Outbox
+# настоящая send_msg: в conftest utils.send_msg подменяется для всех тестов
+from app.game.api.utils import batched_publish, send_msg
+from app.game.redis_dao.keys import OUTBOX, OUTBOX_LOCK, OUTBOX_PROCESSING
+
+
+class Centrifugo:
+    """Заглушка HTTP API: пишет команды, может отвечать 500 или задерживать ответ"""
+
+    def __init__(self):
+        self.requests = []
+        self.failures = 0
+        self.delay = 0.0
+        self.client = CentrifugoClient("http://centrifugo/api", "key", transport=httpx.MockTransport(self.handle))
+
+    async def handle(self, request: httpx.Request) -> httpx.Response:
+        await asyncio.sleep(self.delay)
+        if self.failures:
+            self.failures -= 1
+            return httpx.Response(503)
+        body = json.loads(request.content)
+        self.requests.append(body["params"]["commands"] if body["method"] == "batch" else [{body["method"]: body["params"]}])
+        return httpx.Response(200, json={})
+
+    def published(self, channel: str | None = None) -> list:
+        return [
+            command["publish"]["data"]
+            for commands in self.requests
+            for command in commands
+            if channel is None or command["publish"]["channel"] == channel
+        ]
+
+
+async def wait_for(predicate, timeout: float = 2.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not predicate():
+        assert asyncio.get_running_loop().time() < deadline, "условие не выполнилось вовремя"
+        await asyncio.sleep(0.01)
+
+
+@pytest.fixture(autouse=True)
+def fast_timings(monkeypatch):
+    monkeypatch.setattr(outbox_module, "POLL_TIMEOUT", 0.05)
+    monkeypatch.setattr(outbox_module, "BASE_BACKOFF", 0.01)
+
+
+@pytest.fixture
+def centrifugo():
+    return Centrifugo()
+
+
+@pytest_asyncio.fixture
+async def running(fake_redis, centrifugo, monkeypatch):
+    """Запускает публикатор и подставляет его в send_msg"""
+    tasks = []
+
+    async def start(**kwargs):
+        box = Outbox(client=centrifugo.client, max_backoff=0.05, **kwargs)
+        tasks.append(asyncio.create_task(box.run(fake_redis)))
+        await wait_for(lambda: box.running)
+        monkeypatch.setattr(utils, "outbox", box)
+        return box
+
+    yield start
+
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+@pytest.mark.asyncio
+async def test_handler_does_not_wait_for_centrifugo(running, centrifugo):
+    box = await running()
+    centrifugo.delay = 0.3
+
+    @batched_publish
+    async def handler():
+        await send_msg("hand", {"n": 1}, channel_name="user#1")
+        await send_msg("hand", {"n": 2}, channel_name="user#2")
+        return "ok"
+
+    started = asyncio.get_running_loop().time()
+    assert await handler() == "ok"
+    assert await send_msg("new_room", {}, channel_name="rooms") is True
+    assert asyncio.get_running_loop().time() - started < 0.2
+
+    await wait_for(lambda: len(centrifugo.published()) == 3)
+    assert [m["event"] for m in centrifugo.published()] == ["hand", "hand", "new_room"]
+    assert box.published == 3
+
+
+@pytest.mark.asyncio
+async def test_batches_keep_channel_order(running, centrifugo, fake_redis):
+    box = await running(batch_size=100)
+    # сообщения копятся, пока публикатор занят первой пачкой
+    centrifugo.delay = 0.1
+    await box.enqueue([("room#10_a", {"n": 0})])
+    await asyncio.sleep(0.02)
+    await box.enqueue([(f"room#10_{'ab'[i % 2]}", {"n": i}) for i in range(1, 251)])
+
+    await wait_for(lambda: box.published == 251, timeout=3)
+    assert [m["n"] for m in centrifugo.published("room#10_a")] == list(range(0, 251, 2))
+    assert [m["n"] for m in centrifugo.published("room#10_b")] == list(range(1, 251, 2))
+    assert max(len(commands) for commands in centrifugo.requests) == 100
+    assert len(centrifugo.requests) <= 5
+    assert await fake_redis.llen(OUTBOX) == 0
+
+
+@pytest.mark.asyncio
+async def test_retry_until_centrifugo_is_back(running, centrifugo, fake_redis):
+    centrifugo.failures = 3
+    box = await running()
+    await box.enqueue([("rooms", {"n": i}) for i in range(5)])
+
+    await wait_for(lambda: box.published == 5)
+    assert [m["n"] for m in centrifugo.published()] == [0, 1, 2, 3, 4]
+    assert box.retries >= 3
+    assert await fake_redis.llen(OUTBOX_PROCESSING) == 0
+
+
+@pytest.mark.asyncio
+async def test_processing_batch_resent_after_crash(running, centrifugo, fake_redis):
+    # предыдущий публикатор перенёс пачку в processing и упал, не получив ответа
+    stale = json.dumps({"channel": "rooms", "data": {"n": "stale"}, "ts": 0})
+    await fake_redis.rpush(OUTBOX_PROCESSING, stale)
+    await fake_redis.rpush(OUTBOX, json.dumps({"channel": "rooms", "data": {"n": "next"}, "ts": 0}))
+
+    await running()
+
+    await wait_for(lambda: len(centrifugo.published()) == 2)
+    assert [m["n"] for m in centrifugo.published()] == ["stale", "next"]
+
+
+@pytest.mark.asyncio
+async def test_queue_is_bounded(fake_redis, centrifugo):
+    box = Outbox(max_size=5, client=centrifugo.client)
+    box._redis = fake_redis
+
+    await box.enqueue([("rooms", {"n": i}) for i in range(8)])
+
+    assert box.dropped == 3
+    queued = [json.loads(item)["data"]["n"] for item in await fake_redis.lrange(OUTBOX, 0, -1)]
+    assert queued == [3, 4, 5, 6, 7]
+    assert (await box.snapshot())["queued"] == 5
+
+
+@pytest.mark.asyncio
+async def test_redis_down_keeps_messages_in_memory(centrifugo):
+    class BrokenRedis:
+        async def rpush(self, *args):
+            raise ConnectionError("redis down")
+
+    box = Outbox(client=centrifugo.client)
+    box._redis = BrokenRedis()
+    await box.enqueue([("rooms", {"n": 1}), ("rooms", {"n": 2})])
+    assert box.spilled == 2
+
+    assert await box._drain_memory() == 2
+    assert [m["n"] for m in centrifugo.published()] == [1, 2]
+
+
+@pytest.mark.asyncio
+async def test_single_publisher(running, centrifugo):
+    first = await running()
+    second = await running()
+    await wait_for(lambda: first.leader or second.leader)
+
+    for i in range(20):
+        await (first if i % 2 else second).enqueue([("rooms", {"n": i})])
+
+    await wait_for(lambda: len(centrifugo.published()) == 20)
+    assert [m["n"] for m in centrifugo.published()] == list(range(20))
+    assert not (first.leader and second.leader)
+    assert first.published + second.published == 20
+    assert 0 in (first.published, second.published)
+
+
+@pytest.mark.asyncio
+async def test_lock_held_through_long_backoff(fake_redis, centrifugo, monkeypatch):
+    monkeypatch.setattr(outbox_module, "LOCK_TTL", 1)
+    # пауза повтора длиннее срока блокировки
+    monkeypatch.setattr(outbox_module, "BASE_BACKOFF", 1.5)
+    centrifugo.failures = 1
+    first = Outbox(client=centrifugo.client, max_backoff=1.5)
+    second = Outbox(client=centrifugo.client, max_backoff=1.5)
+    await fake_redis.rpush(OUTBOX, json.dumps({"channel": "rooms", "data": {"n": 1}, "ts": 0}))
+    tasks = [asyncio.create_task(first.run(fake_redis))]
+    await wait_for(lambda: first.retries == 1)
+    tasks.append(asyncio.create_task(second.run(fake_redis)))
+
+    try:
+        await wait_for(lambda: first.published == 1, timeout=3)
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+    assert second.published == 0
+    assert [m["n"] for m in centrifugo.published()] == [1]
+
+
+@pytest.mark.asyncio
+async def test_renew_only_own_lock(fake_redis, centrifugo):
+    box = Outbox(client=centrifugo.client)
+    box._redis = fake_redis
+    assert await box._hold_lock() is True
+
+    # блокировка истекла, её взял другой процесс
+    await fake_redis.set(OUTBOX_LOCK, "other", ex=5)
+    box._lock_renewed = 0.0
+
+    assert await box._hold_lock() is False
+    assert 0 < await fake_redis.ttl(OUTBOX_LOCK) <= 5
+    box.leader = True
+    await box._release_lock()
+    assert await fake_redis.get(OUTBOX_LOCK) == "other"
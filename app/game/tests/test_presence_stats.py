@@ -0,0 +1,100 @@
+"""
+Тесты онлайна из присутствия Centrifugo (presence_stats.py).
+Тестирует:
+- Один вызов batch с presence_stats лобби и channels комнат
+- Онлайн в лобби, в комнатах и по ставкам
+- Сохранение прежнего снимка при недоступном Centrifugo
+- Снимок в /burkozel/online, /burkozel/lobby и статистике админки
+"""
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+
+import httpx
+import orjson
+import pytest
+
+from app.admin.stats_dao import StatsDAO
+from app.game.api import router
+from app.game.api.centrifugo import CentrifugoClient
+from app.game.api.presence_stats import PresenceStats
+from app.game.tests.centrifugo_standin import CentrifugoStandIn
+
+
+@pytest.fixture
+def standin():
+    server = CentrifugoStandIn()
+    # лобби: трое пользователей, у одного две вкладки
+    for user in (1, 2, 3, 3):
+        server.subscribe("rooms", user)
+    for channel, users in (("room#10_a", (4, 5)), ("room#10_b", (6, 7, 8)), ("room#50_c", (9,)), ("user#4", (4,))):
+        for user in users:
+            server.subscribe(channel, user)
+    return server
+
+
+@pytest.fixture
+def stats(standin):
+    return PresenceStats(client=CentrifugoClient("http://centrifugo/api", standin.api_key, transport=standin.transport()))
+
+
+@pytest.mark.asyncio
+async def test_refresh_counts_lobby_rooms_and_stakes(standin, stats):
+    assert stats.stats()["updated_at"] is None
+
+    assert await stats.refresh() is True
+
+    assert standin.requests == 1
+    snapshot = stats.stats()
+    assert snapshot["lobby_users"] == 3
+    assert snapshot["lobby_clients"] == 4
+    assert snapshot["in_game"] == 6
+    assert snapshot["rooms"] == 3
+    assert snapshot["by_stake"] == {"10": 5, "50": 1}
+    assert snapshot["updated_at"] is not None
+
+
+@pytest.mark.asyncio
+async def test_empty_rooms_are_not_counted(standin, stats):
+    client = standin.subscribe("room#100_d", 10)
+    standin.unsubscribe("room#100_d", client)
+
+    await stats.refresh()
+    assert "100" not in stats.stats()["by_stake"]
+
+
+@pytest.mark.asyncio
+async def test_failed_refresh_keeps_last_snapshot(standin, stats):
+    await stats.refresh()
+    before = stats.stats()
+
+    stats.client = CentrifugoClient(
+        "http://centrifugo/api", "key", transport=httpx.MockTransport(lambda request: httpx.Response(503))
+    )
+    assert await stats.refresh() is False
+    assert stats.stats() is before
+    assert stats.failures == 1
+
+
+@pytest.mark.asyncio
+async def test_endpoints_read_cached_snapshot(standin, stats, fake_redis, monkeypatch):
+    await stats.refresh()
+    monkeypatch.setattr(router, "presence_stats", stats)
+    monkeypatch.setattr("app.admin.stats_dao.presence_stats", stats)
+    requests = standin.requests
+
+    assert (await router.online())["in_game"] == 6
+    page = orjson.loads((await router.lobby(redis=fake_redis, status=None, stake=None, limit=20, cursor=None)).body)
+    assert page["online"] == {"lobby": 3, "in_game": 6, "by_stake": {"10": 5, "50": 1}}
+
+    async def get_fake_redis():
+        return fake_redis
+
+    monkeypatch.setattr("app.admin.stats_dao.get_redis", get_fake_redis)
+    session = AsyncMock()
+    session.execute.return_value.scalar = lambda: 0
+    session.execute.return_value.first = lambda: SimpleNamespace(count=0, amount=0)
+
+    statistics = await StatsDAO.get_platform_statistics(session)
+    assert statistics["online_in_lobby"] == 3
+    assert statistics["online_by_stake"] == {"10": 5, "50": 1}
+    assert standin.requests == requests
@@ -0,0 +1,189 @@
+"""
+Тесты представлений комнаты для зрителей (projections.py).
+Тестирует:
+- Публичное представление без колоды, рук и токенов, с deck_count и hand_count
+- Личное представление только со своей рукой
+- Построение представлений один раз на содержимое комнаты; одинаковый rev при разном содержимом
+- GET /burkozel/room/{room_id} с tg_id и без
+- Списки комнат /burkozel/rooms и /burkozel/all_rooms только в публичном представлении
+- Пересдачу: публичная комната в reshuffle, руки — в личные каналы
+"""
+import orjson
+import pytest
+import pytest_asyncio
+from unittest.mock import AsyncMock
+
+from app.game.api.projections import ProjectionCache, projections
+from app.game.api import router
+from app.game.api.router import current_room, move
+from app.game.api.schemas import MoveRequest
+from app.game.redis_dao.redis_room_dao import RoomRedisDAO
+from app.game.tests.conftest import make_room
+
+
+@pytest.fixture
+def sent(monkeypatch):
+    messages = []
+
+    async def fake_send_msg(event, payload, channel_name):
+        messages.append({"event": event, "payload": payload, "channel": channel_name})
+
+    monkeypatch.setattr("app.game.api.router.send_msg", fake_send_msg)
+    return messages
+
+
+def player(hand: list) -> dict:
+    return {"nickname": "p", "is_ready": True, "hand": hand, "round_score": 0, "penalty": 0,
+            "taken_tricks": 0, "token": f"token-{len(hand)}"}
+
+
+def game_room(hands: dict, deck: list) -> dict:
+    return make_room(
+        "10_v",
+        status="playing",
+        players={pid: player(hand) for pid, hand in hands.items()},
+        deck=deck,
+        trump="♦",
+        field={"attack": None, "defend": None, "winner": None},
+        last_turn={"attack": None, "defend": None},
+        attacker="1",
+        defender="2",
+        seats=["1", "2"],
+        turn_order=["1", "2"],
+    )
+
+
+@pytest_asyncio.fixture
+async def room(fake_redis):
+    data = game_room({"1": [["7", "♥"], ["K", "♠"]], "2": [["A", "♥"]]}, [["9", "♦"], ["J", "♣"]])
+    await RoomRedisDAO.save(fake_redis, "10_v", data)
+    return await RoomRedisDAO.get(fake_redis, "10_v")
+
+
+def test_public_view_hides_cards_and_tokens(room):
+    view = ProjectionCache().views(room).public
+
+    assert "deck" not in view
+    assert view["deck_count"] == 2
+    assert view["trump"] == "♦"
+    for pid, count in (("1", 2), ("2", 1)):
+        assert "hand" not in view["players"][pid]
+        assert "token" not in view["players"][pid]
+        assert view["players"][pid]["hand_count"] == count
+    # исходная комната не изменилась
+    assert room["players"]["1"]["hand"] == [["7", "♥"], ["K", "♠"]]
+
+
+def test_private_view_has_only_own_hand(room):
+    views = ProjectionCache().views(room)
+
+    own = views.for_viewer(1)
+    assert own["players"]["1"]["hand"] == [["7", "♥"], ["K", "♠"]]
+    assert own["players"]["1"]["token"] == "token-2"
+    assert "hand" not in own["players"]["2"]
+    assert "deck" not in own
+
+    # не игрок комнаты видит публичное представление
+    assert views.for_viewer(999) is views.public
+    assert views.for_viewer(None) is views.public
+
+
+@pytest.mark.asyncio
+async def test_views_built_once_per_revision(fake_redis, room):
+    cache = ProjectionCache()
+    first = cache.views(room)
+    assert cache.views(await RoomRedisDAO.get(fake_redis, "10_v")) is first
+    assert (cache.builds, cache.hits) == (1, 1)
+
+    room["players"]["1"]["hand"].pop()
+    await RoomRedisDAO.save(fake_redis, "10_v", room)
+    second = cache.views(await RoomRedisDAO.get(fake_redis, "10_v"))
+    assert second is not first
+    assert second.public["players"]["1"]["hand_count"] == 1
+    assert cache.builds == 2
+
+
+def test_same_rev_other_content_is_rebuilt(room):
+    cache = ProjectionCache()
+    cache.views(room)
+    # другой процесс сохранил комнату с той же версии: rev тот же, содержимое другое
+    other = {**room, "players": {**room["players"], "2": {**room["players"]["2"], "hand": []}}}
+
+    assert other["rev"] == room["rev"]
+    assert cache.views(other).public["players"]["2"]["hand_count"] == 0
+    assert cache.builds == 2
+
+
+@pytest.mark.asyncio
+async def test_room_endpoint_with_viewer(fake_redis, room):
+    public = orjson.loads((await current_room("10_v", redis_client=fake_redis, tg_id=None)).body)
+    assert "deck" not in public and "hand" not in public["players"]["1"]
+
+    own = orjson.loads((await current_room("10_v", redis_client=fake_redis, tg_id=2)).body)
+    assert own["players"]["2"]["hand"] == [["A", "♥"]]
+    assert "hand" not in own["players"]["1"]
+
+
+def endpoint(path: str):
+    return next(route.endpoint for route in router.router.routes if route.path == path)
+
+
+@pytest.mark.asyncio
+async def test_room_lists_are_public(fake_redis, room):
+    waiting = game_room({"1": [["7", "♥"]], "2": [["A", "♥"]]}, [["9", "♦"]])
+    waiting.update(room_id="10_list", status="waiting")
+    await RoomRedisDAO.save(fake_redis, "10_list", waiting)
+
+    pages = [
+        await endpoint("/burkozel/all_rooms")(redis=fake_redis),
+        await endpoint("/burkozel/rooms")(redis=fake_redis, bet=10),
+        await endpoint("/burkozel/rooms")(redis=fake_redis, bet=None),
+    ]
+
+    assert len(pages[0]["rooms"]) == 2
+    assert [r["id"] for r in pages[1]["rooms"]] == ["10_list"]
+    assert [r["room_id"] for r in pages[2]["rooms"]] == ["10_list"]
+    for page in pages:
+        for listed in page["rooms"]:
+            assert "deck" not in listed and listed["deck_count"] > 0
+            for pdata in listed["players"].values():
+                assert "hand" not in pdata and "token" not in pdata
+
+
+@pytest.mark.asyncio
+async def test_move_response_is_players_view(fake_redis, room, sent):
+    result = await move(AsyncMock(), MoveRequest(room_id="10_v", tg_id=1, cards=[["7", "♥"]]), fake_redis)
+
+    assert result["room"]["players"]["1"]["hand"] == [["K", "♠"]]
+    assert "hand" not in result["room"]["players"]["2"]
+    assert "deck" not in result["room"]
+
+
+@pytest.mark.asyncio
+async def test_reshuffle_sends_hands_privately(fake_redis, sent):
+    # последняя взятка партии: третий игрок выбывает по штрафу, двое продолжают — пересдача
+    data = game_room({"1": [["7", "♥"]], "2": [["A", "♥"]], "3": [["8", "♥"]]}, [])
+    data["players"]["3"]["penalty"] = 10
+    data["seats"] = data["turn_order"] = ["1", "2", "3"]
+    await RoomRedisDAO.save(fake_redis, "10_v", data)
+
+    for tg_id, card in ((1, ["7", "♥"]), (2, ["A", "♥"])):
+        await move(AsyncMock(), MoveRequest(room_id="10_v", tg_id=tg_id, cards=[card]), fake_redis)
+    projections.hits = 0
+    builds = projections.builds
+    result = await move(AsyncMock(), MoveRequest(room_id="10_v", tg_id=3, cards=[["8", "♥"]]), fake_redis)
+
+    [reshuffle] = [m["payload"] for m in sent if m["event"] == "reshuffle"]
+    assert "deck" not in reshuffle["room"]
+    assert all("hand" not in p for p in reshuffle["room"]["players"].values())
+    assert [reshuffle["room"]["players"][pid]["hand_count"] for pid in ("1", "2", "3")] == [4, 4, 0]
+
+    saved = await RoomRedisDAO.get(fake_redis, "10_v")
+    hands = {m["channel"]: [list(c) for c in m["payload"]["hand"]] for m in sent if m["event"] == "hand"}
+    assert hands == {f"user#{pid}": saved["players"][pid]["hand"] for pid in ("1", "2")}
+    assert result["room"]["players"]["3"]["hand"] == []
+    assert "hand" not in result["room"]["players"]["1"]
+    # представления пересданной комнаты строятся один раз: для события reshuffle,
+    # канала зрителей и ответа move
+    assert projections.builds == builds + 1
+    assert projections.hits == 2
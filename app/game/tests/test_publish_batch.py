@@ -0,0 +1,143 @@
+"""
+Тесты пакетной публикации событий (PublishBatch, @batched_publish).
+Тестирует:
+- Один запрос batch к Centrifugo на старт игры втроём (руки + game_start)
+- Один запрос на ход с добором карт (руки + move)
+- Слияние одинаковых сообщений подряд в broadcast с сохранением порядка
+- Одиночную команду без обёртки batch и ошибки в ответах пакета
+- Отправку накопленного, если обработчик упал
+"""
+import json
+
+import httpx
+import pytest
+from unittest.mock import AsyncMock
+
+from app.game.api import utils
+from app.game.api.centrifugo import CentrifugoClient, PublishBatch
+from app.game.api.router import move, ready
+from app.game.api.schemas import MoveRequest, ReadyRequest
+# настоящая send_msg: в conftest utils.send_msg подменяется для всех тестов
+from app.game.api.utils import batched_publish, send_msg
+from app.game.redis_dao.redis_room_dao import RoomRedisDAO
+
+
+@pytest.fixture
+def sent(monkeypatch):
+    """Тела HTTP-запросов к Centrifugo в порядке отправки"""
+    bodies = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        bodies.append(json.loads(request.content))
+        return httpx.Response(200, json={})
+
+    client = CentrifugoClient("http://centrifugo/api", "key", transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(utils, "centrifugo", client)
+    monkeypatch.setattr("app.game.api.router.send_msg", send_msg)
+    return bodies
+
+
+def channels(command: dict) -> list:
+    [(method, params)] = command.items()
+    return params["channels"] if method == "broadcast" else [params["channel"]]
+
+
+@pytest.mark.asyncio
+async def test_ready_three_players_single_request(fake_redis, sent):
+    players = {str(i): {"nickname": f"p{i}", "is_ready": i != 3} for i in (1, 2, 3)}
+    await RoomRedisDAO.save(fake_redis, "10_a", {
+        "room_id": "10_a", "stake": 10, "status": "waiting", "capacity": 3, "players": players,
+    })
+
+    await ready(ReadyRequest(room_id="10_a", tg_id=3), fake_redis)
+
+    assert len(sent) == 1
+    assert sent[0]["method"] == "batch"
+    commands = sent[0]["params"]["commands"]
+    assert [channels(c) for c in commands] == [["user#1"], ["user#2"], ["user#3"], ["room#10_a"]]
+    assert [c["publish"]["data"]["event"] for c in commands] == ["hand", "hand", "hand", "game_start"]
+    assert "id" in commands[-1]["publish"]["data"]
+
+
+@pytest.mark.asyncio
+async def test_move_with_draw_single_request(fake_redis, sent):
+    await RoomRedisDAO.save(fake_redis, "10_b", {
+        "room_id": "10_b",
+        "stake": 10,
+        "status": "playing",
+        "players": {
+            "1": {"nickname": "alice", "is_ready": True, "hand": [["7", "♥"]], "round_score": 0, "penalty": 0, "taken_tricks": 0},
+            "2": {"nickname": "bob", "is_ready": True, "hand": [["8", "♥"]], "round_score": 0, "penalty": 0, "taken_tricks": 0},
+        },
+        "deck": [["9", "♦"], ["J", "♣"], ["10", "♠"], ["Q", "♣"]],
+        "trump": "♦",
+        "field": {"attack": None, "defend": None, "winner": None},
+        "last_turn": {"attack": None, "defend": None},
+        "attacker": "1",
+        "defender": "2",
+        "seats": ["1", "2"],
+        "turn_order": ["1", "2"],
+    })
+
+    await move(AsyncMock(), MoveRequest(room_id="10_b", tg_id=1, cards=[["7", "♥"]]), fake_redis)
+    await move(AsyncMock(), MoveRequest(room_id="10_b", tg_id=2, cards=[["8", "♥"]]), fake_redis)
+
+    assert len(sent) == 2
+    events = [c["publish"]["data"]["event"] for c in sent[1]["params"]["commands"]]
+    assert events.count("hand") == 2
+    assert events[-1] == "move"
+
+
+def test_identical_messages_become_broadcast():
+    batch = PublishBatch()
+    batch.add("user#1", {"event": "tick"})
+    batch.add("user#2", {"event": "tick"})
+    batch.add("user#1", {"event": "tick"})
+    batch.add("rooms", {"event": "close_room"})
+
+    assert batch.messages == 4
+    assert batch.commands() == [
+        {"broadcast": {"channels": ["user#1", "user#2"], "data": {"event": "tick"}}},
+        {"publish": {"channel": "user#1", "data": {"event": "tick"}}},
+        {"publish": {"channel": "rooms", "data": {"event": "close_room"}, "skip_history": True}},
+    ]
+
+
+@pytest.mark.asyncio
+async def test_single_command_and_reply_errors():
+    sent = []
+    reply = {"replies": [{}, {"error": {"code": 102, "message": "unknown channel"}}]}
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        sent.append(json.loads(request.content))
+        return httpx.Response(200, json=reply if len(sent) > 1 else {})
+
+    client = CentrifugoClient("http://centrifugo/api", "key", transport=httpx.MockTransport(handler))
+
+    single = PublishBatch()
+    single.add("rooms", {"event": "new_room"})
+    assert await client.send(single) is True
+    assert sent[0] == {
+        "method": "publish",
+        "params": {"channel": "rooms", "data": {"event": "new_room"}, "skip_history": True},
+    }
+
+    pair = PublishBatch()
+    pair.add("rooms", {"event": "a"})
+    pair.add("nowhere", {"event": "b"})
+    assert await client.send(pair) is False
+    assert client.snapshot()["errors"] == 1
+
+
+@pytest.mark.asyncio
+async def test_batch_flushed_when_handler_fails(fake_redis, sent):
+    @batched_publish
+    async def handler():
+        await send_msg("a", {}, channel_name="user#1")
+        await send_msg("b", {}, channel_name="user#2")
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        await handler()
+
+    assert [c["publish"]["channel"] for c in sent[0]["params"]["commands"]] == ["user#1", "user#2"]
@@ -4,6 +4,7 @@ from unittest.mock import AsyncMock
 import json
 from app.game.api.router import find_players
 from app.game.api.schemas import FindPartnerRequest
+from app.game.redis_dao.keys import room_key
 
 
 @pytest.mark.asyncio
@@ -29,7 +30,7 @@ async def test_find_player_sends_new_room_and_close_room(monkeypatch):
     req1 = FindPartnerRequest(tg_id=1, nickname="alice", stake=10)
     await find_players(req1, session, fake_redis)
 
-    keys = await fake_redis.keys("10_*")
+    keys = await fake_redis.keys(room_key("10_*"))
     print(f"[DEBUG] Redis keys after first player: {keys}")
     raw_room = await fake_redis.get(keys[0])
     print(f"[DEBUG] Room data: {raw_room}")
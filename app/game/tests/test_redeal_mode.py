@@ -11,6 +11,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from app.game.api.router import find_players, ready
 from app.game.api.schemas import FindPartnerRequest, ReadyRequest
 from app.game.redis_dao.custom_redis import CustomRedis
+from app.game.redis_dao.keys import room_key
 from app.users.models import User
 from app.game.core.constants import DECK
 
@@ -56,7 +57,7 @@ async def test_redeal_with_special_combination_bura(
     await ready(ReadyRequest(tg_id=222222, room_id=room_id), fake_redis)
     
     # Проверяем, что игра началась
-    room_data = json.loads(await fake_redis.get(room_id))
+    room_data = json.loads(await fake_redis.get(room_key(room_id)))
     assert room_data["status"] == "playing"
     
     # Проверяем, что карты разданы (после потенциальной пересдачи)
@@ -108,7 +109,7 @@ async def test_redeal_without_special_combination(
     await ready(ReadyRequest(tg_id=222222, room_id=room_id), fake_redis)
     
     # Проверяем, что игра началась
-    room_data = json.loads(await fake_redis.get(room_id))
+    room_data = json.loads(await fake_redis.get(room_key(room_id)))
     assert room_data["status"] == "playing"
     assert len(room_data["players"]["111111"]["hand"]) == 4
     assert len(room_data["players"]["222222"]["hand"]) == 4
@@ -157,7 +158,7 @@ async def test_redeal_disabled_allows_special_combinations(
     await ready(ReadyRequest(tg_id=222222, room_id=room_id), fake_redis)
     
     # Проверяем, что игра началась
-    room_data = json.loads(await fake_redis.get(room_id))
+    room_data = json.loads(await fake_redis.get(room_key(room_id)))
     assert room_data["status"] == "playing"
     
     print("✅ Тест: redeal=False, особые комбинации не вызывают пересдачу")
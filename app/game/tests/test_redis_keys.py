@@ -0,0 +1,110 @@
+"""
+Тесты схемы ключей Redis и онлайн-миграции.
+Тестирует:
+- Перенос старых комнат '{stake}_{id}' на room:{id} с сохранением TTL
+- Ленивый перенос при чтении комнаты и его отключение после фоновой миграции
+- Отказ переносить посторонний JSON под похожим ключом
+- Реестр idx:registry* и очистку истёкших комнат
+- Очистку только пространств имён приложения в clear_redis
+"""
+import json
+
+import pytest
+
+from app.game.api.router import clear_redis
+from app.config import settings
+from app.game.redis_dao.keys import REGISTRY, room_key, room_expiry_key, room_state_key, registry_key
+from app.game.redis_dao.migration import migrate_legacy_keys, run_key_migration
+from app.game.redis_dao.redis_room_dao import RoomRedisDAO
+from app.game.tests.conftest import make_room
+
+
+@pytest.mark.asyncio
+async def test_migration_moves_legacy_rooms(fake_redis):
+    await fake_redis.setex("10_aaaa", 1200, json.dumps(make_room("10_aaaa")))
+    await fake_redis.set("100_bbbb", json.dumps(make_room("100_bbbb", stake=100)))
+    await fake_redis.set("10_notroom", "просто строка")
+    await fake_redis.setex("game:10_aaaa:state", 600, json.dumps({"x": 1}))
+
+    result = await migrate_legacy_keys(fake_redis, batch_size=2)
+
+    assert result == {"rooms": 2, "game_keys": 1}
+    assert await fake_redis.exists("10_aaaa") == 0
+    assert json.loads(await fake_redis.get(room_key("10_aaaa")))["room_id"] == "10_aaaa"
+    # срок жизни переносится на теневой ключ, комната живёт ещё ROOM_EXPIRY_GRACE
+    assert 0 < await fake_redis.ttl(room_expiry_key("10_aaaa")) <= 1200
+    assert 1200 < await fake_redis.ttl(room_key("10_aaaa")) <= 1200 + settings.ROOM_EXPIRY_GRACE
+    assert await fake_redis.ttl(room_key("100_bbbb")) == -1
+    assert set(await fake_redis.zrange(REGISTRY, 0, -1)) == {"10_aaaa", "100_bbbb"}
+    assert await fake_redis.zrange(registry_key(stake=100, status="waiting"), 0, -1) == ["100_bbbb"]
+    # посторонний ключ, похожий на комнату, не трогаем
+    assert await fake_redis.get("10_notroom") == "просто строка"
+    assert await fake_redis.get(room_state_key("10_aaaa")) == json.dumps({"x": 1})
+
+    # повторный проход ничего не делает
+    assert await migrate_legacy_keys(fake_redis) == {"rooms": 0, "game_keys": 0}
+
+
+@pytest.mark.asyncio
+async def test_get_migrates_legacy_room_on_read(fake_redis):
+    await fake_redis.setex("10_cccc", 600, json.dumps(make_room("10_cccc")))
+
+    room = await RoomRedisDAO.get(fake_redis, "10_cccc")
+
+    assert room["room_id"] == "10_cccc"
+    assert await fake_redis.exists("10_cccc") == 0
+    assert await fake_redis.exists(room_key("10_cccc")) == 1
+
+
+@pytest.mark.asyncio
+async def test_no_lazy_migration_after_background_pass(fake_redis, monkeypatch):
+    monkeypatch.setattr(RoomRedisDAO, "legacy_pending", True)
+    await run_key_migration(fake_redis)
+    calls = []
+
+    async def migrate_legacy(redis, room_id):
+        calls.append(room_id)
+
+    monkeypatch.setattr(RoomRedisDAO, "migrate_legacy", migrate_legacy)
+
+    assert await RoomRedisDAO.get(fake_redis, "10_gone") is None
+    assert await RoomRedisDAO.get_raw(fake_redis, "10_gone") is None
+    assert calls == []
+
+
+@pytest.mark.asyncio
+async def test_foreign_json_is_not_migrated(fake_redis):
+    await fake_redis.set("10_config", json.dumps({"stake": 10, "players": {}}))
+    await fake_redis.set("10_other", json.dumps(make_room("10_else")))
+    await fake_redis.set("10_list", json.dumps({"room_id": "10_list", "stake": 10, "players": []}))
+
+    for room_id in ("10_config", "10_other", "10_list"):
+        assert await RoomRedisDAO.get(fake_redis, room_id) is None
+        assert await fake_redis.exists(room_id) == 1
+        assert await fake_redis.exists(room_key(room_id)) == 0
+    assert await fake_redis.zrange(REGISTRY, 0, -1) == []
+
+
+@pytest.mark.asyncio
+async def test_index_drops_expired_rooms(fake_redis):
+    await RoomRedisDAO.save(fake_redis, "10_live", make_room("10_live"))
+    await RoomRedisDAO.save(fake_redis, "10_gone", make_room("10_gone"))
+    # имитируем истечение TTL: ключа нет, а в индексе id остался
+    await fake_redis.delete(room_key("10_gone"))
+
+    rooms = await RoomRedisDAO.get_by_stake(fake_redis, 10)
+
+    assert [r["room_id"] for r in rooms] == ["10_live"]
+    assert await fake_redis.zrange(registry_key(stake=10), 0, -1) == ["10_live"]
+    assert await fake_redis.zrange(REGISTRY, 0, -1) == ["10_live"]
+
+
+@pytest.mark.asyncio
+async def test_clear_redis_is_namespace_scoped(fake_redis):
+    await RoomRedisDAO.save(fake_redis, "10_room", make_room("10_room"))
+    await fake_redis.set("cache:user:1", "{}")
+    await fake_redis.set("centrifugo:foreign", "1")
+
+    await clear_redis(fake_redis)
+
+    assert await fake_redis.keys("*") == ["centrifugo:foreign"]
@@ -0,0 +1,95 @@
+"""
+Тесты учёта команд Redis (instrumentation.py).
+Тестирует:
+- Привязку команд и pipeline к шаблону маршрута текущего запроса
+- Гистограмму времени и байты запросов/ответов
+- Метку background вне запросов
+- Отсутствие учёта при выключенных метриках
+- Лог запросов, превысивших порог времени в Redis
+"""
+import httpx
+import pytest
+from fastapi import Depends, FastAPI
+from loguru import logger
+
+from app.game.redis_dao.instrumentation import BACKGROUND, RedisMetricsMiddleware, redis_metrics
+from app.game.redis_dao.redis_room_dao import RoomRedisDAO
+
+
+@pytest.fixture
+def metrics(monkeypatch):
+    monkeypatch.setattr(redis_metrics, "enabled", True)
+    monkeypatch.setattr(redis_metrics, "slow_request_ms", 0)
+    redis_metrics.reset()
+    yield redis_metrics
+    redis_metrics.reset()
+
+
+@pytest.fixture
+def client(fake_redis):
+    app = FastAPI()
+    app.add_middleware(RedisMetricsMiddleware)
+
+    async def get_fake_redis():
+        return fake_redis
+
+    @app.post("/rooms/{room_id}")
+    async def save_room(room_id: str, redis=Depends(get_fake_redis)):
+        room = {"room_id": room_id, "stake": 10, "status": "waiting", "players": {"1": {}}}
+        await RoomRedisDAO.save(redis, room_id, room)
+        return await RoomRedisDAO.get(redis, room_id)
+
+    @app.get("/rooms/{room_id}")
+    async def read_room(room_id: str, redis=Depends(get_fake_redis)):
+        return await RoomRedisDAO.get(redis, room_id)
+
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+
+
+@pytest.mark.asyncio
+async def test_commands_attributed_to_route(metrics, client):
+    async with client:
+        await client.post("/rooms/10_a")
+        await client.post("/rooms/10_b")
+        await client.get("/rooms/10_a")
+
+    endpoints = metrics.snapshot()["endpoints"]
+    saved = endpoints["POST /rooms/{room_id}"]
+    assert saved["by_command"]["MULTI"]["calls"] == 2
+    assert saved["by_command"]["MULTI"]["commands"] > 2
+    assert saved["by_command"]["GET"]["calls"] == 2
+
+    read = endpoints["GET /rooms/{room_id}"]["by_command"]["GET"]
+    assert read["calls"] == 1
+    assert read["bytes_in"] > 0 and read["bytes_out"] > 0
+    assert sum(read["histogram_ms"].values()) == 1
+
+
+@pytest.mark.asyncio
+async def test_background_label(metrics, fake_redis):
+    await fake_redis.get("cache:x")
+
+    assert metrics.snapshot()["endpoints"][BACKGROUND]["by_command"]["GET"]["calls"] == 1
+
+
+@pytest.mark.asyncio
+async def test_disabled_records_nothing(fake_redis, client):
+    redis_metrics.reset()
+    async with client:
+        await client.post("/rooms/10_a")
+
+    assert redis_metrics.snapshot()["endpoints"] == {}
+
+
+@pytest.mark.asyncio
+async def test_slow_requests_logged(metrics, client, monkeypatch):
+    monkeypatch.setattr(redis_metrics, "slow_request_ms", 1e-6)
+    logged = []
+    sink = logger.add(lambda message: logged.append(str(message)), level="WARNING")
+    try:
+        async with client:
+            await client.get("/rooms/10_a")
+    finally:
+        logger.remove(sink)
+
+    assert any("GET /rooms/{room_id}" in line and "мс в Redis" in line for line in logged)
@@ -0,0 +1,103 @@
+"""
+Тесты журнала событий комнаты (Redis Stream room:{id}:events).
+Тестирует:
+- Запись событий канала комнаты в send_msg и id записи в сообщении Centrifugo
+- Догон событий после id с ограничением limit
+- reset, когда нужные события вытеснены из журнала
+- Ошибку на некорректном id и удаление журнала вместе с комнатой
+"""
+import json
+
+import httpx
+import pytest
+from fastapi import HTTPException
+
+from app.game.api import utils
+from app.game.api.centrifugo import CentrifugoClient
+# настоящая send_msg: в conftest utils.send_msg подменяется для всех тестов
+from app.game.api.utils import send_msg
+from app.game.api.router import room_events
+from app.game.redis_dao.keys import room_events_key
+from app.game.redis_dao.redis_room_dao import RoomRedisDAO
+
+
+@pytest.fixture
+def published(monkeypatch):
+    """Перехватывает HTTP-запросы send_msg к Centrifugo"""
+    sent = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        sent.append(json.loads(request.content)["params"])
+        return httpx.Response(200, json={})
+
+    client = CentrifugoClient("http://centrifugo/api", "key", transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(utils, "centrifugo", client)
+    return sent
+
+
+@pytest.mark.asyncio
+async def test_send_msg_logs_room_events(fake_redis, published):
+    await send_msg("move", {"card": ["8", "♥"]}, channel_name="room#10_a")
+    await send_msg("hand", {"hand": []}, channel_name="user#1")
+    await send_msg("new_room", {"room_id": "10_a"}, channel_name="rooms")
+
+    entries = await fake_redis.xrange(room_events_key("10_a"))
+    assert len(entries) == 1
+    assert published[0]["data"]["id"] == entries[0][0]
+    assert "id" not in published[1]["data"]
+    assert "id" not in published[2]["data"]
+    assert await fake_redis.ttl(room_events_key("10_a")) > 0
+
+
+@pytest.mark.asyncio
+async def test_events_after_id(fake_redis, published):
+    for i in range(5):
+        await send_msg("move", {"n": i}, channel_name="room#10_b")
+    ids = [m["data"]["id"] for m in published]
+
+    everything = await room_events("10_b", redis_client=fake_redis, after=None, limit=100)
+    assert [e["payload"]["n"] for e in everything["events"]] == [0, 1, 2, 3, 4]
+
+    page = await room_events("10_b", redis_client=fake_redis, after=ids[1], limit=2)
+    assert [e["payload"]["n"] for e in page["events"]] == [2, 3]
+    assert page["has_more"] is True
+    assert page["last_id"] == ids[3]
+
+    rest = await room_events("10_b", redis_client=fake_redis, after=page["last_id"], limit=2)
+    assert [e["event"] for e in rest["events"]] == ["move"]
+    assert rest["has_more"] is False
+    assert rest["reset"] is False
+
+    caught_up = await room_events("10_b", redis_client=fake_redis, after=ids[-1], limit=2)
+    assert caught_up["events"] == [] and caught_up["last_id"] == ids[-1]
+
+
+@pytest.mark.asyncio
+async def test_trimmed_log_requires_reset(fake_redis, published):
+    for i in range(5):
+        await send_msg("move", {"n": i}, channel_name="room#10_c")
+    ids = [m["data"]["id"] for m in published]
+    await fake_redis.xtrim(room_events_key("10_c"), maxlen=2)
+
+    lost = await room_events("10_c", redis_client=fake_redis, after=ids[0], limit=100)
+    assert lost["reset"] is True and lost["events"] == []
+
+    kept = await room_events("10_c", redis_client=fake_redis, after=ids[3], limit=100)
+    assert kept["reset"] is False
+    assert [e["payload"]["n"] for e in kept["events"]] == [4]
+
+    expired = await room_events("10_gone", redis_client=fake_redis, after=ids[0], limit=100)
+    assert expired["reset"] is True
+
+
+@pytest.mark.asyncio
+async def test_bad_id_and_room_delete(fake_redis, published):
+    with pytest.raises(HTTPException) as exc:
+        await room_events("10_d", redis_client=fake_redis, after="abc", limit=10)
+    assert exc.value.status_code == 400
+
+    await RoomRedisDAO.save(fake_redis, "10_d", {"room_id": "10_d", "stake": 10, "status": "waiting", "players": {}})
+    await send_msg("ready", {}, channel_name="room#10_d")
+    await RoomRedisDAO.delete(fake_redis, "10_d")
+
+    assert await fake_redis.exists(room_events_key("10_d")) == 0
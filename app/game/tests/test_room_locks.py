@@ -0,0 +1,192 @@
+"""
+Тесты блокировок комнат и совместной загрузки (room_locks.py).
+Тестирует:
+- Параллельные ready одной комнаты не затирают друг друга
+- Два игрока наперегонки в одну ожидающую комнату: место получает один, второй — новую комнату
+- Параллельные чтения комнаты — один GET и одно декодирование
+- Чтение после записи не получает загрузку, начатую до неё
+- Своя копия комнаты под блокировкой, повторный вход без ожидания
+- Слабые ссылки: свободные блокировки не копятся
+- Ошибку загрузки получают все ожидающие
+"""
+import asyncio
+import gc
+from functools import partial
+from unittest.mock import AsyncMock
+
+import pytest
+
+from app.game.api.room_locks import RoomLocks, room_locks
+from app.game.api.router import current_room, find_players, ready
+from app.game.api.schemas import FindPartnerRequest, ReadyRequest
+from app.game.redis_dao.keys import player_key, room_key
+from app.game.redis_dao.redis_room_dao import RoomRedisDAO
+from app.game.tests.conftest import make_room
+
+
+locked_room = partial(make_room, "10_lock", status="matched", players=(1, 2, 3), capacity=3)
+
+
+@pytest.fixture
+def slow_get(monkeypatch):
+    """Чтение комнаты из Redis с паузой, чтобы запросы успели пересечься; считает вызовы"""
+    calls = []
+    original = RoomRedisDAO._get_raw
+
+    async def get_raw(redis, key):
+        calls.append(key)
+        await asyncio.sleep(0.01)
+        return await original(redis, key)
+
+    monkeypatch.setattr(RoomRedisDAO, "_get_raw", staticmethod(get_raw))
+    return calls
+
+
+@pytest.mark.asyncio
+async def test_concurrent_ready_keeps_both_updates(fake_redis, slow_get):
+    await RoomRedisDAO.save(fake_redis, "10_lock", locked_room())
+    contended = room_locks.contended
+
+    await asyncio.gather(
+        ready(ReadyRequest(room_id="10_lock", tg_id=1), fake_redis),
+        ready(ReadyRequest(room_id="10_lock", tg_id=2), fake_redis),
+    )
+
+    room = await RoomRedisDAO.get(fake_redis, "10_lock")
+    assert [room["players"][p]["is_ready"] for p in ("1", "2", "3")] == [True, True, False]
+    assert room["rev"] == 3
+    assert room_locks.contended == contended + 1
+
+
+@pytest.mark.asyncio
+async def test_concurrent_find_players_take_one_seat(fake_redis, slow_get, monkeypatch):
+    monkeypatch.setattr("app.game.api.router.send_msg", AsyncMock())
+    user = type("U", (), {"balance": 1000})()
+    monkeypatch.setattr("app.users.dao.UserDAO.find_one_or_none", AsyncMock(return_value=user))
+    await RoomRedisDAO.save(fake_redis, "10_wait", {
+        "room_id": "10_wait", "stake": 10, "status": "waiting", "capacity": 2,
+        "created_at": "2026-01-01T12:00:00",
+        "players": {"1": {"nickname": "p1", "is_ready": False}},
+    })
+    await fake_redis.set(player_key(1), "10_wait")
+    get_many = RoomRedisDAO.get_many
+
+    async def slow_get_many(redis, room_ids, **kwargs):
+        # оба запроса видят комнату ожидающей, прежде чем кто-то её сохранит
+        rooms = await get_many(redis, room_ids, **kwargs)
+        await asyncio.sleep(0.01)
+        return rooms
+
+    monkeypatch.setattr(RoomRedisDAO, "get_many", slow_get_many)
+
+    first, second = await asyncio.gather(*(
+        find_players(FindPartnerRequest(tg_id=tg_id, nickname=f"p{tg_id}", stake=10), AsyncMock(), fake_redis)
+        for tg_id in (2, 3)
+    ))
+
+    room = await RoomRedisDAO.get(fake_redis, "10_wait")
+    assert list(room["players"]) == ["1", "2"] and room["status"] == "matched"
+    assert (first.room_id, first.status) == ("10_wait", "matched")
+    # второй перечитал комнату под блокировкой, увидел, что мест нет, и создал свою
+    assert second.room_id != "10_wait" and second.status == "waiting"
+    assert await fake_redis.get(player_key(2)) == "10_wait"
+    assert await fake_redis.get(player_key(3)) == second.room_id
+
+
+@pytest.mark.asyncio
+async def test_reads_share_one_load(fake_redis, slow_get):
+    await RoomRedisDAO.save(fake_redis, "10_lock", locked_room())
+    shared = room_locks.shared
+
+    responses = await asyncio.gather(*(current_room("10_lock", fake_redis, None) for _ in range(5)))
+
+    assert slow_get == [room_key("10_lock")]
+    assert room_locks.shared == shared + 4
+    assert all(response.body is responses[0].body for response in responses)
+
+
+@pytest.mark.asyncio
+async def test_read_after_write_is_fresh(fake_redis, monkeypatch):
+    locks = RoomLocks()
+    await RoomRedisDAO.save(fake_redis, "10_lock", locked_room())
+    original = RoomRedisDAO.get
+    gate = asyncio.Event()
+    calls = []
+
+    async def get(redis, room_id):
+        calls.append(room_id)
+        if len(calls) == 1:
+            # первая загрузка висит, пока комнату не перезапишут
+            await gate.wait()
+        return await original(redis, room_id)
+
+    monkeypatch.setattr(RoomRedisDAO, "get", get)
+    early = asyncio.create_task(locks.load(fake_redis, "10_lock"))
+    while not calls:
+        await asyncio.sleep(0)
+    async with locks.hold("10_lock"):
+        room = await locks.load(fake_redis, "10_lock")
+        room["status"] = "playing"
+        await RoomRedisDAO.save(fake_redis, "10_lock", room)
+    late = asyncio.create_task(locks.load(fake_redis, "10_lock"))
+    for _ in range(5):
+        await asyncio.sleep(0)
+    gate.set()
+
+    # поздний читатель не присоединился к загрузке, начатой до записи
+    assert len(calls) == 3
+    assert (await late)["status"] == "playing"
+    assert (await early) is not (await late)
+
+
+@pytest.mark.asyncio
+async def test_holder_gets_own_copy(fake_redis, slow_get):
+    locks = RoomLocks()
+    await RoomRedisDAO.save(fake_redis, "10_lock", locked_room())
+
+    async def write():
+        async with locks.hold("10_lock"):
+            # повторный вход в ту же комнату не ждёт сам себя
+            async with locks.hold("10_lock"):
+                return await locks.load(fake_redis, "10_lock")
+
+    shared, own = await asyncio.wait_for(
+        asyncio.gather(locks.load(fake_redis, "10_lock"), write()), timeout=1
+    )
+    assert shared == own and shared is not own
+    assert locks.acquired == 1
+
+
+@pytest.mark.asyncio
+async def test_locks_are_weak():
+    locks = RoomLocks()
+    order = []
+
+    async def worker(n):
+        async with locks.hold("10_lock"):
+            order.append(("in", n))
+            await asyncio.sleep(0.01)
+            order.append(("out", n))
+
+    await asyncio.gather(worker(1), worker(2))
+    assert order == [("in", 1), ("out", 1), ("in", 2), ("out", 2)]
+
+    gc.collect()
+    assert locks.snapshot()["locks"] == 0
+
+
+@pytest.mark.asyncio
+async def test_failed_load_reaches_all_waiters(monkeypatch):
+    locks = RoomLocks()
+
+    async def broken(redis, room_id):
+        await asyncio.sleep(0.01)
+        raise ConnectionError("redis недоступен")
+
+    monkeypatch.setattr(RoomRedisDAO, "get", broken)
+    results = await asyncio.gather(
+        *(locks.load(None, "10_lock") for _ in range(3)), return_exceptions=True
+    )
+
+    assert all(isinstance(r, ConnectionError) for r in results)
+    assert locks.snapshot()["loading"] == 0 and locks.loads == 1
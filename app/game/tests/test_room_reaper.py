@@ -0,0 +1,197 @@
+"""
+Тесты сборщика истёкших комнат.
+Тестирует:
+- Теневой ключ срока жизни и grace-период комнаты
+- Закрытие истёкшей комнаты: close_room в лобби, удаление из реестра
+- Политики расчёта ставок прерванной партии: refund и settle
+- Однократную обработку события и досборку пропущенных комнат
+- Журнал комнаты не создаётся заново событием room_expired
+- Снятие отметки сборки с комнаты, которая оказалась жива
+- Обработку события expired из подписки
+- Переподключение, если Redis недоступен при старте сборщика
+"""
+import asyncio
+from contextlib import asynccontextmanager
+from decimal import Decimal
+from functools import partial
+from unittest.mock import AsyncMock
+
+import httpx
+import pytest
+from redis.exceptions import ConnectionError as RedisConnectionError
+
+from app.config import settings
+from app.game.api import reaper, utils
+from app.game.api.centrifugo import CentrifugoClient
+from app.game.redis_dao.keys import REGISTRY, room_key, room_events_key, room_expiry_key, room_reaping_key
+from app.game.redis_dao.redis_room_dao import RoomRedisDAO
+from app.game.tests.conftest import make_room
+
+
+PLAYERS = {
+    "111111": {"nickname": "a", "is_ready": True, "penalty": 4, "round_score": 20},
+    "222222": {"nickname": "b", "is_ready": True, "penalty": 1, "round_score": 40},
+}
+reaper_room = partial(make_room, stake=100, status="playing", players=PLAYERS)
+
+
+def sent_events(mock: AsyncMock) -> list:
+    return [(c.args[0] if c.args else c.kwargs["event"], c.kwargs.get("channel_name")) for c in mock.await_args_list]
+
+
+@pytest.fixture
+def reaper_send(monkeypatch):
+    mock = AsyncMock()
+    monkeypatch.setattr("app.game.api.reaper.send_msg", mock)
+    return mock
+
+
+@pytest.mark.asyncio
+async def test_save_sets_shadow_ttl(fake_redis):
+    await RoomRedisDAO.save(fake_redis, "100_a", reaper_room("100_a"), ttl=60)
+
+    assert 0 < await fake_redis.ttl(room_expiry_key("100_a")) <= 60
+    assert await fake_redis.ttl(room_key("100_a")) > 60
+
+    await RoomRedisDAO.save(fake_redis, "100_a", reaper_room("100_a"), ttl=None)
+
+    assert await fake_redis.exists(room_expiry_key("100_a")) == 0
+    assert await fake_redis.ttl(room_key("100_a")) == -1
+
+
+@pytest.mark.asyncio
+async def test_reap_refund_closes_room(fake_redis, reaper_send, monkeypatch):
+    monkeypatch.setattr(settings, "ROOM_EXPIRY_SETTLEMENT", "refund")
+    await RoomRedisDAO.save(fake_redis, "100_a", reaper_room("100_a"))
+    await fake_redis.delete(room_expiry_key("100_a"))
+
+    assert await reaper.reap_room(fake_redis, "100_a") is True
+
+    assert await fake_redis.exists(room_key("100_a")) == 0
+    assert await fake_redis.zrange(REGISTRY, 0, -1) == []
+    assert sent_events(reaper_send) == [
+        ("game_over", "room#100_a"),
+        ("room_expired", "room#100_a"),
+        ("close_room", "rooms"),
+    ]
+    game_over = reaper_send.await_args_list[0].args[1]
+    assert game_over["policy"] == "refund" and game_over["balances"] is None
+
+    # повторное событие (другой экземпляр приложения) ничего не делает
+    assert await reaper.reap_room(fake_redis, "100_a") is False
+
+
+@pytest.mark.asyncio
+async def test_reap_settle_pays_lowest_penalty(
+    fake_redis, fake_session, test_users_2players, reaper_send, monkeypatch
+):
+    @asynccontextmanager
+    async def session_maker():
+        yield fake_session
+
+    monkeypatch.setattr(settings, "ROOM_EXPIRY_SETTLEMENT", "settle")
+    monkeypatch.setattr("app.game.api.reaper.async_session_maker", session_maker)
+    await RoomRedisDAO.save(fake_redis, "100_a", reaper_room("100_a"))
+    await fake_redis.delete(room_expiry_key("100_a"))
+
+    await reaper.reap_room(fake_redis, "100_a")
+
+    user1, user2 = test_users_2players
+    await fake_session.refresh(user1)
+    await fake_session.refresh(user2)
+    assert user2.balance == Decimal("10100.00")
+    assert user1.balance == Decimal("9900.00")
+    game_over = reaper_send.await_args_list[0].args[1]
+    assert game_over["winner"] == "222222" and game_over["losers"] == ["111111"]
+
+
+@pytest.mark.asyncio
+async def test_resaved_room_is_not_reaped(fake_redis, reaper_send):
+    await RoomRedisDAO.save(fake_redis, "100_a", reaper_room("100_a", status="waiting"))
+
+    assert await reaper.reap_room(fake_redis, "100_a") is False
+    assert await fake_redis.exists(room_key("100_a")) == 1
+    reaper_send.assert_not_awaited()
+    # отметка сборки снята: истечение новой версии закроет комнату сразу
+    assert await fake_redis.exists(room_reaping_key("100_a")) == 0
+
+    await fake_redis.delete(room_expiry_key("100_a"))
+    assert await reaper.reap_room(fake_redis, "100_a") is True
+
+
+@pytest.mark.asyncio
+async def test_reap_leaves_no_event_log(fake_redis, monkeypatch):
+    # настоящая send_msg с журналом комнаты, Centrifugo — без сети
+    transport = httpx.MockTransport(lambda request: httpx.Response(200, json={}))
+    monkeypatch.setattr(utils, "centrifugo", CentrifugoClient("http://centrifugo/api", "key", transport=transport))
+    await RoomRedisDAO.save(fake_redis, "100_a", reaper_room("100_a", status="waiting"))
+    await fake_redis.delete(room_expiry_key("100_a"))
+
+    assert await reaper.reap_room(fake_redis, "100_a") is True
+    assert await fake_redis.exists(room_events_key("100_a")) == 0
+
+
+@pytest.mark.asyncio
+async def test_sweep_reaps_missed_rooms(fake_redis, reaper_send):
+    await RoomRedisDAO.save(fake_redis, "100_live", reaper_room("100_live", status="waiting"))
+    await RoomRedisDAO.save(fake_redis, "100_missed", reaper_room("100_missed", status="waiting"))
+    # теневой ключ истёк, пока приложение было остановлено: комната доживает grace-период
+    await fake_redis.delete(room_expiry_key("100_missed"))
+    await fake_redis.expire(room_key("100_missed"), settings.ROOM_EXPIRY_GRACE - 10)
+    await RoomRedisDAO.save(fake_redis, "100_test", reaper_room("100_test", status="waiting"), ttl=None)
+
+    assert await reaper.sweep_expired_rooms(fake_redis) == 1
+
+    assert sorted(await fake_redis.zrange(REGISTRY, 0, -1)) == ["100_live", "100_test"]
+
+
+@pytest.mark.asyncio
+async def test_listener_reaps_on_expired_event(fake_redis, reaper_send):
+    await RoomRedisDAO.save(fake_redis, "100_a", reaper_room("100_a", status="waiting"))
+    task = asyncio.create_task(reaper.run_room_reaper(fake_redis))
+    await asyncio.sleep(0.05)
+
+    await fake_redis.delete(room_expiry_key("100_a"))
+    await fake_redis.publish("__keyevent@0__:expired", room_expiry_key("100_a"))
+    for _ in range(50):
+        if not await fake_redis.exists(room_key("100_a")):
+            break
+        await asyncio.sleep(0.02)
+
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    assert await fake_redis.exists(room_key("100_a")) == 0
+    assert ("close_room", "rooms") in sent_events(reaper_send)
+
+
+@pytest.mark.asyncio
+async def test_listener_survives_redis_down_at_start(fake_redis, reaper_send, monkeypatch):
+    calls = 0
+    config_get = fake_redis.config_get
+
+    async def flaky_config_get(*args):
+        nonlocal calls
+        calls += 1
+        if calls == 1:
+            raise RedisConnectionError("redis down")
+        return await config_get(*args)
+
+    monkeypatch.setattr(fake_redis, "config_get", flaky_config_get)
+    monkeypatch.setattr(reaper, "RECONNECT_DELAY", 0.01)
+    await RoomRedisDAO.save(fake_redis, "100_a", reaper_room("100_a", status="waiting"))
+    task = asyncio.create_task(reaper.run_room_reaper(fake_redis))
+    await asyncio.sleep(0.05)
+
+    await fake_redis.delete(room_expiry_key("100_a"))
+    await fake_redis.publish("__keyevent@0__:expired", room_expiry_key("100_a"))
+    for _ in range(50):
+        if not await fake_redis.exists(room_key("100_a")):
+            break
+        await asyncio.sleep(0.02)
+
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    assert calls >= 2
+    assert await fake_redis.exists(room_key("100_a")) == 0
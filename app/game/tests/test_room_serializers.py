@@ -0,0 +1,119 @@
+"""
+Тесты форматов хранения комнат в Redis.
+Тестирует:
+- Круговое преобразование json / msgpack / packed
+- Чтение старых JSON-комнат после смены формата
+- Отказ на неизвестном байте версии
+"""
+import json
+import random
+
+import fakeredis.aioredis
+import pytest
+
+from app.game.core.constants import DECK
+from app.game.redis_dao.keys import room_key
+from app.game.redis_dao.redis_room_dao import RoomRedisDAO
+from app.game.redis_dao.serializers import (
+    SERIALIZERS,
+    FORMAT_PACKED,
+    get_room_serializer,
+    loads_room,
+    card_to_int,
+    int_to_card,
+)
+
+
+def make_playing_room(n_players: int) -> dict:
+    """Комната в середине партии: руки, колода, ходы на столе."""
+    deck = list(DECK)
+    random.Random(n_players).shuffle(deck)
+    seats = [str(111111 * (i + 1)) for i in range(n_players)]
+    players = {}
+    for pid in seats:
+        players[pid] = {
+            "nickname": f"Игрок {pid}",
+            "is_ready": True,
+            "token": "eyJhbGciOiJIUzI1NiJ9." + "x" * 40,
+            "hand": deck[:4],
+            "round_score": 14,
+            "penalty": 2,
+            "taken_tricks": 1,
+        }
+        deck = deck[4:]
+    turn = {"player": seats[0], "cards": [list(players[seats[0]]["hand"].pop())]}
+    return {
+        "room_id": "1000_a535d472",
+        "stake": 1000,
+        "created_at": "2026-01-01T12:00:00",
+        "status": "playing",
+        "capacity": n_players,
+        "players": players,
+        "deck": deck,
+        "trump": deck[0][1],
+        "field": {"attack": None, "defend": None, "winner": None},
+        "last_turn": {"attack": turn, "defend": None, "turns": [turn]},
+        "seats": seats,
+        "attacker": seats[0],
+        "turns": [turn],
+        "current_turn_idx": 1,
+    }
+
+
+def test_card_int_roundtrip():
+    assert sorted(card_to_int(c) for c in DECK) == list(range(36))
+    for card in DECK:
+        assert int_to_card(card_to_int(card)) == list(card)
+
+
+@pytest.mark.parametrize("name", sorted(SERIALIZERS))
+@pytest.mark.parametrize("n_players", [2, 3])
+def test_serializer_roundtrip(name, n_players):
+    room = make_playing_room(n_players)
+    # эталон — то, что вернул бы json.loads(json.dumps(room)): кортежи становятся списками
+    expected = json.loads(json.dumps(room))
+
+    payload = get_room_serializer(name).dumps(room)
+
+    assert loads_room(payload) == expected
+
+
+def test_legacy_json_room_still_loads():
+    room = make_playing_room(2)
+    legacy = json.dumps(room)
+
+    assert loads_room(legacy) == json.loads(legacy)
+    assert loads_room(legacy.encode()) == json.loads(legacy)
+
+
+def test_packed_is_smaller_than_json():
+    room = make_playing_room(3)
+
+    packed = get_room_serializer("packed").dumps(room)
+
+    assert packed[0] == FORMAT_PACKED
+    assert len(packed) < len(json.dumps(room).encode()) / 2
+
+
+def test_unknown_format_rejected():
+    with pytest.raises(ValueError):
+        loads_room(b"\x7fgarbage")
+    with pytest.raises(ValueError):
+        get_room_serializer("xml")
+
+
+@pytest.mark.asyncio
+async def test_room_dao_reads_json_after_switching_to_packed(monkeypatch):
+    redis = fakeredis.aioredis.FakeRedis()
+    monkeypatch.setattr(RoomRedisDAO, "serializer", get_room_serializer("packed"))
+
+    old_room = make_playing_room(2)
+    old_room["room_id"] = "10_legacy"
+    await redis.set(room_key("10_legacy"), json.dumps(old_room))
+    new_room = make_playing_room(3)
+    await RoomRedisDAO.save(redis, "10_packed", new_room)
+
+    assert (await redis.get(room_key("10_packed")))[0] == FORMAT_PACKED
+    assert await RoomRedisDAO.get(redis, "10_legacy") == json.loads(json.dumps(old_room))
+    assert await RoomRedisDAO.get(redis, "10_packed") == json.loads(json.dumps(new_room))
+    assert await RoomRedisDAO.get(redis, "10_missing") is None
@@ -0,0 +1,73 @@
+"""
+Тесты постраничного чтения комнат по ставке (CustomRedis.get_rooms_by_bet).
+Тестирует:
+- Чтение всех комнат мелкими страницами без пропусков и повторов
+- Предел числа возвращаемых комнат
+- Фильтр по статусу и очистку истёкших комнат из среза и общего реестра
+- Количество обращений к Redis: один MGET на страницу вместо GET на комнату
+"""
+import pytest
+
+from app.game.redis_dao.keys import REGISTRY, room_key, registry_key
+from app.game.redis_dao.redis_room_dao import RoomRedisDAO
+from app.game.tests.conftest import make_room
+
+
+async def fill(redis, n: int, stake: int = 10, status: str = "waiting"):
+    for i in range(n):
+        room_id = f"{stake}_{status}_{i}"
+        await RoomRedisDAO.save(redis, room_id, make_room(room_id, stake=stake, status=status, players=()))
+
+
+@pytest.mark.asyncio
+async def test_reads_all_rooms_in_small_pages(fake_redis):
+    await fill(fake_redis, 25)
+    await fill(fake_redis, 3, stake=20)
+
+    rooms = await fake_redis.get_rooms_by_bet(10, page_size=4)
+
+    ids = [r["id"] for r in rooms]
+    assert len(ids) == 25
+    assert set(ids) == {f"10_waiting_{i}" for i in range(25)}
+
+
+@pytest.mark.asyncio
+async def test_limit_caps_result(fake_redis):
+    await fill(fake_redis, 30)
+
+    rooms = await fake_redis.get_rooms_by_bet(10, page_size=7, limit=10)
+
+    assert len(rooms) == 10
+
+
+@pytest.mark.asyncio
+async def test_status_filter_and_stale_cleanup(fake_redis):
+    await fill(fake_redis, 3)
+    await fill(fake_redis, 2, status="playing")
+    await fake_redis.delete(room_key("10_waiting_1"))
+
+    rooms = await fake_redis.get_rooms_by_bet(10, status="waiting", page_size=2)
+
+    assert sorted(r["id"] for r in rooms) == ["10_waiting_0", "10_waiting_2"]
+    assert sorted(await fake_redis.zrange(registry_key(stake=10, status="waiting"), 0, -1)) == [
+        "10_waiting_0", "10_waiting_2"
+    ]
+    assert "10_waiting_1" not in await fake_redis.zrange(REGISTRY, 0, -1)
+
+
+@pytest.mark.asyncio
+async def test_one_mget_per_page(fake_redis, monkeypatch):
+    await fill(fake_redis, 40)
+    calls = []
+    orig = type(fake_redis).execute_command
+
+    async def counting(self, *args, **kwargs):
+        calls.append(args[0])
+        return await orig(self, *args, **kwargs)
+
+    monkeypatch.setattr(type(fake_redis), "execute_command", counting)
+
+    await fake_redis.get_rooms_by_bet(10, page_size=1000)
+
+    assert "GET" not in calls
+    assert calls.count("MGET") == calls.count("ZSCAN")
@@ -0,0 +1,162 @@
+"""
+Тесты каналов зрителей spectate#{room_id} (spectators.py).
+Тестирует:
+- Публичное состояние комнаты без карт на каждое изменение
+- Задержку трансляции и один вызов batch на сообщения с общим сроком
+- Число зрителей из присутствия Centrifugo
+- Одно сообщение зрителям на ход без чтения комнаты через API
+- Отправку остатка очереди при остановке
+- Итоговое состояние в game_over: комната не сохранена, кэш представлений её не подменяет
+"""
+import asyncio
+from functools import partial
+from unittest.mock import AsyncMock
+
+import pytest
+
+from app.game.api import spectators as spectators_module
+from app.game.api import utils
+from app.game.api.centrifugo import CentrifugoClient
+from app.game.api.presence_stats import PresenceStats
+from app.game.api.projections import public_view
+from app.game.api.router import leave, move
+from app.game.api.schemas import MoveRequest, ReadyRequest
+from app.game.api.spectators import SpectatorFeed
+# настоящая send_msg: в conftest utils.send_msg подменяется для всех тестов
+from app.game.api.utils import send_msg
+from app.game.redis_dao.redis_room_dao import RoomRedisDAO
+from app.game.tests.centrifugo_standin import CentrifugoStandIn
+from app.game.tests.conftest import make_room
+
+
+PLAYERS = {
+    "1": {"nickname": "a", "hand": [["7", "♥"], ["K", "♠"]], "token": "t1"},
+    "2": {"nickname": "b", "hand": [["A", "♥"]], "token": "t2"},
+}
+watched_room = partial(
+    make_room, room_id="10_w", status="playing", rev=1, players=PLAYERS, deck=[["9", "♦"]], trump="♦"
+)
+
+
+def record_send_msg(messages: list):
+    async def fake_send_msg(event, payload, channel_name):
+        messages.append({"event": event, "payload": payload, "channel": channel_name})
+
+    return fake_send_msg
+
+
+@pytest.fixture
+def standin(monkeypatch, fake_redis):
+    server = CentrifugoStandIn()
+    monkeypatch.setattr(utils, "send_msg", send_msg)
+    monkeypatch.setattr(utils, "centrifugo", CentrifugoClient("http://c/api", server.api_key, transport=server.transport()))
+    return server
+
+
+@pytest.mark.asyncio
+async def test_state_is_public_view(mock_send_msg):
+    await SpectatorFeed().push(watched_room(), "move")
+
+    [message] = mock_send_msg
+    assert message["channel"] == "spectate#10_w"
+    assert message["event"] == "state"
+    room = message["payload"]["room"]
+    assert message["payload"]["trigger"] == "move"
+    assert "deck" not in room and room["deck_count"] == 1
+    assert all("hand" not in p and "token" not in p for p in room["players"].values())
+    assert room["players"]["1"]["hand_count"] == 2
+
+
+@pytest.mark.asyncio
+async def test_delayed_and_batched(standin):
+    feed = SpectatorFeed(delay=0.05)
+    task = asyncio.create_task(feed.run())
+    await asyncio.sleep(0)
+    try:
+        await feed.push(watched_room(room_id="10_a", rev=1), "move")
+        await feed.push(watched_room(room_id="10_b", rev=1), "move")
+        await feed.push(watched_room(room_id="10_a", rev=2), "move")
+        await asyncio.sleep(0.01)
+        assert standin.published == []
+
+        await asyncio.sleep(0.08)
+        assert [channel for channel, _ in standin.published] == ["spectate#10_a", "spectate#10_b", "spectate#10_a"]
+        assert standin.requests == 1
+        assert feed.batches == 1
+        # последнее состояние — в истории канала для новых зрителей
+        assert standin.position("spectate#10_a")["offset"] == 2
+    finally:
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+
+@pytest.mark.asyncio
+async def test_spectator_count_from_presence(standin, monkeypatch, mock_send_msg):
+    for user in range(3):
+        standin.subscribe("spectate#10_w", user)
+    standin.subscribe("room#10_w", 1)
+    stats = PresenceStats(client=utils.centrifugo)
+    await stats.refresh()
+    monkeypatch.setattr(spectators_module, "presence_stats", stats)
+    monkeypatch.setattr(utils, "send_msg", record_send_msg(mock_send_msg))
+
+    assert stats.spectators("10_w") == 3
+    assert stats.stats()["spectators"] == 3
+    assert stats.stats()["in_game"] == 1
+
+    await SpectatorFeed().push(watched_room(), "move")
+    assert mock_send_msg[-1]["payload"]["spectators"] == 3
+
+
+@pytest.mark.asyncio
+async def test_move_publishes_one_state(fake_redis, monkeypatch, mock_send_msg):
+    monkeypatch.setattr("app.game.api.router.send_msg", record_send_msg([]))
+    room = watched_room()
+    room.update({
+        "field": {"attack": None, "defend": None, "winner": None},
+        "last_turn": {"attack": None, "defend": None},
+        "attacker": "1", "defender": "2", "seats": ["1", "2"], "turn_order": ["1", "2"],
+    })
+    for pdata in room["players"].values():
+        pdata.update({"is_ready": True, "round_score": 0, "penalty": 0, "taken_tricks": 0})
+    await RoomRedisDAO.save(fake_redis, "10_w", room)
+
+    await move(AsyncMock(), MoveRequest(room_id="10_w", tg_id=1, cards=[["7", "♥"]]), fake_redis)
+
+    [state] = [m for m in mock_send_msg if m["channel"] == "spectate#10_w"]
+    assert state["payload"]["room"]["players"]["1"]["hand_count"] == 1
+    assert state["payload"]["room"]["rev"] == (await RoomRedisDAO.get(fake_redis, "10_w"))["rev"]
+
+
+@pytest.mark.asyncio
+async def test_queue_flushed_on_stop(standin):
+    feed = SpectatorFeed(delay=60)
+    task = asyncio.create_task(feed.run())
+    await asyncio.sleep(0)
+    await feed.push(watched_room(), "game_over", winner="1")
+
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+    [(channel, data)] = standin.published
+    assert channel == "spectate#10_w"
+    assert data["payload"]["winner"] == "1"
+
+
+@pytest.mark.asyncio
+async def test_game_over_shows_final_room(fake_redis, fake_session, test_users_2players, mock_send_msg):
+    room = watched_room()
+    room["players"] = {
+        "111111": {"nickname": "a", "is_ready": True, "hand": [["7", "♥"]], "penalty": 1},
+        "222222": {"nickname": "b", "is_ready": True, "hand": [["A", "♥"]], "penalty": 2},
+    }
+    room["seats"] = ["111111", "222222"]
+    await RoomRedisDAO.save(fake_redis, "10_w", room)
+    # представление этой версии уже в кэше: его отдавали игрокам
+    assert "222222" in public_view(await RoomRedisDAO.get(fake_redis, "10_w"))["players"]
+
+    await leave(ReadyRequest(room_id="10_w", tg_id=222222), fake_session, fake_redis)
+
+    [state] = [m for m in mock_send_msg if m["channel"] == "spectate#10_w"]
+    assert state["payload"]["trigger"] == "game_over"
+    assert state["payload"]["winner"] == "111111" and state["payload"]["losers"] == ["222222"]
+    assert list(state["payload"]["room"]["players"]) == ["111111"]
@@ -1,6 +1,6 @@
 import asyncio
 import logging
-from contextlib import asynccontextmanager
+from contextlib import asynccontextmanager, suppress
 
 import uvicorn
 from loguru import logger
@@ -13,7 +13,15 @@ from app.config import settings
 from app.game.api.router import router as burkozel_router
 from app.game.all_games_router import router as game_router
 
+from app.game.redis_dao.instrumentation import RedisMetricsMiddleware
 from app.game.redis_dao.manager import redis_manager
+from app.game.redis_dao.migration import run_key_migration
+from app.game.api.reaper import run_room_reaper
+from app.game.api.centrifugo import centrifugo
+from app.game.api.outbox import run_outbox_publisher
+from app.game.api.lobby import run_lobby_aggregator
+from app.game.api.presence_stats import run_presence_stats
+from app.game.api.spectators import run_spectator_feed
 from app.users.router import router as user_router
 from app.payments.router import router as payments_router
 from app.friends.router import router as friend_router
@@ -22,6 +30,7 @@ from app.admin.router import router as admin_router
 from fastapi.staticfiles import StaticFiles
 from aiogram.types import Update
 from fastapi import FastAPI, Request
+from fastapi.responses import ORJSONResponse
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
@@ -30,6 +39,23 @@ logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(
 async def lifespan(app: FastAPI):
     logger.info("Бот запущен...")
     await redis_manager.connect()
+    # фоновый перенос старых ключей на схему room:* / idx:* / cache:*
+    migration_task = asyncio.create_task(run_key_migration(redis_manager.get_client()))
+    # закрытие истёкших комнат по событиям expired
+    reaper_task = asyncio.create_task(run_room_reaper(redis_manager.get_client(), redis_manager.node_clients()))
+    # публикация событий в Centrifugo вне обработчиков запросов
+    outbox_task = (
+        asyncio.create_task(run_outbox_publisher(redis_manager.get_client()))
+        if settings.CENTRIFUGO_OUTBOX else None
+    )
+    # обновления лобби раз в тик вместо new_room / close_room на каждое изменение
+    lobby_task = asyncio.create_task(run_lobby_aggregator()) if settings.LOBBY_TICK > 0 else None
+    # онлайн из присутствия Centrifugo для /burkozel/online и /admin/statistics
+    presence_task = (
+        asyncio.create_task(run_presence_stats()) if settings.PRESENCE_STATS_INTERVAL > 0 else None
+    )
+    # отложенная трансляция состояния комнат зрителям
+    spectator_task = asyncio.create_task(run_spectator_feed())
     await start_bot()
     # webhook_url = settings.hook_url
     # await bot.set_webhook(url=webhook_url,
@@ -42,12 +68,32 @@ async def lifespan(app: FastAPI):
 
     yield
     logger.info("Бот остановлен...")
+    migration_task.cancel()
+    reaper_task.cancel()
+    if presence_task is not None:
+        presence_task.cancel()
+    # остаток очереди зрителей уходит в outbox до его остановки
+    spectator_task.cancel()
+    with suppress(asyncio.CancelledError):
+        await spectator_task
+    if lobby_task is not None:
+        # остаток буфера лобби уходит в outbox до его остановки
+        lobby_task.cancel()
+        with suppress(asyncio.CancelledError):
+            await lobby_task
+    if outbox_task is not None:
+        # неотправленное остаётся в Redis для следующего публикатора
+        outbox_task.cancel()
+        with suppress(asyncio.CancelledError):
+            await outbox_task
     await stop_bot()
+    await centrifugo.close()
     await redis_manager.close()
 
 
 
-app = FastAPI(lifespan=lifespan)
+# ответы кодирует orjson (готовые тела отдаются как есть, см. app/game/api/responses.py)
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
 
 
 app.add_middleware(
@@ -57,6 +103,7 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"]
 )
+app.add_middleware(RedisMetricsMiddleware)
 
 
 @app.post("/webhook")
@@ -11,6 +11,7 @@ from app.dao.base import BaseDAO
 from app.game.models import GameResult, GameResultEnum
 from app.payments.models import PaymentTransaction, TxTypeEnum, TxStatusEnum
 from app.users.models import User
+from app.game.redis_dao.manager import invalidate_on_commit, user_tag
 
 logger = logging.getLogger(__name__)
 
@@ -94,6 +95,7 @@ class PaymentTransactionDAO:
         from decimal import Decimal
         old_balance = user.balance
         user.balance += Decimal(str(amount_rub))  # Конвертируем float в Decimal
+        invalidate_on_commit(session, user_tag(user.tg_id))
 
         # Обновляем статус и plat_guid
         tx.status = TxStatusEnum.POSTED
@@ -151,6 +153,7 @@ class PaymentTransactionDAO:
 
         # Резервируем средства (списываем с баланса)
         user.balance -= Decimal(str(amount_rub))
+        invalidate_on_commit(session, user_tag(user.tg_id))
 
         # Генерируем merchant_id
         timestamp = int(datetime.utcnow().timestamp())
@@ -224,6 +227,7 @@ class PaymentTransactionDAO:
             # Возвращаем средства на баланс
             from decimal import Decimal
             user.balance += Decimal(str(abs(tx.amount)))
+            invalidate_on_commit(session, user_tag(user.tg_id))
             logger.info(f"Withdraw cancelled, funds returned: {tx.id}")
 
         elif status in [0, 1]:  # в ожидании/процессе
@@ -252,6 +256,7 @@ class PaymentTransactionDAO:
 
         # Списываем средства
         user.balance -= Decimal(str(amount_rub))
+        invalidate_on_commit(session, user_tag(user.tg_id))
         logger.info(f"Funds reserved: user_id={user_id}, amount={amount_rub}")
         return True
 
@@ -281,6 +286,7 @@ class TransactionDAO:
         winner.balance += stake
         # Проигравший теряет свою ставку
         loser.balance -= stake
+        invalidate_on_commit(self.session, user_tag(winner_id), user_tag(loser_id))
 
         # --- Создаём транзакции ---
         win_tx = PaymentTransaction(
@@ -346,6 +352,7 @@ class TransactionDAO:
         
         # Начисляем победителю сумму ставок проигравших (без рейка пока)
         winner.balance += Decimal(str(total_pot))
+        invalidate_on_commit(self.session, user_tag(winner_id))
         
         # Списываем у проигравших
         transactions = []
@@ -358,6 +365,7 @@ class TransactionDAO:
             
             # Проигравший теряет свою ставку
             loser.balance -= Decimal(str(stake))
+            invalidate_on_commit(self.session, user_tag(loser_id))
             
             lose_tx = PaymentTransaction(
                 user_id=loser.id,
@@ -416,6 +424,8 @@ class TransactionDAO:
         
         self.session.add(leave_result)
         await self.session.flush()
+        # статистика игр игрока изменилась
+        invalidate_on_commit(self.session, user_tag(leaver_id))
         
         return {
             "leaver_result": leave_result.id,
@@ -20,6 +20,7 @@ from app.payments.schemas import TransactionStatsOut, UserTransactionsOut, Trans
 from app.users.auth import get_current_user
 from app.users.dao import UserDAO
 from app.users.models import User
+from app.game.redis_dao.manager import invalidate_on_commit, user_tag
 from app.config import settings
 from app.payments.utils.plat_client import PlatClient
 from decimal import Decimal
@@ -221,6 +222,7 @@ async def create_withdraw(
 
         # 5. Резервируем средства (списываем с баланса)
         user.balance -= Decimal(str(amount_rub))
+        invalidate_on_commit(session, user_tag(user.tg_id))
 
         # 6. Генерируем merchant_id
         timestamp = int(datetime.utcnow().timestamp())
@@ -437,6 +439,7 @@ async def test_create_withdraw_simple(
 
         # 2. Резервируем средства (списываем с баланса)
         user.balance -= Decimal(str(amount_rub))
+        invalidate_on_commit(session, user_tag(user.tg_id))
 
         # 3. Генерируем merchant_id
         timestamp = int(datetime.utcnow().timestamp())
@@ -11,6 +11,7 @@ from sqlalchemy import select, update as sa_update, delete as sa_delete
 
 from app.users.schemas import UserStatsOut
 from app.game.api.reliability import get_player_reliability_stats
+from app.game.redis_dao.manager import invalidate, invalidate_on_commit, user_tag
 
 
 class UserDAO:
@@ -44,6 +45,9 @@ class UserDAO:
             await session.rollback()
             raise
         await session.refresh(obj)
+        # мог быть закэширован «пользователь не найден»
+        if obj.tg_id is not None:
+            await invalidate(user_tag(obj.tg_id))
         return obj
 
     @classmethod
@@ -53,10 +57,15 @@ class UserDAO:
         if not values:
             return await cls.find_one_or_none(session, **filter_by)
 
+        where = [getattr(cls.model, k) == v for k, v in filter_by.items()]
         try:
-            q = sa_update(cls.model).where(
-                *[getattr(cls.model, k) == v for k, v in filter_by.items()]
-            ).values(**values).returning(cls.model.id)
+            old_tg_ids = []
+            if "tg_id" in values:
+                # RETURNING отдаёт уже новый tg_id: старый читаем до обновления, под блокировкой строки
+                res = await session.execute(select(cls.model.tg_id).where(*where).with_for_update())
+                old_tg_ids = res.scalars().all()
+
+            q = sa_update(cls.model).where(*where).values(**values).returning(cls.model.id)
             res = await session.execute(q)
             row = res.fetchone()
             if not row:
@@ -64,7 +73,12 @@ class UserDAO:
                 return None
             await session.commit()
 
-            return await cls.find_one_or_none_by_id(session, row[0])
+            user = await cls.find_one_or_none_by_id(session, row[0])
+            # кэш сбрасывается и под новым tg_id, и под прежним
+            tg_ids = {*old_tg_ids, user.tg_id if user else None} - {None}
+            if tg_ids:
+                await invalidate(*(user_tag(tg_id) for tg_id in tg_ids))
+            return user
         except SQLAlchemyError:
             await session.rollback()
             raise
@@ -72,10 +86,12 @@ class UserDAO:
     @classmethod
     async def delete(cls, session: AsyncSession, **filter_by) -> int:
         try:
-            q = sa_delete(cls.model).filter_by(**filter_by)
+            q = sa_delete(cls.model).filter_by(**filter_by).returning(cls.model.tg_id)
             res = await session.execute(q)
+            tg_ids = res.scalars().all()
+            invalidate_on_commit(session, *(user_tag(tg_id) for tg_id in tg_ids if tg_id is not None))
             await session.commit()
-            return res.rowcount or 0
+            return len(tg_ids)
         except SQLAlchemyError:
             await session.rollback()
             raise
@@ -1,6 +1,7 @@
 from fastapi import APIRouter, HTTPException, Query
 from app.database import SessionDep
 from app.users.dao import UserDAO
+from app.game.redis_dao.manager import cached, USER_TAG
 from app.users.schemas import UserCreate, UserUpdate, UserOut, UserStatsOut
 
 router = APIRouter(prefix="/users", tags=["User"])
@@ -28,9 +29,16 @@ async def get_all_users(
     return [UserOut.model_validate(user) for user in users]
 
 
+@cached("user_stats:{tg_id}", ttl=1800, tags=(USER_TAG,))
+async def load_user_stats(session, tg_id: int):
+    """Профиль со статистикой; кэш сбрасывается тегом user:{tg_id} при изменении баланса и данных"""
+    user_stats = await UserDAO.get_user_with_stats(session, tg_id=tg_id)
+    return user_stats.model_dump(mode="json") if user_stats else None
+
+
 @router.get("/get_current_user", response_model=UserStatsOut)
 async def get_current_user(session: SessionDep, tg_id: int = Query(..., description="Telegram user id")):
-    user_stats = await UserDAO.get_user_with_stats(session, tg_id=tg_id)
+    user_stats = await load_user_stats(session=session, tg_id=tg_id)
     if not user_stats:
         raise HTTPException(status_code=404, detail="User not found")
     return user_stats
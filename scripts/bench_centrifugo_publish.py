@@ -0,0 +1,98 @@
+"""
+Сравнение публикаций в Centrifugo: новый httpx.AsyncClient на каждую публикацию
+(как было в send_msg) против долгоживущего CentrifugoClient с пулом соединений.
+
+Вместо Centrifugo поднимается локальный stand-in на uvicorn: отвечает {} на
+любой POST и считает принятые TCP-соединения.
+
+Запуск (нужны переменные окружения приложения, как для тестов):
+    python -m scripts.bench_centrifugo_publish --publishes 2000 --concurrency 20
+"""
+import argparse
+import asyncio
+import socket
+import time
+
+import httpx
+import uvicorn
+
+from app.game.api.centrifugo import CentrifugoClient
+
+
+class StandIn:
+    """ASGI-приложение вместо HTTP API Centrifugo"""
+
+    def __init__(self):
+        self.connections = set()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return
+        self.connections.add(tuple(scope["client"]))
+        while (await receive()).get("more_body"):
+            pass
+        await send({"type": "http.response.start", "status": 200,
+                    "headers": [(b"content-type", b"application/json")]})
+        await send({"type": "http.response.body", "body": b"{}"})
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def publish_fresh(url: str, channel: str, data: dict) -> bool:
+    async with httpx.AsyncClient(timeout=30) as client:
+        response = await client.post(
+            url, json={"method": "publish", "params": {"channel": channel, "data": data}},
+            headers={"X-API-Key": "bench"},
+        )
+        return response.status_code == 200
+
+
+async def run(title: str, publish, stand_in: StandIn, publishes: int, concurrency: int):
+    stand_in.connections.clear()
+    queue = iter(range(publishes))
+
+    async def worker():
+        for i in queue:
+            assert await publish("room#bench", {"event": "move", "payload": {"n": i}})
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    print(
+        f"{title:<26} {publishes / elapsed:>9.0f} публ./с  "
+        f"{elapsed * 1000 / publishes:>7.3f} мс/публ.  {len(stand_in.connections):>6} соединений"
+    )
+
+
+async def main(publishes: int, concurrency: int, max_connections: int):
+    stand_in = StandIn()
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config(stand_in, host="127.0.0.1", port=port, log_level="warning"))
+    serve = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.01)
+    url = f"http://127.0.0.1:{port}/api"
+
+    pooled = CentrifugoClient(url, "bench", max_connections=max_connections)
+    print(f"Публикаций: {publishes}, параллельно: {concurrency}, пул: {max_connections}")
+    try:
+        await run("Новый клиент на публикацию", lambda c, d: publish_fresh(url, c, d),
+                  stand_in, publishes, concurrency)
+        await run("CentrifugoClient (пул)", pooled.publish, stand_in, publishes, concurrency)
+    finally:
+        await pooled.close()
+        server.should_exit = True
+        await serve
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--publishes", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--max-connections", type=int, default=50)
+    args = parser.parse_args()
+    asyncio.run(main(args.publishes, args.concurrency, args.max_connections))
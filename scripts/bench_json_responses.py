@@ -0,0 +1,167 @@
+"""
+Время ответа и CPU на запрос для чтения комнат: прежний путь JSON против orjson
+и отдачи готовых тел (app/game/api/responses.py).
+
+Комнаты на 3 игроков раздаются настоящим обработчиком ready и доигрываются
+на --moves ходов (fakeredis без decode_responses, как клиент приложения).
+Запросы идут через ASGI (httpx.ASGITransport) в два приложения:
+    было  — json.loads комнаты, представление, jsonable_encoder и JSONResponse;
+    стало — роутер /burkozel с ORJSONResponse: GET /room — закодированное
+            представление без разбора комнаты, GET /lobby — закодированные карточки лобби.
+
+Запуск (нужны переменные окружения приложения, как для тестов):
+    python -m scripts.bench_json_responses --rooms 200 --requests 5000 --moves 6
+"""
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from typing import Optional
+
+import fakeredis.aioredis
+import httpx
+from fastapi import Depends, FastAPI, Query
+from fastapi.responses import ORJSONResponse
+from loguru import logger
+
+from app.game.api import router, utils
+from app.game.api.lobby import LobbyAggregator
+from app.game.api.projections import viewer_view
+from app.game.api.router import move, ready
+from app.game.api.schemas import MoveRequest, ReadyRequest
+from app.game.redis_dao.custom_redis import CustomRedis
+from app.game.redis_dao.keys import room_key
+from app.game.redis_dao.manager import get_redis
+from app.game.redis_dao.redis_room_dao import RoomRedisDAO
+
+
+class NoMoneyDAO:
+    """Расчёт ставок не нужен для замера чтений"""
+
+    def __init__(self, session):
+        pass
+
+    async def apply_game_result(self, **kwargs):
+        return {}
+
+    async def apply_game_result_multiplayer(self, **kwargs):
+        return {}
+
+
+class NoSession:
+    async def commit(self):
+        pass
+
+
+class FakeCustomRedis(fakeredis.aioredis.FakeRedis, CustomRedis):
+    pass
+
+
+async def no_send_msg(event, payload, channel_name):
+    return True
+
+
+async def deal(redis, room_id: str, moves: int):
+    """Комната на 3 игроков после раздачи и moves ходов"""
+    players = {str(i): {"nickname": f"игрок {i}", "is_ready": True} for i in (1, 2, 3)}
+    players["3"]["is_ready"] = False
+    await RoomRedisDAO.save(redis, room_id, {
+        "room_id": room_id, "stake": 10, "status": "matched", "capacity": 3, "players": players,
+    })
+    await ready(ReadyRequest(room_id=room_id, tg_id=3), redis)
+    for _ in range(moves):
+        room = await RoomRedisDAO.get(redis, room_id)
+        order = room.get("turn_order") or room["seats"]
+        pid = order[room.get("current_turn_idx", 0) % len(order)]
+        card = room["players"][pid]["hand"][0]
+        result = await move(NoSession(), MoveRequest(room_id=room_id, tg_id=int(pid), cards=[card]), redis)
+        if "winner" in result or "Колода пересдана" in result.get("message", ""):
+            break
+
+
+def old_app(redis) -> FastAPI:
+    """Прежние эндпоинты: декодирование комнаты и JSONResponse по умолчанию"""
+    app = FastAPI()
+
+    @app.get("/burkozel/room/{room_id}")
+    async def current_room(
+        room_id: str, redis_client: CustomRedis = Depends(get_redis), tg_id: Optional[int] = Query(None)
+    ):
+        return viewer_view(json.loads(await redis_client.get(room_key(room_id))), tg_id)
+
+    @app.get("/burkozel/lobby")
+    async def lobby(redis_client: CustomRedis = Depends(get_redis), limit: int = Query(20)):
+        page, next_cursor = await RoomRedisDAO.list_page(redis_client, limit=limit, raw=True)
+        rooms = [LobbyAggregator.card(json.loads(raw)) for _, raw in page]
+        return {"count": len(rooms), "rooms": rooms, "next_cursor": next_cursor, "online": {}}
+
+    app.dependency_overrides[get_redis] = lambda: redis
+    return app
+
+
+def new_app(redis) -> FastAPI:
+    app = FastAPI(default_response_class=ORJSONResponse)
+    app.include_router(router.router)
+    app.dependency_overrides[get_redis] = lambda: redis
+    return app
+
+
+async def measure(app: FastAPI, urls: list) -> tuple[list, float]:
+    """Время каждого запроса и CPU процесса на все запросы"""
+    times = []
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        await client.get(urls[0])
+        cpu = time.process_time()
+        for url in urls:
+            started = time.perf_counter()
+            response = await client.get(url)
+            times.append(time.perf_counter() - started)
+            assert response.status_code == 200, response.text
+        cpu = time.process_time() - cpu
+    return times, cpu
+
+
+def percentile(values: list, q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1e6
+
+
+async def main(n_rooms: int, n_requests: int, moves: int, lobby_limit: int, seed: int):
+    random.seed(seed)
+    logger.remove()
+    logger.add(sys.stderr, level="WARNING")
+    router.send_msg = no_send_msg
+    utils.send_msg = no_send_msg
+    router.TransactionDAO = NoMoneyDAO
+    redis = FakeCustomRedis()
+
+    room_ids = [f"10_bench{i}" for i in range(n_rooms)]
+    for room_id in room_ids:
+        await deal(redis, room_id, moves)
+    sizes = [len(await redis.get(room_key(r))) for r in room_ids]
+
+    room_urls = [f"/burkozel/room/{random.choice(room_ids)}?tg_id={random.randint(1, 3)}" for _ in range(n_requests)]
+    lobby_urls = [f"/burkozel/lobby?limit={lobby_limit}"] * max(1, n_requests // 10)
+
+    print(f"Комнат: {n_rooms} по 3 игрока, ходов: {moves}, размер в Redis в среднем {sum(sizes) / len(sizes):.0f} байт")
+    print(f"{'запрос':<26} {'запросов':>8} {'сред., мкс':>11} {'p50, мкс':>9} {'p95, мкс':>9} {'CPU/запрос, мкс':>16}")
+    for name, urls in (("GET /room/{id}?tg_id", room_urls), (f"GET /lobby?limit={lobby_limit}", lobby_urls)):
+        for label, app in (("было", old_app(redis)), ("стало", new_app(redis))):
+            times, cpu = await measure(app, urls)
+            print(
+                f"{name + ' ' + label:<26} {len(times):>8} {sum(times) / len(times) * 1e6:>11.0f} "
+                f"{percentile(times, 0.5):>9.0f} {percentile(times, 0.95):>9.0f} {cpu / len(times) * 1e6:>16.0f}"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rooms", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--moves", type=int, default=6, help="ходов после раздачи")
+    parser.add_argument("--lobby-limit", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    asyncio.run(main(args.rooms, args.requests, args.moves, args.lobby_limit, args.seed))
@@ -0,0 +1,117 @@
+"""
+Сколько байт уходит в канал комнаты room#{room_id} за партию: событие move
+с комнатой целиком (как раньше) против дельты хода с seq.
+
+Партии играются через обработчики ready и move на fakeredis; каждый игрок
+ходит первой картой из руки. «Было» — размер прежнего сообщения
+{"room": <комната после хода>, "last_turn": ...}, «стало» — отправленная дельта.
+События hand (личные каналы) одинаковы в обоих вариантах и не считаются.
+
+Запуск (нужны переменные окружения приложения, как для тестов):
+    python -m scripts.bench_move_events --games 50 --players 3
+"""
+import argparse
+import asyncio
+import json
+import random
+
+import fakeredis.aioredis
+
+from app.game.api import router, utils
+from app.game.api.router import move, ready
+from app.game.api.schemas import MoveRequest, ReadyRequest
+from app.game.redis_dao.redis_room_dao import RoomRedisDAO
+
+
+class NoMoneyDAO:
+    """Расчёт ставок не нужен для подсчёта байт"""
+
+    def __init__(self, session):
+        pass
+
+    async def apply_game_result(self, **kwargs):
+        return {}
+
+    async def apply_game_result_multiplayer(self, **kwargs):
+        return {}
+
+
+class NoSession:
+    async def commit(self):
+        pass
+
+
+def size(event: str, payload: dict) -> int:
+    return len(json.dumps({"event": event, "payload": payload}, ensure_ascii=False).encode())
+
+
+async def play(redis, room_id: str, n_players: int, sent: list) -> tuple[int, int, int]:
+    """Одна партия до game_over: (байт было, байт стало, ходов)"""
+    players = {str(i): {"nickname": f"p{i}", "is_ready": True} for i in range(1, n_players + 1)}
+    players[str(n_players)]["is_ready"] = False
+    await RoomRedisDAO.save(redis, room_id, {
+        "room_id": room_id, "stake": 10, "status": "matched", "capacity": n_players, "players": players,
+    })
+    await ready(ReadyRequest(room_id=room_id, tg_id=n_players), redis)
+
+    before = after = moves = 0
+    while True:
+        room = await RoomRedisDAO.get(redis, room_id)
+        if room is None:
+            return before, after, moves
+        order = room.get("turn_order") or room["seats"]
+        pid = order[room.get("current_turn_idx", 0) % len(order)]
+        card = room["players"][pid]["hand"][0]
+
+        sent.clear()
+        result = await move(NoSession(), MoveRequest(room_id=room_id, tg_id=int(pid), cards=[card]), redis)
+        moves += 1
+        for message in sent:
+            if message["event"] == "move":
+                after += size("move", message["payload"])
+                # ответ move — представление для игрока; «было» — комната целиком из Redis
+                room = await RoomRedisDAO.get(redis, room_id) or result["room"]
+                before += size("move", {"room": {k: v for k, v in room.items() if k != "seq"},
+                                        "last_turn": room["last_turn"]})
+        if "winner" in result or "Колода пересдана" in result.get("message", ""):
+            return before, after, moves
+
+
+async def main(games: int, n_players: int, seed: int):
+    random.seed(seed)
+    redis = fakeredis.aioredis.FakeRedis()
+    sent = []
+
+    async def capture(event, payload, channel_name):
+        sent.append({"event": event, "payload": payload})
+
+    async def no_send_msg(event, payload, channel_name):
+        return True
+
+    router.send_msg = capture
+    # лента зрителей публикует через utils.send_msg — без подмены запросы ушли бы на CENTRIFUGO_URL
+    utils.send_msg = no_send_msg
+    router.TransactionDAO = NoMoneyDAO
+
+    total_before = total_after = total_moves = 0
+    for game in range(games):
+        before, after, moves = await play(redis, f"10_bench{game}", n_players, sent)
+        total_before += before
+        total_after += after
+        total_moves += moves
+
+    print(f"Партий: {games}, игроков: {n_players}, ходов: {total_moves}")
+    print(f"{'move с комнатой целиком':<26} {total_before / games:>10.0f} байт/партия  "
+          f"{total_before / total_moves:>7.0f} байт/ход")
+    print(f"{'move-дельта с seq':<26} {total_after / games:>10.0f} байт/партия  "
+          f"{total_after / total_moves:>7.0f} байт/ход")
+    print(f"Сокращение: {total_before / total_after:.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--games", type=int, default=50)
+    parser.add_argument("--players", type=int, default=2, choices=(2, 3))
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    asyncio.run(main(args.games, args.players, args.seed))
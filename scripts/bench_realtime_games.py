@@ -0,0 +1,158 @@
+"""
+Пропускная способность публикаций в Centrifugo на полных партиях.
+
+Партии играются настоящими обработчиками ready и move (fakeredis, без БД):
+события идут через send_msg и @batched_publish в CentrifugoClient, а вместо
+Centrifugo работает заглушка app/game/tests/centrifugo_standin.py на uvicorn
+(настоящий HTTP на localhost) с заданной задержкой и долей отказов.
+
+Итог по типу события: публикаций в секунду, байт в секунду и время ответа
+Centrifugo на запрос, в котором ушло событие (p50 / p95 / p99).
+
+Запуск (нужны переменные окружения приложения, как для тестов):
+    python -m scripts.bench_realtime_games --games 200 --players 3 --concurrency 20 --latency 0.002
+"""
+import argparse
+import asyncio
+import random
+import sys
+import time
+from collections import defaultdict
+
+import fakeredis.aioredis
+from loguru import logger
+
+from app.game.api import router, utils
+from app.game.api.centrifugo import CentrifugoClient
+from app.game.api.router import move, ready
+from app.game.api.schemas import MoveRequest, ReadyRequest
+from app.game.redis_dao import manager
+from app.game.redis_dao.custom_redis import CustomRedis
+from app.game.redis_dao.redis_room_dao import RoomRedisDAO
+from app.game.tests.centrifugo_standin import CentrifugoStandIn
+
+
+class NoMoneyDAO:
+    """Расчёт ставок не нужен для замера публикаций"""
+
+    def __init__(self, session):
+        pass
+
+    async def apply_game_result(self, **kwargs):
+        return {}
+
+    async def apply_game_result_multiplayer(self, **kwargs):
+        return {}
+
+
+class NoSession:
+    async def commit(self):
+        pass
+
+
+class FakeCustomRedis(fakeredis.aioredis.FakeRedis, CustomRedis):
+    pass
+
+
+class TimedClient(CentrifugoClient):
+    """CentrifugoClient, который записывает время каждого запроса для всех его событий"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.latencies = defaultdict(list)
+
+    async def call(self, method, params):
+        started = time.perf_counter()
+        response = await super().call(method, params)
+        elapsed = time.perf_counter() - started
+        commands = params["commands"] if method == "batch" else [{method: params}]
+        for command in commands:
+            for name, command_params in command.items():
+                event = command_params.get("data", {}).get("event", name)
+                channels = len(command_params.get("channels", ())) or 1
+                self.latencies[event].extend([elapsed] * channels)
+        return response
+
+
+async def play(redis, room_id: str, n_players: int):
+    """Одна партия до game_over или пересдачи"""
+    players = {str(i): {"nickname": f"p{i}", "is_ready": True} for i in range(1, n_players + 1)}
+    players[str(n_players)]["is_ready"] = False
+    await RoomRedisDAO.save(redis, room_id, {
+        "room_id": room_id, "stake": 10, "status": "matched", "capacity": n_players, "players": players,
+    })
+    await ready(ReadyRequest(room_id=room_id, tg_id=n_players), redis)
+
+    while True:
+        room = await RoomRedisDAO.get(redis, room_id)
+        if room is None:
+            return
+        order = room.get("turn_order") or room["seats"]
+        pid = order[room.get("current_turn_idx", 0) % len(order)]
+        card = room["players"][pid]["hand"][0]
+        result = await move(NoSession(), MoveRequest(room_id=room_id, tg_id=int(pid), cards=[card]), redis)
+        if "winner" in result or "Колода пересдана" in result.get("message", ""):
+            return
+
+
+def percentile(values: list, q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000
+
+
+async def main(games: int, n_players: int, concurrency: int, latency: float, fail_rate: float, seed: int):
+    random.seed(seed)
+    # логи ходов на каждый запрос заняли бы больше времени, чем публикации
+    logger.remove()
+    logger.add(sys.stderr, level="WARNING")
+    redis = FakeCustomRedis()
+
+    async def get_fake_redis():
+        return redis
+
+    manager.get_redis = get_fake_redis
+    router.TransactionDAO = NoMoneyDAO
+
+    standin = CentrifugoStandIn(latency=latency, jitter=latency, fail_rate=fail_rate, seed=seed)
+    async with standin.serve() as url:
+        client = TimedClient(url, standin.api_key, max_connections=concurrency)
+        utils.centrifugo = client
+        queue = iter(range(games))
+
+        async def worker():
+            for game in queue:
+                await play(redis, f"10_bench{game}", n_players)
+
+        started = time.perf_counter()
+        try:
+            await asyncio.gather(*(worker() for _ in range(concurrency)))
+        finally:
+            elapsed = time.perf_counter() - started
+            await client.close()
+
+    total = sum(s["publishes"] for s in standin.stats.values())
+    total_bytes = sum(s["bytes"] for s in standin.stats.values())
+    print(f"Партий: {games}, игроков: {n_players}, параллельно: {concurrency}, "
+          f"задержка {latency * 1000:.1f} мс, отказы {fail_rate:.0%}, время {elapsed:.2f} с")
+    print(f"{'событие':<12} {'публ.':>7} {'публ./с':>9} {'байт/с':>11} {'p50, мс':>9} {'p95, мс':>9} {'p99, мс':>9}")
+    for event, stats in sorted(standin.stats.items(), key=lambda item: -item[1]["publishes"]):
+        times = client.latencies.get(event) or [0.0]
+        print(
+            f"{event:<12} {stats['publishes']:>7} {stats['publishes'] / elapsed:>9.0f} "
+            f"{stats['bytes'] / elapsed:>11.0f} {percentile(times, 0.5):>9.2f} "
+            f"{percentile(times, 0.95):>9.2f} {percentile(times, 0.99):>9.2f}"
+        )
+    print(f"{'всего':<12} {total:>7} {total / elapsed:>9.0f} {total_bytes / elapsed:>11.0f}   "
+          f"запросов к API: {standin.requests} ({standin.requests / elapsed:.0f}/с), отказов: {standin.failed}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--games", type=int, default=200)
+    parser.add_argument("--players", type=int, default=2, choices=(2, 3))
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.0, help="задержка ответа заглушки, с")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="доля запросов с ответом 503")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    asyncio.run(main(args.games, args.players, args.concurrency, args.latency, args.fail_rate, args.seed))
@@ -0,0 +1,131 @@
+"""
+Бенчмарк форматов хранения комнат в Redis: json, msgpack, packed.
+Сравнивает размер значения, время кодирования и декодирования
+на реалистичных комнатах для 2 и 3 игроков на каждой стадии игры.
+
+Запуск:
+    python -m scripts.bench_room_serialization [--number 2000]
+"""
+import argparse
+import random
+import time
+import timeit
+
+import jwt
+
+from app.game.core.constants import DECK
+from app.game.redis_dao.serializers import SERIALIZERS, loads_room
+
+
+def _token(tg_id: str) -> str:
+    """Токен такого же размера, как у generate_client_token."""
+    return jwt.encode({"sub": tg_id, "exp": int(time.time()) + 3600}, "secret", algorithm="HS256")
+
+
+def _base_room(n_players: int, n_joined: int) -> dict:
+    seats = [str(5254325840 + i) for i in range(n_players)]
+    return {
+        "room_id": "1000_a535d472",
+        "stake": 1000,
+        "created_at": "2026-01-01T12:00:00.123456",
+        "status": "waiting" if n_joined < n_players else "matched",
+        "capacity": n_players,
+        "speed": "normal",
+        "redeal": False,
+        "dark": False,
+        "reliable_only": False,
+        "players": {
+            pid: {"nickname": f"player_{pid[-4:]}", "is_ready": False, "token": _token(pid)}
+            for pid in seats[:n_joined]
+        },
+    }
+
+
+def _deal(room: dict, rng: random.Random) -> dict:
+    deck = list(DECK)
+    rng.shuffle(deck)
+    seats = list(room["players"])
+    for pdata in room["players"].values():
+        pdata.update({"is_ready": True, "hand": deck[:4], "round_score": 0, "penalty": 0, "taken_tricks": 0})
+        deck = deck[4:]
+    room.update({
+        "deck": deck,
+        "trump": deck[0][1],
+        "field": {"attack": None, "defend": None, "winner": None},
+        "last_turn": {"attack": None, "defend": None, "turns": []},
+        "seats": seats,
+        "attacker": seats[0],
+        "defender": seats[1],
+        "turn_order": seats.copy(),
+        "turns": [],
+        "current_turn_idx": 0,
+        "status": "playing",
+    })
+    return room
+
+
+def _play_tricks(room: dict, n_tricks: int, rng: random.Random) -> dict:
+    """Разыгрывает n взяток: каждый кладёт карту, все добирают из колоды."""
+    seats = room["seats"]
+    for _ in range(n_tricks):
+        turns = []
+        for pid in seats:
+            hand = room["players"][pid]["hand"]
+            if hand:
+                turns.append({"player": pid, "cards": [list(hand.pop(rng.randrange(len(hand))))]})
+        winner = rng.choice(seats)
+        room["players"][winner]["round_score"] += rng.choice([0, 2, 3, 4, 10, 11])
+        room["players"][winner]["taken_tricks"] += 1
+        room["last_turn"] = {"attack": turns[0], "defend": turns[1] if len(turns) > 1 else None, "turns": turns}
+        for pid in seats:
+            if room["deck"] and len(room["players"][pid]["hand"]) < 4:
+                room["players"][pid]["hand"].append(room["deck"].pop(0))
+    # текущая взятка: первый игрок уже положил карту
+    first = room["players"][seats[0]]["hand"]
+    if first:
+        room["turns"] = [{"player": seats[0], "cards": [list(first.pop())]}]
+        room["current_turn_idx"] = 1
+    return room
+
+
+def build_rooms() -> list[tuple[str, dict]]:
+    """Набор комнат для 2 и 3 игроков на всех стадиях игры."""
+    rooms = []
+    for n in (2, 3):
+        rng = random.Random(n)
+        rooms.append((f"{n}p waiting", _base_room(n, 1)))
+        rooms.append((f"{n}p matched", _base_room(n, n)))
+        rooms.append((f"{n}p game start", _deal(_base_room(n, n), rng)))
+        rooms.append((f"{n}p mid game", _play_tricks(_deal(_base_room(n, n), rng), 3, rng)))
+        rooms.append((f"{n}p deck empty", _play_tricks(_deal(_base_room(n, n), rng), 36 // n - 4, rng)))
+    return rooms
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--number", type=int, default=2000, help="итераций на замер")
+    args = parser.parse_args()
+
+    header = f"{'room':<18} {'format':<8} {'bytes':>7} {'ratio':>6} {'encode µs':>10} {'decode µs':>10}"
+    print(header)
+    print("-" * len(header))
+
+    for label, room in build_rooms():
+        json_size = None
+        for name, serializer in SERIALIZERS.items():
+            payload = serializer.dumps(room)
+            raw = payload.encode() if isinstance(payload, str) else payload
+            assert loads_room(raw) == loads_room(SERIALIZERS["json"].dumps(room))
+
+            encode = timeit.timeit(lambda: serializer.dumps(room), number=args.number) / args.number
+            decode = timeit.timeit(lambda: loads_room(raw), number=args.number) / args.number
+            json_size = json_size or len(raw)
+            print(
+                f"{label:<18} {name:<8} {len(raw):>7} {len(raw) / json_size:>6.2f}"
+                f" {encode * 1e6:>10.1f} {decode * 1e6:>10.1f}"
+            )
+        print()
+
+
+if __name__ == "__main__":
+    main()
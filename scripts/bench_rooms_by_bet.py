@@ -0,0 +1,89 @@
+"""
+Бенчмарк чтения списка комнат по ставке: GET на каждую комнату
+против постраничного ZSCAN + MGET (CustomRedis.get_rooms_by_bet).
+Задержка сети имитируется паузой перед каждой командой fakeredis.
+
+Запуск:
+    python -m scripts.bench_rooms_by_bet [--rooms 2000] [--latency-ms 0.5] [--page-size 200]
+"""
+import argparse
+import asyncio
+import time
+
+import fakeredis.aioredis
+
+from app.config import settings
+
+from app.game.redis_dao.custom_redis import CustomRedis
+from app.game.redis_dao.keys import room_key, registry_key, decode_key
+from app.game.redis_dao.redis_room_dao import RoomRedisDAO
+from app.game.redis_dao.serializers import loads_room
+
+
+class LatencyRedis(fakeredis.aioredis.FakeRedis, CustomRedis):
+    """fakeredis с задержкой на каждый запрос (пайплайн — один запрос)"""
+
+    latency = 0.0
+
+    async def execute_command(self, *args, **options):
+        await asyncio.sleep(self.latency)
+        return await super().execute_command(*args, **options)
+
+
+async def sequential_get(redis, bet: int) -> list:
+    """Прежний способ: обход индекса и GET на каждую комнату"""
+    index_key = registry_key(stake=bet)
+    rooms = []
+    async for raw_id, _ in redis.zscan_iter(index_key, count=1000):
+        raw = await redis.get(room_key(decode_key(raw_id)))
+        if raw is not None:
+            rooms.append(loads_room(raw))
+    return rooms
+
+
+async def fill(redis, n_rooms: int, bet: int):
+    for i in range(n_rooms):
+        room_id = f"{bet}_{i:08x}"
+        await RoomRedisDAO.save(redis, room_id, {
+            "room_id": room_id,
+            "stake": bet,
+            "status": "waiting",
+            "capacity": 2,
+            "players": {str(5254325840 + i): {"nickname": f"player_{i}", "is_ready": False}},
+        })
+
+
+async def measure(title: str, coro_factory, repeat: int):
+    best = float("inf")
+    count = 0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        count = len(await coro_factory())
+        best = min(best, time.perf_counter() - started)
+    print(f"{title:<28} {count:>6} комнат  {best * 1000:>9.1f} мс")
+
+
+async def main(n_rooms: int, latency_ms: float, page_size: int, repeat: int):
+    redis = LatencyRedis(decode_responses=True)
+    await fill(redis, n_rooms, bet=10)
+    LatencyRedis.latency = latency_ms / 1000
+    # сравниваем полный обход, поэтому снимаем предел ответа
+    settings.ROOMS_LIST_MAX = max(settings.ROOMS_LIST_MAX, n_rooms)
+
+    print(f"Комнат: {n_rooms}, задержка: {latency_ms} мс на запрос, страница: {page_size}")
+    await measure("GET на комнату", lambda: sequential_get(redis, 10), repeat)
+    await measure(
+        "ZSCAN + MGET по страницам",
+        lambda: redis.get_rooms_by_bet(10, page_size=page_size, limit=n_rooms),
+        repeat,
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rooms", type=int, default=2000)
+    parser.add_argument("--latency-ms", type=float, default=0.5)
+    parser.add_argument("--page-size", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    asyncio.run(main(args.rooms, args.latency_ms, args.page_size, args.repeat))